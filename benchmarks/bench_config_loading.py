@@ -0,0 +1,72 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from utils.config_loader import read_yaml, iter_yaml_list
+
+def write_inventory(path, entries):
+    with open(path, "w") as f:
+        f.write("buckets:\n")
+        for i in range(entries):
+            f.write(
+                f"  - name: bench-bucket-{i:06d}\n"
+                f"    region: ap-south-1\n"
+                f"    acl: private\n"
+                f"    tags:\n"
+                f"      Project: OptiFlow\n"
+                f"      Index: '{i}'\n"
+                f"    objects:\n"
+                f"      - key: data/{i}.json\n"
+                f"        source: assets/{i}.json\n"
+            )
+
+# tracemalloc slows parsing down several times over, so peak memory is only measured on request
+def measure(func, memory=False):
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    count = func()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if memory else None
+    if memory:
+        tracemalloc.stop()
+    return seconds, peak, count
+
+def time_to_first(path):
+    started = time.perf_counter()
+    next(iter_yaml_list(path, "buckets"))
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure YAML inventory load time: safe_load vs CSafeLoader vs cache vs streaming")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--skip-pure-python", action="store_true", help="skip the slow yaml.safe_load baseline")
+    parser.add_argument("--memory", action="store_true", help="also report peak traced memory (much slower)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "s3_config.yaml")
+        cache_dir = os.path.join(workdir, "cache")
+        write_inventory(path, args.entries)
+        print(f"{args.entries} buckets, {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        scenarios = []
+        if not args.skip_pure_python:
+            scenarios.append(("yaml.safe_load (pure Python)", lambda: len(yaml.safe_load(open(path))["buckets"])))
+        scenarios += [
+            ("read_yaml, cold cache", lambda: len(read_yaml(path, cache_dir)["buckets"])),
+            ("read_yaml, warm cache", lambda: len(read_yaml(path, cache_dir)["buckets"])),
+            ("iter_yaml_list, streaming", lambda: sum(1 for _ in iter_yaml_list(path, "buckets"))),
+        ]
+        for name, func in scenarios:
+            seconds, peak, count = measure(func, args.memory)
+            memory = f"  peak {peak / 1024 / 1024:8.1f} MB" if peak is not None else ""
+            print(f"{name:32s} {seconds:8.2f}s{memory}  ({count} items)")
+        print(f"{'streaming, first item':32s} {time_to_first(path) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import random
+import time
+
+from services.iam.action_mapping import ActionMapper, is_aws_action, DEFAULT_ACTION_MAP_PATH
+from utils.config_loader import load_yaml_config
+
+PROVIDERS = ["Microsoft.Storage", "Microsoft.Compute", "Microsoft.Network", "Microsoft.Web", "Microsoft.Sql",
+             "Microsoft.KeyVault", "Microsoft.Insights", "Microsoft.Authorization", "Microsoft.Unmapped"]
+RESOURCES = ["storageAccounts", "virtualMachines", "disks", "virtualNetworks", "sites", "servers/databases",
+             "vaults/secrets", "roleAssignments", "storageAccounts/blobServices/containers/blobs"]
+VERBS = ["read", "write", "delete", "start/action", "listKeys/action"]
+
+def synthetic_roles(role_count, actions_per_role, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [f"{p}/{r}/{v}" for p in PROVIDERS for r in RESOURCES for v in VERBS] + ["*", "*/read"]
+    return [
+        {"name": f"Role {i}", "permissions": [rng.choice(vocabulary) for _ in range(actions_per_role)]}
+        for i in range(role_count)
+    ]
+
+# Reference implementation: test every rule for every action, no index and no memo
+def naive_lookup(rules, action):
+    if is_aws_action(action):
+        return (action,)
+    key = action.lower()
+    best = None
+    for rule in rules:
+        if rule.pattern == key:
+            return rule.aws
+        if rule.specificity and rule.matches(key) and (best is None or rule.rank() > best.rank()):
+            best = rule
+    return best.aws if best else None
+
+def run_benchmark(roles, rules_path):
+    rule_table = load_yaml_config(rules_path).get("rules", [])
+    raw_rules = ActionMapper(rule_table).rules
+    total_actions = sum(len(r["permissions"]) for r in roles)
+
+    started = time.perf_counter()
+    naive = [[naive_lookup(raw_rules, a) for a in role["permissions"]] for role in roles]
+    naive_seconds = time.perf_counter() - started
+
+    mapper = ActionMapper(rule_table)
+    started = time.perf_counter()
+    indexed = [[mapper.lookup(a) for a in role["permissions"]] for role in roles]
+    indexed_seconds = time.perf_counter() - started
+
+    assert naive == indexed, "indexed mapper disagrees with the linear scan"
+    return {
+        "roles": len(roles),
+        "actions": total_actions,
+        "unique_actions": len(mapper.cache),
+        "rules": len(raw_rules),
+        "naive_seconds": naive_seconds,
+        "indexed_seconds": indexed_seconds,
+        "speedup": naive_seconds / max(indexed_seconds, 1e-9),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Azure -> AWS IAM action mapper against a linear scan")
+    parser.add_argument("--roles", type=int, default=10000)
+    parser.add_argument("--actions-per-role", type=int, default=6)
+    parser.add_argument("--rules", default=DEFAULT_ACTION_MAP_PATH)
+    args = parser.parse_args()
+
+    result = run_benchmark(synthetic_roles(args.roles, args.actions_per_role), args.rules)
+    print(f"{result['roles']} roles, {result['actions']} actions ({result['unique_actions']} unique), {result['rules']} rules")
+    print(f"linear scan: {result['naive_seconds']:.3f}s")
+    print(f"indexed + memoized: {result['indexed_seconds']:.3f}s ({result['speedup']:.0f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import logging
+import os
+import time
+
+from benchmarks.inventories import _mappable_actions
+from services.iam.optimize import optimize_policies
+from services.iam.run import transform_to_aws_format
+
+def synthetic_tenant(role_count, actions_per_role=40):
+    import random
+
+    rng = random.Random(11)
+    vocabulary = _mappable_actions()
+    return [
+        {"name": f"Role {i}", "permissions": [rng.choice(vocabulary) for _ in range(actions_per_role)]}
+        for i in range(role_count)
+    ]
+
+def transform(roles, logger, parallel):
+    started = time.perf_counter()
+    policies = transform_to_aws_format(roles, logger, parallel=parallel)
+    plan = optimize_policies(policies, logger, parallel=parallel)
+    return time.perf_counter() - started, policies, plan
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-process and process-pool IAM transforms")
+    parser.add_argument("--roles", type=int, default=20000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    roles = synthetic_tenant(args.roles)
+    print(f"{args.roles} roles on {os.cpu_count()} CPUs")
+
+    baseline = None
+    for processes in args.processes:
+        settings = {"processes": processes, "chunk_size": args.chunk_size, "min_records": 0}
+        seconds, policies, plan = transform(roles, logger, settings)
+        if baseline is None:
+            baseline = (seconds, policies, plan)
+        assert (policies, plan["policies"], plan["roles"]) == (baseline[1], baseline[2]["policies"], baseline[2]["roles"]), \
+            "parallel output differs from the in-process output"
+        print(f"{processes:3d} processes  {seconds:7.2f}s  ({baseline[0] / seconds:.1f}x)")
+
+if __name__ == "__main__":
+    main()
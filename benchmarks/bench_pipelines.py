@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import inventories
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGION = "ap-south-1"
+SERVICES = ["iam", "s3", "lambda", "rds", "cicd"]
+SCALES = {"small": 100, "medium": 10000, "large": 100000}
+
+# Differences smaller than these are treated as noise when comparing against a baseline
+NOISE_FLOOR = {"seconds": 0.25, "api_calls": 0, "peak_rss_mb": 5.0}
+
+def _prepare(service, scale, workdir):
+    from utils.aws import get_client
+
+    config = {
+        "region": REGION,
+        "dry_run": False,
+        "pipeline": {"stream_sources": True},
+        "logging": {"console": False},
+        "metrics": {"summary_path": None},
+    }
+    if service == "iam":
+        config["azure_iam"] = {
+            "subscriptions": [inventories.SUBSCRIPTION_ID],
+            "fixture_path": inventories.iam_fixture(workdir, scale),
+            "save_snapshot": False,
+        }
+    elif service == "s3":
+        config["s3_config_path"] = inventories.s3_inventory(workdir, scale, region=REGION)
+        config["s3_transfer"] = {"checkpoint_path": os.path.join(workdir, "s3_checkpoint.jsonl")}
+    elif service == "lambda":
+        trust = {"Version": "2012-10-17", "Statement": [
+            {"Effect": "Allow", "Principal": {"Service": "lambda.amazonaws.com"}, "Action": "sts:AssumeRole"}
+        ]}
+        role = get_client("iam").create_role(RoleName="bench-lambda-role", AssumeRolePolicyDocument=json.dumps(trust))
+        config["lambda_config_path"] = inventories.lambda_inventory(workdir, scale, role["Role"]["Arn"])
+    elif service == "rds":
+        ec2 = get_client("ec2")
+        vpc = ec2.create_vpc(CidrBlock="10.0.0.0/16")["Vpc"]["VpcId"]
+        subnets = [
+            ec2.create_subnet(VpcId=vpc, CidrBlock=f"10.0.{i}.0/24", AvailabilityZone=f"{REGION}{zone}")["Subnet"]["SubnetId"]
+            for i, zone in enumerate("ab")
+        ]
+        get_client("rds").create_db_subnet_group(
+            DBSubnetGroupName="bench-subnets", DBSubnetGroupDescription="benchmark", SubnetIds=subnets
+        )
+        config["rds_config_path"] = inventories.rds_inventory(workdir, scale, "bench-subnets")
+    elif service == "cicd":
+        config["azure_pipeline_path"] = inventories.pipeline_inventory(workdir, scale)
+    return config
+
+def _collect(snapshot, service):
+    steps = {}
+    records = {}
+    api_calls = {}
+    for histogram in snapshot["histograms"]:
+        if histogram["name"] == "migration_step_seconds" and histogram["labels"].get("service") == service:
+            steps[histogram["labels"]["step"]] = round(histogram["sum"], 4)
+    for counter in snapshot["counters"]:
+        labels = counter["labels"]
+        if counter["name"] == "migration_records_total" and labels.get("service") == service:
+            records[labels["stage"]] = counter["value"]
+        elif counter["name"] == "migration_api_calls_total":
+            key = f"{labels['service']}:{labels['operation']}"
+            api_calls[key] = api_calls.get(key, 0) + counter["value"]
+    return steps, records, api_calls
+
+# Runs one service pipeline in this process against moto; called in a fresh subprocess
+# per (service, scale) so that peak RSS belongs to that run alone.
+def run_worker(service, scale, log_level):
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": REGION,
+    })
+    from moto import mock_aws
+
+    from core.runner import load_service
+    from utils.aws import configure_clients
+    from utils.logging_setup import setup_logging, shutdown_logging
+    from utils.metrics import METRICS
+
+    with tempfile.TemporaryDirectory() as workdir, mock_aws():
+        configure_clients({}, region=REGION)
+        started = time.perf_counter()
+        config = _prepare(service, scale, workdir)
+        setup_seconds = time.perf_counter() - started
+        logger = setup_logging({"console": False, "level": log_level}, "Benchmark")
+        run = load_service(service)
+
+        METRICS.reset()
+        started = time.perf_counter()
+        error = None
+        try:
+            run(config, logger)
+        except Exception as e:
+            error = str(e)
+        seconds = time.perf_counter() - started
+        shutdown_logging()
+
+    steps, records, api_calls = _collect(METRICS.snapshot(), service)
+    return {
+        "service": service,
+        "scale": scale,
+        "seconds": round(seconds, 4),
+        "setup_seconds": round(setup_seconds, 4),
+        "steps": steps,
+        "records": records,
+        "api_calls": sum(api_calls.values()),
+        "api_calls_by_operation": api_calls,
+        # ru_maxrss is reported in KiB on Linux and in bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        "error": error,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_suite(services, scales, log_level):
+    results = []
+    for scale in scales:
+        for service in services:
+            command = [sys.executable, "-m", "benchmarks.bench_pipelines", "--worker", service, "--scale", str(scale), "--log-level", log_level]
+            completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+            if completed.returncode != 0 or not completed.stdout.strip():
+                result = {"service": service, "scale": scale, "error": (completed.stderr.strip().splitlines() or ["no output"])[-1]}
+            else:
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print_result(result)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+def print_result(result):
+    if "seconds" not in result:
+        print(f"{result['service']:7s} {result['scale']:>7d}  FAILED: {result['error']}")
+        return
+    steps = ", ".join(f"{k} {v:.2f}s" for k, v in result["steps"].items())
+    status = f"  ({result['error']})" if result["error"] else ""
+    print(
+        f"{result['service']:7s} {result['scale']:>7d}  {result['seconds']:8.2f}s  "
+        f"{result['api_calls']:>7d} API calls  {result['peak_rss_mb']:7.1f} MB RSS  [{steps}]{status}"
+    )
+
+# Flags every metric that got worse than the baseline by more than the threshold
+def compare(current, baseline, threshold):
+    previous = {(r["service"], r["scale"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["service"], result["scale"]))
+        if not before or "seconds" not in result or "seconds" not in before:
+            continue
+        for metric in ("seconds", "api_calls", "peak_rss_mb"):
+            old, new = before[metric], result[metric]
+            if old and new - old > NOISE_FLOOR[metric] and (new - old) / old > threshold:
+                regressions.append(f"{result['service']} @ {result['scale']}: {metric} {old} -> {new} (+{(new - old) / old:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every service pipeline against moto and a fixture Azure client")
+    parser.add_argument("--services", nargs="+", default=SERVICES, choices=SERVICES)
+    parser.add_argument("--scales", nargs="+", default=["small"], help="small, medium, large or a record count")
+    parser.add_argument("--output", help="write results as JSON (default: benchmarks/results/pipelines-<commit>.json)")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as a regression")
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--worker", choices=SERVICES, help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.scale, args.log_level)))
+        return
+
+    scales = [SCALES[s] if s in SCALES else int(s) for s in args.scales]
+    suite = run_suite(args.services, scales, args.log_level)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"pipelines-{suite['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(suite, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(suite, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
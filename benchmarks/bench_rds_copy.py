@@ -0,0 +1,68 @@
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from services.rds.data_copy import copy_database
+
+SCHEMA = "CREATE TABLE orders (id INTEGER PRIMARY KEY, customer TEXT, amount REAL, note TEXT)"
+
+def build_source(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    conn.executemany(
+        "INSERT INTO orders VALUES (?, ?, ?, ?)",
+        ((i, f"customer-{i % 997}", i * 0.25, None if i % 7 else "gift") for i in range(1, rows + 1)),
+    )
+    conn.commit()
+    conn.close()
+
+def build_target(path):
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    conn.commit()
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure RDS table copy throughput between SQLite databases")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    workdir = tempfile.mkdtemp(prefix="bench_rds_copy_")
+    try:
+        source = os.path.join(workdir, "source.db")
+        build_source(source, args.rows)
+        print(f"{args.rows} rows, chunks of {args.chunk_rows}")
+        for workers in args.workers:
+            for batch_size in args.batch_sizes:
+                target = os.path.join(workdir, f"target-{workers}-{batch_size}.db")
+                build_target(target)
+                copy = {
+                    "name": "bench",
+                    "source": {"driver": "sqlite3", "connect": {"database": source}},
+                    # SQLite serializes writers; the timeout lets them queue instead of failing
+                    "target": {"driver": "sqlite3", "connect": {"database": target, "timeout": 60}},
+                }
+                settings = {
+                    "max_workers": workers, "batch_size": batch_size, "chunk_rows": args.chunk_rows,
+                    "checkpoint_dir": os.path.join(workdir, f"checkpoints-{workers}-{batch_size}"),
+                }
+                started = time.perf_counter()
+                report = copy_database(copy, logger, settings)
+                seconds = time.perf_counter() - started
+                assert report["tables"]["orders"]["status"] == "copied", report
+                print(f"{workers:3d} workers  batch {batch_size:6d}  {seconds:7.2f}s  {report['rows'] / seconds:12,.0f} rows/s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_IMPORTS = (
+    "import importlib; from core.runner import SERVICE_REGISTRY; "
+    "[importlib.import_module(m) for m in SERVICE_REGISTRY.values()]"
+)
+
+SDK_CHECK = (
+    "import sys, runpy; sys.argv = ['main.py', '--list-services']; "
+    "runpy.run_path('main.py', run_name='__main__'); "
+    "print('sdk modules loaded:', sorted(m for m in ('boto3', 'botocore', 'azure') if m in sys.modules) or 'none')"
+)
+
+SCENARIOS = {
+    "interpreter": [sys.executable, "-c", "pass"],
+    "list-services": [sys.executable, "main.py", "--list-services"],
+    "s3 dry run": [sys.executable, "main.py", "--services", "s3", "--config", "config/default.yaml"],
+    "import every service module": [sys.executable, "-c", EAGER_IMPORTS],
+}
+
+def time_command(command, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), completed.returncode
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI start-up time with lazy service loading")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, command in SCENARIOS.items():
+        seconds, code = time_command(command, args.repeat)
+        status = "" if code == 0 else f" (exit {code})"
+        print(f"{name:42s} {seconds * 1000:8.1f} ms{status}")
+
+    check = subprocess.run([sys.executable, "-c", SDK_CHECK], cwd=ROOT, capture_output=True, text=True)
+    print(check.stdout.strip().splitlines()[-1] if check.stdout.strip() else check.stderr.strip())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import random
+import zipfile
+
+import yaml
+
+from benchmarks.bench_iam_action_mapping import PROVIDERS, RESOURCES, VERBS
+from services.iam.action_mapping import load_action_mapper, DEFAULT_ACTION_MAP_PATH
+
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+SUBSCRIPTION_ID = "00000000-0000-0000-0000-000000000000"
+ASSET_FILES = 16
+
+def _write_yaml(path, data):
+    with open(path, "w") as f:
+        yaml.dump(data, f, Dumper=Dumper, sort_keys=False)
+    return path
+
+# Actions that map to specific AWS actions, so generated roles pass the wildcard check in validation
+def _mappable_actions():
+    mapper = load_action_mapper(DEFAULT_ACTION_MAP_PATH)
+    vocabulary = []
+    for action in (f"{p}/{r}/{v}" for p in PROVIDERS for r in RESOURCES for v in VERBS):
+        mapped = mapper.lookup(action)
+        if mapped and not any(a == "*" or a.endswith(":*") for a in mapped):
+            vocabulary.append(action)
+    return vocabulary
+
+# Azure role definitions in the fixture format read by FixtureAuthorizationClient
+def iam_fixture(workdir, count, actions_per_role=6, seed=7):
+    rng = random.Random(seed)
+    vocabulary = _mappable_actions()
+    scope = f"/subscriptions/{SUBSCRIPTION_ID}"
+    roles = [
+        {
+            "id": f"{scope}/providers/Microsoft.Authorization/roleDefinitions/{i:08d}",
+            "role_name": f"Bench Role {i}",
+            "description": "synthetic benchmark role",
+            "permissions": [{"actions": rng.sample(vocabulary, actions_per_role)}],
+        }
+        for i in range(count)
+    ]
+    path = os.path.join(workdir, "azure_rbac.json")
+    with open(path, "w") as f:
+        json.dump({"role_definitions": {scope: roles}, "role_assignments": {scope: []}}, f)
+    return path
+
+# A small pool of source files shared by every object keeps disk usage flat at any scale
+def asset_files(workdir, size=4096):
+    directory = os.path.join(workdir, "assets")
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(ASSET_FILES):
+        path = os.path.join(directory, f"asset-{i}.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+def s3_inventory(workdir, count, objects_per_bucket=2, region="ap-south-1"):
+    assets = asset_files(workdir)
+    buckets = [
+        {
+            "name": f"bench-bucket-{i:06d}",
+            "region": region,
+            "acl": "private",
+            "tags": {"Project": "Benchmark"},
+            "objects": [
+                {"key": f"data/{j}.bin", "source": assets[(i + j) % len(assets)]}
+                for j in range(objects_per_bucket)
+            ],
+        }
+        for i in range(count)
+    ]
+    return _write_yaml(os.path.join(workdir, "s3_config.yaml"), {"buckets": buckets})
+
+def lambda_artifact(workdir):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("lambda_function.py", "def lambda_handler(event, context):\n    return event\n")
+    path = os.path.join(workdir, "lambda.zip")
+    with open(path, "wb") as f:
+        f.write(buffer.getvalue())
+    return path
+
+def lambda_inventory(workdir, count, role_arn):
+    artifact = lambda_artifact(workdir)
+    functions = [
+        {
+            "name": f"bench-function-{i:06d}",
+            "runtime": "python3.12",
+            "role_arn": role_arn,
+            "handler": "lambda_function.lambda_handler",
+            "artifact_path": artifact,
+            "timeout": 30,
+            "memory": 256,
+        }
+        for i in range(count)
+    ]
+    return _write_yaml(os.path.join(workdir, "lambda_config.yaml"), {"functions": functions})
+
+def rds_inventory(workdir, count, subnet_group):
+    instances = [
+        {
+            "name": f"bench-db-{i:06d}",
+            "engine": "postgres",
+            "username": "benchadmin",
+            "password": "benchmark-password",
+            "storage": 20,
+            "subnet_group": subnet_group,
+            "tags": {"Project": "Benchmark"},
+        }
+        for i in range(count)
+    ]
+    return _write_yaml(os.path.join(workdir, "rds_config.yaml"), {"instances": instances})
+
+def pipeline_inventory(workdir, count):
+    steps = [{"task": f"Step{i}", "script": f"make target-{i}"} for i in range(count)]
+    return _write_yaml(os.path.join(workdir, "azure_pipeline.yaml"), {"steps": steps})
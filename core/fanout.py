@@ -0,0 +1,181 @@
+import copy
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from core.runner import run_services, DEFAULT_MAX_WORKERS
+from core.verify import verify_services
+from utils.aws import get_client, use_target
+from utils.metrics import METRICS
+
+DEFAULT_FANOUT_SETTINGS = {
+    "role_name": "OrganizationAccountAccessRole",   # assumed in each account unless a target sets role_arn
+    "session_name": "azure-to-aws-migration",
+    "external_id": None,
+    "duration_seconds": 3600,
+    "max_targets": 8,             # targets migrated at the same time
+    "max_per_account": 2,         # of those, at most this many in one account
+    "state_dir": "logs/targets",  # per-target checkpoints and outputs
+    "targets": [],
+}
+
+# Settings that point at per-run state; every target gets its own copy under state_dir/<target>
+TARGET_STATE_PATHS = [
+    ("s3_transfer", "checkpoint_path"),
+    ("s3_transfer", "digest_cache_path"),
+    ("cicd", "output_dir"),
+    ("rds_data_copy", "checkpoint_dir"),
+    ("verification", "report_path"),
+]
+
+def load_fanout_settings(overrides=None):
+    settings = dict(DEFAULT_FANOUT_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def _account(value):
+    # Unquoted account ids are read from YAML as integers and lose their leading zeros
+    if value is None or value == "":
+        return None
+    return str(value).zfill(12) if isinstance(value, int) else str(value)
+
+# Builds the target matrix from config; names select a subset. Raises ValueError on
+# targets without a region, duplicate names and unknown names.
+def load_targets(settings, names=None):
+    targets = []
+    for entry in settings["targets"] or []:
+        account_id = _account(entry.get("account_id"))
+        if not entry.get("region"):
+            raise ValueError(f"Fan-out target {entry} has no region")
+        role_arn = entry.get("role_arn")
+        if not role_arn and account_id and not entry.get("profile"):
+            role_arn = f"arn:aws:iam::{account_id}:role/{settings['role_name']}"
+        targets.append({
+            "name": str(entry.get("name") or f"{account_id or 'default'}-{entry['region']}"),
+            "account_id": account_id,
+            "region": entry["region"],
+            "role_arn": role_arn,
+            "profile": entry.get("profile"),
+            "external_id": entry.get("external_id", settings["external_id"]),
+            "session_name": entry.get("session_name", settings["session_name"]),
+            "duration_seconds": entry.get("duration_seconds", settings["duration_seconds"]),
+            "overrides": entry.get("overrides") or {},
+        })
+
+    duplicates = [name for name, count in Counter(t["name"] for t in targets).items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate fan-out target names: {', '.join(duplicates)}")
+    if names:
+        unknown = sorted(set(names) - {t["name"] for t in targets})
+        if unknown:
+            raise ValueError(f"Unknown fan-out targets: {', '.join(unknown)}")
+        targets = [t for t in targets if t["name"] in names]
+    return targets
+
+def _merge(base, overrides):
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+def target_config(config, target, settings):
+    merged = _merge(copy.deepcopy(config), target["overrides"])
+    merged["region"] = target["region"]
+    for section, key in TARGET_STATE_PATHS:
+        value = (merged.get(section) or {}).get(key)
+        if value:
+            path = os.path.join(settings["state_dir"], target["name"], os.path.basename(value.rstrip("/")))
+            merged[section] = dict(merged[section], **{key: path})
+    return merged
+
+# Prefixes every message with the target name and adds it to the structured fields
+class TargetLogger(logging.LoggerAdapter):
+    def process(self, msg, kwargs):
+        extra = kwargs.setdefault("extra", {})
+        extra["fields"] = dict(extra.get("fields") or {}, target=self.extra["target"])
+        return f" [{self.extra['target']}]{msg}", kwargs
+
+# migrate=False with verify=True only verifies a target migrated by an earlier run
+def run_target(target, services, config, logger, settings, max_workers=DEFAULT_MAX_WORKERS, migrate=True, verify=False):
+    target_logger = TargetLogger(logger, {"target": target["name"]})
+    started = time.perf_counter()
+    results = {}
+    verification = None
+    error = None
+    with use_target(target):
+        try:
+            if target["role_arn"] and not config.get("dry_run"):
+                # Assume the role up front, so a missing trust relationship fails the target once
+                identity = get_client("sts").get_caller_identity()
+                target_logger.info(f" Assumed {target['role_arn']} (account {identity['Account']}, {target['region']})")
+            merged = target_config(config, target, settings)
+            if migrate:
+                results = run_services(services, merged, target_logger, max_workers)
+            if verify:
+                verification = verify_services(services, merged, target_logger, merged.get("verification"), max_workers)
+        except Exception as e:
+            error = str(e)
+            target_logger.error(f" Target failed: {e}")
+
+    finished = time.perf_counter()
+    if not migrate:
+        status = "completed" if error is None else "failed"
+    else:
+        status = "completed" if error is None and results and all(r["status"] == "completed" for r in results.values()) else "failed"
+    METRICS.inc("migration_targets_total", status=status)
+    return {
+        "account_id": target["account_id"],
+        "region": target["region"],
+        "status": status,
+        "error": error,
+        "started": started,
+        "finished": finished,
+        "duration": finished - started,
+        "services": results,
+        "verification": verification,
+    }
+
+# Runs the selected services for every target, at most max_targets at a time and at most
+# max_per_account per account; targets keep their configured order within those limits.
+def run_targets(targets, services, config, logger, settings=None, max_workers=DEFAULT_MAX_WORKERS, migrate=True, verify=False):
+    settings = load_fanout_settings(settings)
+    max_targets = max(1, settings["max_targets"] or len(targets) or 1)
+    per_account = settings["max_per_account"] or max_targets
+    pending = list(targets)
+    running = {}
+    active = Counter()
+    results = {}
+
+    logger.info(f" Fan-out over {len(targets)} targets (max {max_targets} at a time, {per_account} per account)")
+    with ThreadPoolExecutor(max_workers=max_targets) as pool:
+        while pending or running:
+            for target in list(pending):
+                if len(running) >= max_targets:
+                    break
+                account = target["account_id"] or target["name"]
+                if active[account] >= per_account:
+                    continue
+                pending.remove(target)
+                active[account] += 1
+                running[pool.submit(run_target, target, services, config, logger, settings, max_workers, migrate, verify)] = target
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                target = running.pop(future)
+                active[target["account_id"] or target["name"]] -= 1
+                results[target["name"]] = future.result()
+
+    for target in targets:
+        result = results[target["name"]]
+        logger.info(
+            f" {target['name']}: {result['status']} in {result['duration']:.2f}s",
+            extra={"fields": {"event": "target_result", "target": target["name"], "account_id": result["account_id"],
+                              "region": result["region"], "status": result["status"], "seconds": result["duration"]}}
+        )
+    failed = [name for name, result in results.items() if result["status"] != "completed"]
+    logger.info(f" Fan-out finished: {len(results) - len(failed)}/{len(results)} targets completed" + (f" (failed: {', '.join(failed)})" if failed else ""))
+    return {name: results[name] for name in (t["name"] for t in targets)}
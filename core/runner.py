@@ -1,22 +1,173 @@
-from services import iam, cicd, s3, lambda_service, rds
+import contextvars
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from importlib.metadata import entry_points
 
+from utils.metrics import METRICS
+
+# Service name -> module exposing run(config, logger). Modules are imported only when the
+# service is selected, so a run never pays for the SDKs of services it does not touch.
+# ("services.lambda.run" cannot be written as an import statement, but importlib can load it.)
 SERVICE_REGISTRY = {
-    "iam": iam.run,
-    "cicd": cicd.run,
-    "s3": s3.run,
-    "lambda": lambda_service.run,
-    "rds": rds.run,
+    "iam": "services.iam.run",
+    "cicd": "services.cicd.run",
+    "s3": "services.s3.run",
+    "lambda": "services.lambda.run",
+    "rds": "services.rds.run",
+}
+
+# Third-party services can register "name = package.module" (whose run is used) or
+# "name = package.module:callable" under this entry point group
+PLUGIN_ENTRY_POINT_GROUP = "migration_agent.services"
+
+# Services that must finish before the keyed service can start
+# (Lambda needs the IAM role_arn, CI/CD needs the S3 artifact bucket).
+SERVICE_DEPENDENCIES = {
+    "lambda": ["iam"],
+    "cicd": ["s3"],
 }
 
-def run_services(selected_services, config, logger):
+DEFAULT_MAX_WORKERS = 4
+
+_plugins_loaded = False
+_plugin_entry_points = {}
+_loaded_services = {}
+
+# SERVICE_REGISTRY keeps the plugin's module path (listed by --list-services, searched for
+# verify); the entry point itself is kept so load_service resolves the callable it names.
+def load_plugins():
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    for entry_point in entry_points(group=PLUGIN_ENTRY_POINT_GROUP):
+        if entry_point.name not in SERVICE_REGISTRY:
+            SERVICE_REGISTRY[entry_point.name] = entry_point.module
+            _plugin_entry_points[entry_point.name] = entry_point
+    _plugins_loaded = True
+
+def available_services():
+    load_plugins()
+    return dict(SERVICE_REGISTRY)
+
+def load_service(name):
+    if name not in _loaded_services:
+        entry_point = _plugin_entry_points.get(name)
+        if entry_point is not None and entry_point.attr:
+            _loaded_services[name] = entry_point.load()
+        else:
+            _loaded_services[name] = importlib.import_module(SERVICE_REGISTRY[name]).run
+    return _loaded_services[name]
+
+def build_dependency_graph(services):
+    graph = {}
+    for service in services:
+        graph[service] = [dep for dep in SERVICE_DEPENDENCIES.get(service, []) if dep in services]
+    return graph
+
+def critical_path(graph, results):
+    finished = {s: r for s, r in results.items() if r.get("finished") is not None}
+    if not finished:
+        return [], 0.0
+
+    path = []
+    current = max(finished, key=lambda s: finished[s]["finished"])
+    while current is not None:
+        path.append(current)
+        deps = [d for d in graph.get(current, []) if d in finished]
+        current = max(deps, key=lambda d: finished[d]["finished"]) if deps else None
+    path.reverse()
+
+    total = finished[path[-1]]["finished"] - finished[path[0]]["started"]
+    return path, total
+
+# Services log failed creates and uploads and carry on, so a run that returns normally can
+# still have failed; the error records logged through this adapter tell the runner.
+class ErrorCountingLogger(logging.LoggerAdapter):
+    def __init__(self, logger):
+        super().__init__(logger, {})
+        self.lock = threading.Lock()
+        self.errors = 0
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
+    def log(self, level, msg, *args, **kwargs):
+        if level >= logging.ERROR:
+            with self.lock:
+                self.errors += 1
+        super().log(level, msg, *args, **kwargs)
+
+def _run_service(service, config, logger):
+    started = time.perf_counter()
+    service_logger = ErrorCountingLogger(logger)
+    try:
+        logger.info(f" Starting migration for: {service}")
+        load_service(service)(config, service_logger)
+        if service_logger.errors:
+            logger.warning(f" Finished migration for: {service} with {service_logger.errors} errors")
+            status = "partial"
+        else:
+            logger.info(f" Completed migration for: {service}")
+            status = "completed"
+    except Exception as e:
+        logger.error(f" Error during {service} migration: {e}")
+        status = "failed"
+    finished = time.perf_counter()
+    METRICS.observe("migration_service_seconds", finished - started, service=service)
+    METRICS.inc("migration_services_total", service=service, status=status)
+    METRICS.inc("migration_service_errors_total", service_logger.errors, service=service)
+    return {"status": status, "errors": service_logger.errors, "started": started, "finished": finished, "duration": finished - started}
+
+def run_services(selected_services, config, logger, max_workers=DEFAULT_MAX_WORKERS):
+    load_plugins()
+    services = []
     for service in selected_services:
         service = service.lower().strip()
-        if service in SERVICE_REGISTRY:
-            try:
-                logger.info(f" Starting migration for: {service}")
-                SERVICE_REGISTRY[service](config, logger)
-                logger.info(f" Completed migration for: {service}")
-            except Exception as e:
-                logger.error(f" Error during {service} migration: {e}")
-        else:
-            logger.warning(f" Service '{service}' is not registered in the migration agent.")
\ No newline at end of file
+        if service not in SERVICE_REGISTRY:
+            logger.warning(f" Service '{service}' is not registered in the migration agent.")
+        elif service not in services:
+            services.append(service)
+
+    graph = build_dependency_graph(services)
+    remaining = {s: set(deps) for s, deps in graph.items()}
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while remaining or running:
+            for service in [s for s in services if s in remaining and not remaining[s]]:
+                del remaining[service]
+                # Each service thread inherits the caller's context, e.g. the fan-out target
+                running[pool.submit(contextvars.copy_context().run, _run_service, service, config, logger)] = service
+
+            if not running:
+                # Everything left is blocked on a dependency that did not complete
+                for service in list(remaining):
+                    logger.error(f" Skipping {service} migration: dependency did not complete ({', '.join(sorted(remaining[service]))})")
+                    results[service] = {"status": "skipped", "started": None, "finished": None, "duration": 0.0}
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                service = running.pop(future)
+                results[service] = future.result()
+                for waiting, deps in remaining.items():
+                    # A partial run still created resources, e.g. the IAM roles that Lambda needs
+                    if service in deps and results[service]["status"] in ("completed", "partial"):
+                        deps.discard(service)
+
+    for service in services:
+        result = results[service]
+        logger.info(
+            f" {service}: {result['status']} in {result['duration']:.2f}s",
+            extra={"fields": {"event": "service_result", "service": service, "status": result["status"], "seconds": result["duration"]}}
+        )
+
+    path, total = critical_path(graph, results)
+    if path:
+        logger.info(f" Critical path: {' -> '.join(path)} ({total:.2f}s)")
+
+    return results
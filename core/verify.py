@@ -0,0 +1,184 @@
+import contextvars
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from core.runner import available_services
+from utils.metrics import METRICS
+
+DEFAULT_VERIFY_SETTINGS = {
+    "max_workers": 16,            # concurrent read calls within one service
+    "checksums": True,            # compare S3 ETags, not only object sizes
+    "max_details": 200,           # drifted resources listed per service with their field values
+    "report_unexpected": False,   # report resources the inventory does not list (extra objects, functions, instances)
+    "report_path": "logs/reconciliation_report.json",
+}
+
+MATCHED = "matched"
+CHANGED = "changed"
+MISSING = "missing"
+UNEXPECTED = "unexpected"
+
+def load_verify_settings(overrides=None):
+    settings = dict(DEFAULT_VERIFY_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def _canonical(fields):
+    return json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+
+def fingerprint(fields):
+    return hashlib.blake2b(_canonical(fields).encode(), digest_size=16).digest()
+
+# Diff of one service's source inventory against what AWS reports. Expected resources are
+# registered first and kept only as a 16-byte fingerprint; observed resources are compared
+# as they are read and never stored. Counts are exact. Field details are listed for the first
+# max_details drifts, with the expected fields rebuilt by the callback the verifier registers
+# for that kind, since the fingerprint alone cannot be turned back into values.
+class Reconciliation:
+    def __init__(self, service, max_details=DEFAULT_VERIFY_SETTINGS["max_details"]):
+        self.service = service
+        self.max_details = max_details
+        self.lock = threading.Lock()
+        self.expected = {}
+        self.rebuilders = {}
+        self.seen = set()
+        self.counts = Counter()
+        self.kinds = Counter()
+        self.drift = []
+
+    def expect(self, kind, identifier, fields):
+        digest = fingerprint(fields)
+        with self.lock:
+            self.expected[(kind, identifier)] = digest
+
+    # rebuild(identifier) returns the fields passed to expect; it is only called for listed drifts
+    def rebuild(self, kind, rebuild):
+        self.rebuilders[kind] = rebuild
+
+    def _record(self, kind, identifier, status, actual=None):
+        self.counts[status] += 1
+        self.kinds[(kind, status)] += 1
+        if status == MATCHED or len(self.drift) >= self.max_details:
+            return
+        entry = {"kind": kind, "id": identifier, "status": status}
+        if status == CHANGED:
+            rebuild = self.rebuilders.get(kind)
+            expected = json.loads(_canonical(rebuild(identifier))) if rebuild else None
+            actual = json.loads(_canonical(actual))
+            if expected is None:
+                entry["actual"] = actual
+            else:
+                entry["fields"] = {
+                    field: {"expected": expected.get(field), "actual": actual.get(field)}
+                    for field in sorted(set(expected) | set(actual))
+                    if expected.get(field) != actual.get(field)
+                }
+        self.drift.append(entry)
+
+    # unexpected=False ignores resources outside the inventory, e.g. functions not migrated by this tool
+    def observe(self, kind, identifier, fields, unexpected=True):
+        digest = fingerprint(fields)
+        key = (kind, identifier)
+        with self.lock:
+            expected = self.expected.get(key)
+            if expected is None:
+                if unexpected:
+                    self._record(kind, identifier, UNEXPECTED)
+                return
+            if key in self.seen:
+                return
+            self.seen.add(key)
+            if expected == digest:
+                self._record(kind, identifier, MATCHED)
+            else:
+                self._record(kind, identifier, CHANGED, fields)
+
+    def result(self):
+        with self.lock:
+            for key in self.expected:
+                if key not in self.seen:
+                    self._record(*key, MISSING)
+                    self.seen.add(key)
+            kinds = {}
+            for (kind, status), count in sorted(self.kinds.items()):
+                kinds.setdefault(kind, {})[status] = count
+            drifted = self.counts[CHANGED] + self.counts[MISSING] + self.counts[UNEXPECTED]
+            return {
+                "status": "drift" if drifted else "ok",
+                "expected": len(self.expected),
+                MATCHED: self.counts[MATCHED],
+                CHANGED: self.counts[CHANGED],
+                MISSING: self.counts[MISSING],
+                UNEXPECTED: self.counts[UNEXPECTED],
+                "kinds": kinds,
+                "drift": list(self.drift),
+            }
+
+def load_verifier(service):
+    module = importlib.import_module(available_services()[service])
+    return getattr(module, "verify", None)
+
+def verify_service(service, config, logger, settings):
+    started = time.perf_counter()
+    reconciliation = Reconciliation(service, settings["max_details"])
+    try:
+        verifier = load_verifier(service)
+        if verifier is None:
+            logger.warning(f" {service} has no verification step")
+            return {"status": "skipped", "seconds": 0.0}
+        verifier(config, logger, reconciliation, settings)
+        result = reconciliation.result()
+    except Exception as e:
+        logger.error(f" Verification of {service} failed: {e}")
+        result = {"status": "error", "error": str(e)}
+    result["seconds"] = time.perf_counter() - started
+    METRICS.inc("migration_verify_total", service=service, status=result["status"])
+    for status in (MATCHED, CHANGED, MISSING, UNEXPECTED):
+        if result.get(status):
+            METRICS.inc("migration_verify_resources_total", result[status], service=service, status=status)
+    return result
+
+# Re-reads every selected service in parallel and compares it with the source inventory.
+# The report is written to settings["report_path"]; "drift" is true when any resource is
+# missing, changed or unexpected, or a service could not be verified.
+def verify_services(services, config, logger, settings=None, max_workers=4):
+    settings = load_verify_settings(settings)
+    known = available_services()
+    services = [s for s in dict.fromkeys(s.lower().strip() for s in services) if s in known]
+    logger.info(f" Verifying {', '.join(services)}...")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {
+            service: pool.submit(contextvars.copy_context().run, verify_service, service, config, logger, settings)
+            for service in services
+        }
+        results = {service: future.result() for service, future in futures.items()}
+
+    for service, result in results.items():
+        if result["status"] in ("ok", "drift"):
+            logger.info(
+                f" {service}: {result['status']}, {result['expected']} expected, {result[MATCHED]} matched, "
+                f"{result[CHANGED]} changed, {result[MISSING]} missing, {result[UNEXPECTED]} unexpected ({result['seconds']:.2f}s)",
+                extra={"fields": {"event": "verify_result", "service": service, "status": result["status"]}}
+            )
+        for entry in result.get("drift", [])[:10]:
+            details = ", ".join(f"{field}: {values['expected']!r} -> {values['actual']!r}" for field, values in entry.get("fields", {}).items())
+            logger.warning(f"   {entry['status']} {entry['kind']} {entry['id']}" + (f" ({details})" if details else ""))
+
+    drift = any(r["status"] in ("drift", "error") for r in results.values())
+    report = {"generated": time.time(), "drift": drift, "services": results}
+    if settings["report_path"]:
+        directory = os.path.dirname(settings["report_path"])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(settings["report_path"], "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        logger.info(f" Reconciliation report written to {settings['report_path']}")
+    logger.info(" Verification found drift" if drift else " Verification passed: AWS matches the source inventory")
+    return report
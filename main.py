@@ -1,38 +1,96 @@
 import argparse
-import logging
-import yaml
 import sys
-from core.runner import run_services
+from core.fanout import load_fanout_settings, load_targets, run_targets
+from core.runner import run_services, available_services, DEFAULT_MAX_WORKERS
+from core.verify import verify_services
+from utils.aws import configure_clients
+from utils.config_loader import read_yaml
+from utils.logging_setup import setup_logging, shutdown_logging
+from utils.metrics import load_metrics_settings, serve_prometheus, write_prometheus, write_summary
 
 def load_config(path):
     try:
-        with open(path, 'r') as f:
-            return yaml.safe_load(f) or {}
+        return read_yaml(path) or {}
     except Exception as e:
         print(f" Failed to load config file: {e}")
         sys.exit(1)
 
-def setup_logger():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
-    return logging.getLogger("MigrationAgent")
-
 def main():
     parser = argparse.ArgumentParser(description=" Azure-to-AWS Migration Agent")
-    parser.add_argument('--services', nargs='+', required=True, help='List of services to migrate (e.g., iam cicd s3)')
+    parser.add_argument('--services', nargs='+', help='List of services to migrate (e.g., iam cicd s3)')
+    parser.add_argument('--list-services', action='store_true', help='List the registered services and exit')
     parser.add_argument('--config', default='config/default.yaml', help='Path to config file')
+    parser.add_argument('--from-snapshot', help="Read Azure IAM data from a saved snapshot (path or 'latest') instead of calling Azure")
+    parser.add_argument('--plan', action='store_true', help='Compare the desired state with AWS and log the planned changes without applying them')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS, help='Maximum number of services to migrate in parallel')
+    parser.add_argument('--targets', nargs='*', metavar='NAME', help='Run the services for every fan-out target in the config, or only the named ones')
+    parser.add_argument('--verify', action='store_true', help='After migrating, compare what AWS reports with the source inventory and exit non-zero on drift')
+    parser.add_argument('--verify-only', action='store_true', help='Only verify an earlier migration of the selected services')
     args = parser.parse_args()
 
-    logger = setup_logger()
+    if args.list_services:
+        for name, module in sorted(available_services().items()):
+            print(f"{name}\t{module}")
+        return
+    if not args.services:
+        parser.error("--services is required")
+
     config = load_config(args.config)
+    logger = setup_logging(config.get("logging"))
+    if args.from_snapshot:
+        config["from_snapshot"] = args.from_snapshot
+    if args.plan:
+        config["plan_only"] = True
+
+    configure_clients(config.get("aws_clients"), region=config.get("region"))
+    metrics = load_metrics_settings(config.get("metrics"))
+    if metrics["prometheus_port"]:
+        serve_prometheus(metrics["prometheus_port"])
+        logger.info(f" Serving Prometheus metrics on :{metrics['prometheus_port']}/metrics")
 
     if config.get("dry_run"):
         logger.info(" Dry-run mode enabled. No changes will be applied.")
+    elif config.get("plan_only"):
+        logger.info(" Plan mode enabled. Current AWS state is read but no changes will be applied.")
 
-    run_services(args.services, config, logger)
+    targets = None
+    if args.targets is not None:
+        fanout = load_fanout_settings(config.get("fanout"))
+        try:
+            targets = load_targets(fanout, args.targets)
+        except ValueError as e:
+            logger.error(f" {e}")
+            shutdown_logging()
+            sys.exit(1)
+
+    verify = args.verify or args.verify_only
+    if args.verify and (config.get("dry_run") or config.get("plan_only")):
+        logger.info(" Skipping verification: nothing is deployed in dry-run or plan mode.")
+        verify = False
+
+    results = {}
+    drift = False
+    try:
+        if targets is not None:
+            results = run_targets(targets, args.services, config, logger, fanout, max_workers=args.max_workers, migrate=not args.verify_only, verify=verify)
+            drift = verify and any(r["verification"] is None or r["verification"]["drift"] for r in results.values())
+        else:
+            if not args.verify_only:
+                results = run_services(args.services, config, logger, max_workers=args.max_workers)
+            if verify:
+                drift = verify_services(args.services, config, logger, config.get("verification"), args.max_workers)["drift"]
+    finally:
+        try:
+            if metrics["summary_path"]:
+                write_summary(metrics["summary_path"], results, services_requested=args.services, dry_run=bool(config.get("dry_run")), fanout=targets is not None, drift=drift)
+                logger.info(f" Run summary written to {metrics['summary_path']}")
+            if metrics["prometheus_textfile"]:
+                write_prometheus(metrics["prometheus_textfile"])
+        except OSError as e:
+            logger.error(f" Failed to write run summary: {e}")
+        shutdown_logging()
+    if drift:
+        sys.exit(2)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,22 +1,18 @@
 
 from utils.config_loader import load_yaml_config
-from services.iam.run import run as run_iam
-from services.s3.run import run as run_s3
-from services.lambda.run import run as run_lambda
-from services.rds.run import run as run_rds
-from services.cicd.run import run as run_cicd
-import logging
-
-# Setup logger
-logging.basicConfig(filename='logs/migration_agent.log', level=logging.INFO)
-logger = logging.getLogger("migration_agent")
+from core.runner import load_service
+from utils.aws import configure_clients
+from utils.logging_setup import setup_logging, shutdown_logging
 
 # Load default config
-config = load_yaml_config("config/default.yaml", logger)
+config = load_yaml_config("config/default.yaml")
+
+# Setup logger
+logger = setup_logging(dict(config.get("logging") or {}, console=False, destination="logs/migration_agent.log"), "migration_agent")
+configure_clients(config.get("aws_clients"), region=config.get("region"))
 
 # Run modules
-run_iam(config, logger)
-run_s3(config, logger)
-run_lambda(config, logger)
-run_rds(config, logger)
-run_cicd(config, logger)
\ No newline at end of file
+for service in ["iam", "s3", "lambda", "rds", "cicd"]:
+    load_service(service)(config, logger)
+
+shutdown_logging()
\ No newline at end of file
@@ -0,0 +1,655 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import time
+
+import yaml
+
+from utils.config_loader import SafeLoader, load_yaml_config
+from utils.metrics import METRICS
+from utils.parallel import map_chunks
+
+DEFAULT_CICD_SETTINGS = {
+    "pipeline_name": "MigratedPipeline",
+    "role_arn": "arn:aws:iam::{account_id}:role/CodePipelineServiceRole",  # {account_id}: the target account
+    "artifact_bucket": "your-artifact-bucket",
+    "source": None,                   # {"provider", "owner", "configuration"} of the Source action
+    "variable_groups_path": None,     # YAML with groups: {group name: {variable: value}}
+    "template_repositories": {},      # repository alias or name -> local checkout, for "file@alias" templates
+    "pipelines_dir": None,            # batch mode: convert every pipeline file below this directory
+    "pipeline_files": ["azure-pipelines.yml", "azure-pipelines.yaml"],
+    "output_dir": None,               # converted pipelines, buildspecs and the batch report
+}
+
+def load_cicd_settings(overrides=None):
+    settings = dict(DEFAULT_CICD_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+MISSING = object()
+EXPRESSION = re.compile(r"\$\{\{\s*(.*?)\s*\}\}")
+MACRO = re.compile(r"\$\(([A-Za-z_][\w.]*)\)")
+
+# Azure DevOps predefined variables with a CodeBuild equivalent
+PREDEFINED_VARIABLES = {
+    "build.sourcesdirectory": "${CODEBUILD_SRC_DIR}",
+    "build.repository.localpath": "${CODEBUILD_SRC_DIR}",
+    "system.defaultworkingdirectory": "${CODEBUILD_SRC_DIR}",
+    "pipeline.workspace": "${CODEBUILD_SRC_DIR}",
+    "build.artifactstagingdirectory": "${CODEBUILD_SRC_DIR}/artifacts",
+    "build.binariesdirectory": "${CODEBUILD_SRC_DIR}/bin",
+    "build.sourceversion": "${CODEBUILD_RESOLVED_SOURCE_VERSION}",
+    "build.buildid": "${CODEBUILD_BUILD_NUMBER}",
+    "build.buildnumber": "${CODEBUILD_BUILD_NUMBER}",
+    "agent.tempdirectory": "${TMPDIR:-/tmp}",
+}
+
+# Shared templates are read and parsed once per content hash, and expanded once per
+# path, content hash, repository root and parameter set. Expansions are shared between
+# pipelines, so nothing downstream may modify them.
+class TemplateCache:
+    def __init__(self):
+        self.digests = {}
+        self.documents = {}
+        self.expanded = {}
+        self.stats = {"parsed": 0, "expanded": 0, "hits": 0}
+
+    def load(self, path):
+        stat = os.stat(path)
+        stamp = (path, stat.st_size, stat.st_mtime_ns)
+        digest = self.digests.get(stamp)
+        if digest is None:
+            with open(path, "rb") as f:
+                content = f.read()
+            digest = self.digests[stamp] = hashlib.sha256(content).hexdigest()
+            if digest not in self.documents:
+                self.documents[digest] = yaml.load(content, Loader=SafeLoader) or {}
+                self.stats["parsed"] += 1
+        return digest, self.documents[digest]
+
+def _text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+def _lookup(expression, namespace, scope):
+    match = re.fullmatch(rf"{namespace}(?:\.([\w-]+)|\[\s*'([^']+)'\s*\])((?:\.[\w-]+)*)", expression, re.IGNORECASE)
+    if not match:
+        return MISSING
+    value = scope.get((match.group(1) or match.group(2)).lower(), MISSING)
+    for attribute in filter(None, match.group(3).split(".")):
+        value = value.get(attribute, MISSING) if isinstance(value, dict) else MISSING
+    return value
+
+def _is_directive(key):
+    return isinstance(key, str) and key.lstrip().startswith("${{")
+
+# Replaces ${{ parameters.x }} (or ${{ variables.x }}) expressions. A value that is a single
+# expression keeps the type of what it refers to, so step lists can be passed as parameters.
+# Conditional and loop directives are not evaluated; they are dropped with a warning.
+def render(value, namespace, scope, warnings):
+    if isinstance(value, str):
+        def replace(match):
+            result = _lookup(match.group(1), namespace, scope)
+            if result is not MISSING:
+                return _text(result)
+            if match.group(1).lower().startswith(namespace):
+                warnings.append(f"Undefined {namespace} reference '{match.group(1)}'")
+                return ""
+            if namespace == "variables":
+                warnings.append(f"Unsupported template expression '{match.group(0)}' left as is")
+            return match.group(0)
+
+        whole = EXPRESSION.fullmatch(value.strip())
+        if whole:
+            result = _lookup(whole.group(1), namespace, scope)
+            if result is not MISSING:
+                return result
+        return EXPRESSION.sub(replace, value)
+    if isinstance(value, dict):
+        rendered = {}
+        for key, item in value.items():
+            if _is_directive(key):
+                warnings.append(f"Unsupported template directive '{key}' dropped")
+                continue
+            rendered[key] = render(item, namespace, scope, warnings)
+        return rendered
+    if isinstance(value, list):
+        rendered = []
+        for item in value:
+            result = render(item, namespace, scope, warnings)
+            if isinstance(item, dict) and item and not result:
+                continue
+            if isinstance(item, str) and isinstance(result, list):
+                rendered.extend(result)
+            else:
+                rendered.append(result)
+        return rendered
+    return value
+
+def _parameters(declared, passed):
+    values = {}
+    if isinstance(declared, list):
+        for parameter in declared:
+            if isinstance(parameter, dict) and "name" in parameter:
+                values[str(parameter["name"]).lower()] = parameter.get("default")
+    elif isinstance(declared, dict):
+        values.update({str(k).lower(): v for k, v in declared.items()})
+    values.update({str(k).lower(): v for k, v in (passed or {}).items()})
+    return values
+
+def _job_steps(job):
+    if job.get("steps") is not None:
+        return job["steps"]
+    strategy = job.get("strategy") or {}
+    for name in ("runOnce", "rolling", "canary"):
+        if isinstance(strategy.get(name), dict):
+            return ((strategy[name].get("deploy") or {}).get("steps")) or []
+    return []
+
+# Expands template references in one pipeline. Paths are relative to the including file,
+# "/path" is relative to the repository root and "path@alias" is looked up in
+# template_repositories, by the alias or by the repository name under resources.
+class TemplateExpander:
+    def __init__(self, cache, repositories, warnings):
+        self.cache = cache
+        self.repositories = repositories
+        self.warnings = warnings
+        self.stack = []
+
+    def pipeline(self, document, base_dir, repo_root):
+        document = render(document, "parameters", _parameters(document.get("parameters"), None), self.warnings)
+        return self._body(document, base_dir, repo_root)
+
+    def _body(self, document, base_dir, repo_root):
+        variables = self.items(document.get("variables"), "variables", base_dir, repo_root)
+        extends = document.get("extends")
+        if isinstance(extends, dict) and extends.get("template"):
+            template = self.template(extends["template"], extends.get("parameters"), "pipeline", base_dir, repo_root)
+            return {"variables": variables + template["variables"], "stages": template["stages"]}
+        if document.get("stages") is not None:
+            stages = self.items(document["stages"], "stages", base_dir, repo_root)
+        elif document.get("jobs") is not None:
+            stages = [{"stage": "Build", "jobs": self.items(document["jobs"], "jobs", base_dir, repo_root)}]
+        else:
+            stages = [{"stage": "Build", "jobs": [
+                {"job": "Job", "steps": self.items(document.get("steps"), "steps", base_dir, repo_root)}
+            ]}]
+        return {"variables": variables, "stages": stages}
+
+    def items(self, items, kind, base_dir, repo_root):
+        if isinstance(items, dict) and kind == "variables":
+            items = [{"name": k, "value": v} for k, v in items.items()]
+        expanded = []
+        for item in items or []:
+            if not isinstance(item, dict):
+                self.warnings.append(f"Ignored {kind} entry {item!r}")
+            elif any(_is_directive(key) for key in item):
+                self.warnings.append(f"Unsupported template directive '{next(iter(item))}' in {kind} dropped")
+            elif "template" in item:
+                expanded.extend(self.template(item["template"], item.get("parameters"), kind, base_dir, repo_root))
+            elif kind == "stages":
+                expanded.append(dict(item,
+                    jobs=self.items(item.get("jobs"), "jobs", base_dir, repo_root),
+                    variables=self.items(item.get("variables"), "variables", base_dir, repo_root)))
+            elif kind == "jobs":
+                expanded.append(dict(item,
+                    steps=self.items(_job_steps(item), "steps", base_dir, repo_root),
+                    variables=self.items(item.get("variables"), "variables", base_dir, repo_root)))
+            else:
+                expanded.append(item)
+        return expanded
+
+    def _resolve(self, reference, base_dir, repo_root):
+        path, _, alias = str(reference).partition("@")
+        if alias and alias != "self":
+            root = self.repositories.get(alias)
+            if root is None:
+                return None, None
+            return os.path.normpath(os.path.join(root, path.lstrip("/"))), root
+        if alias or path.startswith("/"):
+            return os.path.normpath(os.path.join(repo_root, path.lstrip("/"))), repo_root
+        return os.path.normpath(os.path.join(base_dir, path)), repo_root
+
+    def template(self, reference, parameters, kind, base_dir, repo_root):
+        empty = {"variables": [], "stages": []} if kind == "pipeline" else []
+        path, root = self._resolve(reference, base_dir, repo_root)
+        if path is None:
+            self.warnings.append(f"Template repository for '{reference}' is not in template_repositories")
+            return empty
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            self.warnings.append(f"Template not found: {reference} ({path})")
+            return empty
+        if path in self.stack:
+            self.warnings.append(f"Recursive template reference: {reference}")
+            return empty
+
+        digest, document = self.cache.load(path)
+        key = (path, digest, kind, root, json.dumps(parameters or {}, sort_keys=True, default=str))
+        cached = self.cache.expanded.get(key)
+        if cached is not None:
+            self.cache.stats["hits"] += 1
+        else:
+            outer, self.warnings = self.warnings, []
+            self.stack.append(path)
+            try:
+                document = render(document, "parameters", _parameters(document.get("parameters"), parameters), self.warnings)
+                template_dir = os.path.dirname(path)
+                if kind == "pipeline":
+                    value = self._body(document, template_dir, root)
+                else:
+                    if document.get(kind) is None:
+                        self.warnings.append(f"Template {reference} has no {kind}")
+                    value = self.items(document.get(kind), kind, template_dir, root)
+                cached = self.cache.expanded[key] = (value, [f"{reference}: {w}" for w in self.warnings])
+                self.cache.stats["expanded"] += 1
+            finally:
+                self.stack.pop()
+                self.warnings = outer
+        self.warnings.extend(cached[1])
+        return cached[0]
+
+def resolve_variables(items, groups, warnings, inherited=None):
+    values = dict(inherited or {})
+    for item in items or []:
+        if "group" in item:
+            group = groups.get(item["group"])
+            if group is None:
+                warnings.append(f"Variable group '{item['group']}' is not defined in the variable groups file")
+                continue
+            values.update({str(k): _text(v) for k, v in group.items()})
+        elif "name" in item:
+            values[str(item["name"])] = _text(item.get("value"))
+    return values
+
+def env_name(name):
+    return re.sub(r"[^A-Za-z0-9_]", "_", name).upper()
+
+def identifier(name, limit=100):
+    return (re.sub(r"[^A-Za-z0-9.@_-]+", "-", str(name)).strip("-") or "Unnamed")[:limit]
+
+def _unique(name, used):
+    candidate, index = name, 2
+    while candidate in used:
+        candidate = f"{name}-{index}"
+        index += 1
+    used.add(candidate)
+    return candidate
+
+def _depends(item, default):
+    value = item.get("dependsOn", MISSING)
+    if value is MISSING:
+        return list(default)
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+# Level of each node in the dependsOn graph: nodes without dependencies get 1, every
+# other node one more than its deepest dependency. Unknown names and cycles are ignored.
+def dependency_levels(names, dependencies, warnings, label):
+    graph = dict(zip(names, dependencies))
+    levels = {}
+
+    def level(name, visiting):
+        if name in levels:
+            return levels[name]
+        visiting.add(name)
+        deepest = 0
+        for dependency in graph[name]:
+            if dependency not in graph:
+                warnings.append(f"{label} '{name}' depends on unknown {label} '{dependency}'")
+            elif dependency in visiting:
+                warnings.append(f"{label} '{name}' has a circular dependency on '{dependency}'")
+            else:
+                deepest = max(deepest, level(dependency, visiting))
+        visiting.discard(name)
+        levels[name] = deepest + 1
+        return levels[name]
+
+    for name in names:
+        level(name, set())
+    return levels
+
+# Escapes everything a double-quoted shell string would expand, "$" included, so the text is literal
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("`", "\\`").replace("$", "\\$")
+
+def _inline(shell, script):
+    return f"{shell} - <<'AZURE_SCRIPT'\n{script}\nAZURE_SCRIPT"
+
+# Built-in Azure DevOps tasks with a direct shell equivalent; inputs are keyed in lower case
+TASK_CONVERTERS = {
+    "cmdline": lambda i: i.get("script", ""),
+    "bash": lambda i: f"bash {i['filepath']} {i.get('arguments', '')}".strip() if i.get("targettype", "").lower() == "filepath" else i.get("script", ""),
+    "shellscript": lambda i: f"bash {i.get('scriptpath', '')} {i.get('args', '')}".strip(),
+    "powershell": lambda i: f"pwsh -NoProfile -File {i['filepath']} {i.get('arguments', '')}".strip() if i.get("targettype", "").lower() == "filepath" else _inline("pwsh -NoProfile -Command", i.get("script", "")),
+    "npm": lambda i: f"npm {i.get('customcommand', '')}" if i.get("command") == "custom" else f"npm {i.get('command', 'install')}",
+    "dotnetcorecli": lambda i: " ".join(filter(None, ["dotnet", i.get("command", "build"), i.get("projects", ""), i.get("arguments", "")])),
+    "maven": lambda i: " ".join(filter(None, ["mvn", "-f", i.get("mavenpomfile", "pom.xml"), i.get("goals", "package"), i.get("options", "")])),
+    "gradle": lambda i: " ".join(filter(None, [i.get("gradlewrapperfile", "./gradlew"), i.get("tasks", "build"), i.get("options", "")])),
+    "docker": lambda i: " ".join(filter(None, ["docker", "build", "-f", i.get("dockerfile", "Dockerfile"), "-t", i.get("repository", "image"), i.get("buildcontext", ".")])) if i.get("command", "build") in ("build", "buildAndPush") else f"docker {i.get('command')} {i.get('arguments', '')}".strip(),
+}
+RUNTIME_TASKS = {"usepythonversion": "python", "usenode": "nodejs", "nodetool": "nodejs", "usedotnet": "dotnet", "javatoolinstaller": "java"}
+ARTIFACT_TASKS = {"publishbuildartifacts": "pathtopublish", "publishpipelineartifact": "targetpath"}
+IGNORED_TASKS = {"downloadbuildartifacts", "downloadpipelineartifact"}
+
+# Returns (command, artifact path, runtime, warning) for one expanded step
+def _step(step):
+    for key in ("script", "bash"):
+        if key in step:
+            return step[key] or "", None, None, None
+    for key in ("pwsh", "powershell"):
+        if key in step:
+            return _inline("pwsh -NoProfile -Command", step[key] or ""), None, None, None
+    if "publish" in step:
+        return None, step["publish"], None, None
+    if "checkout" in step or "download" in step:
+        return None, None, None, None
+    if "task" not in step:
+        return None, None, None, f"Unrecognised step {sorted(step)}"
+
+    task = str(step["task"])
+    name = task.partition("@")[0].lower()
+    inputs = {str(k).lower(): _text(v) for k, v in (step.get("inputs") or {}).items()}
+    if name in TASK_CONVERTERS:
+        return TASK_CONVERTERS[name](inputs), None, None, None
+    if name in RUNTIME_TASKS:
+        version = inputs.get("versionspec") or inputs.get("version") or "latest"
+        return None, None, (RUNTIME_TASKS[name], version.rstrip(".x") or "latest"), None
+    if name in ARTIFACT_TASKS:
+        return None, inputs.get(ARTIFACT_TASKS[name]) or inputs.get("path") or ".", None, None
+    if name in IGNORED_TASKS:
+        return None, None, None, None
+    # Fail the build instead of silently skipping work the pipeline used to do
+    return f'echo "Azure DevOps task {task} has no CodeBuild equivalent" && exit 1', None, None, f"Unsupported task {task}"
+
+# Runs in worker processes for large jobs, so it takes and returns plain JSON data.
+# $(var) macros become environment variable references; CodeBuild exports the job's
+# variables through the buildspec. Unresolved macros are passed through with a warning
+# (in step env and working directories they stay literal, as Azure would leave them).
+def convert_steps(steps, variables):
+    scope = {k.lower(): v for k, v in variables.items()}
+    names = {k.lower(): env_name(k) for k in variables}
+    result = {"commands": [], "artifacts": [], "runtimes": {}, "warnings": []}
+    unresolved = set()
+
+    def reference(name):
+        name = name.lower()
+        if name in names:
+            return "${" + names[name] + "}"
+        return PREDEFINED_VARIABLES.get(name)
+
+    def unresolved_macro(match):
+        if match.group(1).lower() not in unresolved:
+            unresolved.add(match.group(1).lower())
+            result["warnings"].append(f"Macro {match.group(0)} has no value in this pipeline or its variable groups; it is passed through unchanged")
+        return match.group(0)
+
+    def macros(text):
+        return MACRO.sub(lambda m: reference(m.group(1)) or unresolved_macro(m), text)
+
+    # Double-quoted value in which only resolved macros expand
+    def quoted_macros(text):
+        parts, last = [], 0
+        for match in MACRO.finditer(text):
+            parts.append(_escape(text[last:match.start()]))
+            parts.append(reference(match.group(1)) or _escape(unresolved_macro(match)))
+            last = match.end()
+        parts.append(_escape(text[last:]))
+        return '"' + "".join(parts) + '"'
+
+    for step in steps:
+        if step.get("enabled", True) is False:
+            continue
+        step = render(step, "variables", scope, result["warnings"])
+        command, artifact, runtime, warning = _step(step)
+        if warning:
+            result["warnings"].append(warning)
+        if artifact:
+            result["artifacts"].append(macros(artifact))
+        if runtime:
+            result["runtimes"][runtime[0]] = runtime[1]
+        if not command:
+            continue
+        command = macros(command)
+        inputs = {str(k).lower(): v for k, v in (step.get("inputs") or {}).items()}
+        prefix = [f"export {env_name(str(k))}={quoted_macros(_text(v))}" for k, v in (step.get("env") or {}).items()]
+        directory = step.get("workingDirectory") or inputs.get("workingdirectory") or inputs.get("workingdir")
+        if directory:
+            prefix.append(f"cd {quoted_macros(_text(directory))}")
+        result["commands"].append("(\n" + "\n".join(prefix + [command]) + "\n)" if prefix else command)
+    return result
+
+def buildspec(commands, variables, runtimes, artifacts):
+    spec = {"version": 0.2}
+    if variables:
+        spec["env"] = {"variables": {env_name(k): v for k, v in variables.items()}}
+    spec["phases"] = {}
+    if runtimes:
+        spec["phases"]["install"] = {"runtime-versions": runtimes}
+    spec["phases"]["build"] = {"commands": commands or ["echo 'No steps to run'"]}
+    if artifacts:
+        # Artifact paths in a buildspec are relative to the source directory
+        paths = [re.sub(r"^\$\{CODEBUILD_SRC_DIR\}/?", "", path).rstrip("/") for path in artifacts]
+        spec["artifacts"] = {"files": [f"{path}/**/*" if path else "**/*" for path in paths]}
+    return spec
+
+# Multi-line commands are written as literal blocks, so scripts stay readable in the buildspec
+class _BuildspecDumper(yaml.SafeDumper):
+    pass
+
+_BuildspecDumper.add_representer(str, lambda dumper, value: dumper.represent_scalar(
+    "tag:yaml.org,2002:str", value, style="|" if "\n" in value else None))
+
+# Converts expanded Azure DevOps pipelines into a CodePipeline definition plus one CodeBuild
+# buildspec per job. Stages keep their dependsOn order; jobs in a stage become parallel
+# actions whose runOrder follows their dependsOn graph.
+class PipelineConverter:
+    def __init__(self, settings=None, variable_groups=None, cache=None):
+        self.settings = load_cicd_settings(settings)
+        self.groups = variable_groups or {}
+        self.cache = cache or TemplateCache()
+
+    def _repositories(self, document):
+        local = self.settings["template_repositories"] or {}
+        repositories = {alias: os.path.abspath(path) for alias, path in local.items()}
+        for repository in ((document.get("resources") or {}).get("repositories") or []):
+            alias = repository.get("repository")
+            path = local.get(alias) or local.get(repository.get("name"))
+            if alias and path:
+                repositories[alias] = os.path.abspath(path)
+        return repositories
+
+    def convert_file(self, path, name=None, repo_root=None, parallel=None):
+        _, document = self.cache.load(os.path.abspath(path))
+        return self.convert(document, name, os.path.dirname(os.path.abspath(path)), repo_root or find_repo_root(path), parallel)
+
+    def convert(self, document, name=None, base_dir=".", repo_root=None, parallel=None):
+        warnings = []
+        expander = TemplateExpander(self.cache, self._repositories(document), warnings)
+        expanded = expander.pipeline(document, base_dir, repo_root or base_dir)
+        pipeline_name = identifier(name or self.settings["pipeline_name"])
+        variables = resolve_variables(expanded["variables"], self.groups, warnings)
+
+        stages = expanded["stages"]
+        names = [str(s.get("stage") or f"Stage{i + 1}") for i, s in enumerate(stages)]
+        # Stages depend on the previous stage unless dependsOn says otherwise. CodePipeline
+        # runs stages one after another, so independent stages are ordered by level.
+        levels = dependency_levels(names, [_depends(s, names[i - 1:i]) for i, s in enumerate(stages)], warnings, "stage")
+
+        aws_stages = []
+        source = self.settings["source"]
+        if source:
+            aws_stages.append({"name": "Source", "actions": [{
+                "name": "Source",
+                "actionTypeId": {"category": "Source", "owner": source.get("owner", "AWS"), "provider": source["provider"], "version": str(source.get("version", "1"))},
+                "runOrder": 1,
+                "configuration": source.get("configuration", {}),
+                "outputArtifacts": [{"name": "SourceOutput"}],
+            }]})
+
+        projects = []
+        used_stages, used_projects = {"Source"} if source else set(), set()
+        for index in sorted(range(len(stages)), key=lambda i: (levels[names[i]], i)):
+            stage, stage_name = stages[index], names[index]
+            stage_variables = resolve_variables(stage.get("variables"), self.groups, warnings, variables)
+            jobs = stage.get("jobs") or []
+            job_names = [str(j.get("job") or j.get("deployment") or f"Job{k + 1}") for k, j in enumerate(jobs)]
+            job_levels = dependency_levels(job_names, [_depends(j, []) for j in jobs], warnings, "job")
+
+            actions, used_actions = [], set()
+            for job, job_name in zip(jobs, job_names):
+                if (job.get("strategy") or {}).get("matrix") or (job.get("strategy") or {}).get("parallel"):
+                    warnings.append(f"{stage_name}/{job_name}: matrix and parallel strategies are converted to a single action")
+                job_variables = resolve_variables(job.get("variables"), self.groups, warnings, stage_variables)
+                steps = {"commands": [], "artifacts": [], "runtimes": {}}
+                for chunk in map_chunks(convert_steps, job.get("steps") or [], parallel, job_variables):
+                    steps["commands"].extend(chunk["commands"])
+                    steps["artifacts"].extend(chunk["artifacts"])
+                    steps["runtimes"].update(chunk["runtimes"])
+                    warnings.extend(f"{stage_name}/{job_name}: {w}" for w in chunk["warnings"])
+
+                action_name = _unique(identifier(job_name), used_actions)
+                project = _unique(re.sub(r"[^A-Za-z0-9_-]", "-", f"{pipeline_name}-{stage_name}-{job_name}")[:255], used_projects)
+                action = {
+                    "name": action_name,
+                    "actionTypeId": {"category": "Build", "owner": "AWS", "provider": "CodeBuild", "version": "1"},
+                    "runOrder": job_levels[job_name],
+                    "configuration": {"ProjectName": project},
+                    "inputArtifacts": [{"name": "SourceOutput"}],
+                }
+                if steps["artifacts"]:
+                    action["outputArtifacts"] = [{"name": re.sub(r"[^A-Za-z0-9_-]", "_", f"{stage_name}_{action_name}")[:100]}]
+                actions.append(action)
+                projects.append({"name": project, "buildspec": buildspec(steps["commands"], job_variables, steps["runtimes"], steps["artifacts"])})
+
+            if not actions:
+                warnings.append(f"Stage '{stage_name}' has no jobs and was skipped")
+                continue
+            aws_stages.append({"name": _unique(identifier(stage_name), used_stages), "actions": actions})
+
+        return {
+            "name": pipeline_name,
+            "pipeline": {
+                "name": pipeline_name,
+                "roleArn": self.settings["role_arn"],
+                "artifactStore": {"type": "S3", "location": self.settings["artifact_bucket"]},
+                "stages": aws_stages,
+            },
+            "build_projects": projects,
+            "warnings": warnings,
+        }
+
+def load_variable_groups(path, logger=None):
+    if not path:
+        return {}
+    return load_yaml_config(path, logger).get("groups") or {}
+
+def find_repo_root(path, stop=None):
+    directory = os.path.dirname(os.path.abspath(path))
+    stop = os.path.abspath(stop) if stop else None
+    current = directory
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if current == stop or parent == current:
+            break
+        current = parent
+    # Without a .git marker, the first directory below the batch root is taken as the repository
+    if stop and directory != stop:
+        return os.path.join(stop, os.path.relpath(directory, stop).split(os.sep)[0])
+    return directory
+
+def find_pipeline_files(root, patterns):
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if d not in (".git", "node_modules"))
+        for name in sorted(files):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                yield os.path.join(directory, name)
+
+def pipeline_name(path, root):
+    relative = os.path.splitext(os.path.relpath(path, root))[0]
+    relative = re.sub(r"(^|[\\/])azure-pipelines$", "", relative)
+    return identifier(relative.replace(os.sep, "-")) if relative else None
+
+# Runs in worker processes for large batches. All files of one chunk share a template
+# cache; the cache statistics are returned with the per-file results.
+def convert_files(paths, root, settings, variable_groups):
+    converter = PipelineConverter(settings, variable_groups)
+    files = []
+    for path in paths:
+        started = time.perf_counter()
+        entry = {"path": os.path.relpath(path, root), "name": pipeline_name(path, root)}
+        try:
+            conversion = converter.convert_file(path, entry["name"], find_repo_root(path, root), {"processes": 1})
+            entry.update(status="ok", conversion=conversion, warnings=conversion["warnings"],
+                         stages=len(conversion["pipeline"]["stages"]),
+                         actions=sum(len(s["actions"]) for s in conversion["pipeline"]["stages"]))
+        except Exception as e:
+            entry.update(status="failed", error=f"{type(e).__name__}: {e}", warnings=[])
+        entry["seconds"] = round(time.perf_counter() - started, 6)
+        files.append(entry)
+    return {"files": files, "templates": converter.cache.stats}
+
+def write_conversion(conversion, output_dir):
+    directory = os.path.join(output_dir, conversion["name"])
+    os.makedirs(os.path.join(directory, "buildspecs"), exist_ok=True)
+    with open(os.path.join(directory, "pipeline.json"), "w") as f:
+        json.dump(conversion["pipeline"], f, indent=2)
+    for project in conversion["build_projects"]:
+        with open(os.path.join(directory, "buildspecs", f"{project['name']}.yml"), "w") as f:
+            yaml.dump(project["buildspec"], f, Dumper=_BuildspecDumper, sort_keys=False)
+    return directory
+
+# Batch mode: converts every pipeline file below root in one pass, logs the time per file
+# and writes conversion_report.json to output_dir when one is set.
+def convert_directory(root, logger, settings=None, parallel=None):
+    settings = load_cicd_settings(settings)
+    groups = load_variable_groups(settings["variable_groups_path"], logger)
+    paths = list(find_pipeline_files(root, settings["pipeline_files"]))
+    logger.info(f" Converting {len(paths)} Azure DevOps pipelines under {root}")
+
+    started = time.perf_counter()
+    files, templates = [], {"parsed": 0, "expanded": 0, "hits": 0}
+    for chunk in map_chunks(convert_files, paths, parallel, root, settings, groups):
+        files.extend(chunk["files"])
+        for key, value in chunk["templates"].items():
+            templates[key] += value
+    seconds = time.perf_counter() - started
+
+    for entry in files:
+        METRICS.observe("migration_cicd_conversion_seconds", entry["seconds"])
+        METRICS.inc("migration_records_total", service="cicd", stage="converted" if entry["status"] == "ok" else "failed")
+        if entry["status"] != "ok":
+            logger.error(f" Failed to convert {entry['path']}: {entry['error']}")
+            continue
+        logger.info(f" Converted {entry['path']} -> {entry['name']}: {entry['stages']} stages, {entry['actions']} actions in {entry['seconds'] * 1000:.1f} ms")
+        for warning in entry["warnings"]:
+            logger.warning(f" {entry['name']}: {warning}")
+
+    report = {
+        "root": root,
+        "seconds": round(seconds, 6),
+        "templates": templates,
+        "files": [{k: v for k, v in entry.items() if k != "conversion"} for entry in files],
+    }
+    logger.info(
+        f" Converted {sum(1 for f in files if f['status'] == 'ok')}/{len(files)} pipelines in {seconds:.2f}s "
+        f"(templates: {templates['parsed']} parsed, {templates['expanded']} expanded, {templates['hits']} reused)"
+    )
+    if settings["output_dir"]:
+        for entry in files:
+            if entry["status"] == "ok":
+                write_conversion(entry["conversion"], settings["output_dir"])
+        os.makedirs(settings["output_dir"], exist_ok=True)
+        with open(os.path.join(settings["output_dir"], "conversion_report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+    return [entry["conversion"] for entry in files if entry["status"] == "ok"], report
@@ -1,67 +1,91 @@
 ﻿import os
 import json
-import boto3
-import yaml
+from concurrent.futures import ThreadPoolExecutor
+from utils.aws import get_client, current_target
+from utils.config_loader import load_yaml_config
+from utils.metrics import METRICS
+from utils.validation import RuleSet, Required, Predicate
+from utils.plan import Plan, list_index, load_state, changed_fields, CREATE, UPDATE, NOOP
+from services.cicd.azure_devops import PipelineConverter, convert_directory, find_repo_root, load_cicd_settings, load_variable_groups, write_conversion
 
 def run(config, logger):
     logger.info(" Starting CI/CD pipeline migration...")
 
     dry_run = config.get("dry_run", False)
+    plan_only = config.get("plan_only", False)
     azure_pipeline_path = config.get("azure_pipeline_path", "data/azure_pipeline.yaml")
+    settings = load_cicd_settings(config.get("cicd"))
+    if "{account_id}" in settings["role_arn"]:
+        settings["role_arn"] = settings["role_arn"].format(account_id=target_account_id(dry_run))
+    parallel = config.get("parallel_transform")
 
-    azure_pipeline = extract_azure_pipeline(azure_pipeline_path, logger)
-    transformed_pipeline = transform_to_aws_pipeline(azure_pipeline, logger)
-    validated_pipeline = validate_pipeline(transformed_pipeline, logger)
+    conversions = convert_pipelines(azure_pipeline_path, logger, settings, parallel)
 
-    deploy_aws_pipeline(validated_pipeline, logger, dry_run)
+    with METRICS.timer("migration_step_seconds", service="cicd", step="validate"):
+        validated_pipelines = [validate_pipeline(c["pipeline"], logger) for c in conversions]
+
+    with METRICS.timer("migration_step_seconds", service="cicd", step="deploy"):
+        existing = None
+        if len(validated_pipelines) > 1 and not dry_run:
+            existing = load_state(logger, "pipeline", get_client("codepipeline"), "list_pipelines", "pipelines", "name")
+        for pipeline in validated_pipelines:
+            deploy_aws_pipeline(pipeline, logger, dry_run, plan_only, existing)
+
+def convert_pipelines(azure_pipeline_path, logger, settings, parallel=None):
+    if settings["pipelines_dir"]:
+        # Batch mode: every azure-pipelines.yml below the directory, sharing one template cache
+        with METRICS.timer("migration_step_seconds", service="cicd", step="transform"):
+            conversions, _ = convert_directory(settings["pipelines_dir"], logger, settings, parallel)
+        return conversions
+
+    with METRICS.timer("migration_step_seconds", service="cicd", step="extract"):
+        azure_pipeline = extract_azure_pipeline(azure_pipeline_path, logger)
+    with METRICS.timer("migration_step_seconds", service="cicd", step="transform"):
+        conversions = [transform_to_aws_pipeline(azure_pipeline, logger, parallel, settings, azure_pipeline_path)]
+        if settings["output_dir"]:
+            write_conversion(conversions[0], settings["output_dir"])
+    return conversions
+
+# The account of the current fan-out target, else the account of the active credentials.
+# Dry runs may have no credentials, so they keep the placeholder account.
+def target_account_id(dry_run=False):
+    target = current_target() or {}
+    if target.get("account_id"):
+        return target["account_id"]
+    if dry_run:
+        return "123456789012"
+    return get_client("sts").get_caller_identity()["Account"]
 
 # Step 1: Extract Azure DevOps pipeline YAML
 def extract_azure_pipeline(path, logger):
-    try:
-        with open(path, 'r') as f:
-            pipeline = yaml.safe_load(f)
-            logger.info(f" Loaded Azure pipeline from {path}")
-            return pipeline
-    except Exception as e:
-        logger.error(f" Failed to load Azure pipeline: {e}")
-        return {}
-
-# Step 2: Transform to AWS CodePipeline format
-def transform_to_aws_pipeline(azure_pipeline, logger):
-    stages = []
-    for step in azure_pipeline.get("steps", []):
-        stages.append({
-            "name": step.get("task", "Unnamed"),
-            "action": "Build",
-            "provider": "CodeBuild",
-            "configuration": {
-                "commands": step.get("script", "")
-            }
-        })
-
-    aws_pipeline = {
-        "name": "MigratedPipeline",
-        "roleArn": "arn:aws:iam::123456789012:role/CodePipelineServiceRole",
-        "artifactStore": {
-            "type": "S3",
-            "location": "your-artifact-bucket"
-        },
-        "stages": stages
-    }
+    return load_yaml_config(path, logger)
+
+# Step 2: Transform to AWS CodePipeline format. Templates are resolved relative to the
+# pipeline file; the result holds the pipeline, one buildspec per job and any warnings.
+def transform_to_aws_pipeline(azure_pipeline, logger, parallel=None, settings=None, source_path=None):
+    base_dir = os.path.dirname(os.path.abspath(source_path)) if source_path else os.getcwd()
+    repo_root = find_repo_root(source_path) if source_path else base_dir
+    settings = load_cicd_settings(settings)
+    converter = PipelineConverter(settings, load_variable_groups(settings["variable_groups_path"], logger))
+    conversion = converter.convert(azure_pipeline, None, base_dir, repo_root, parallel)
 
-    logger.info(" Transformed Azure pipeline to AWS format.")
-    return aws_pipeline
+    for warning in conversion["warnings"]:
+        logger.warning(f" {conversion['name']}: {warning}")
+    stages = conversion["pipeline"]["stages"]
+    logger.info(f" Transformed Azure pipeline to AWS format: {len(stages)} stages, {sum(len(s['actions']) for s in stages)} actions.")
+    return conversion
 
 # Step 3: Validate pipeline structure
-def validate_pipeline(pipeline, logger):
-    issues = []
+PIPELINE_RULES = RuleSet([
+    Required("name", "Missing pipeline name"),
+    Required("stages", "No stages defined"),
+    Required("artifactStore.location", "Missing artifact store location"),
+    Predicate("stages.0.actions.0.actionTypeId.category", lambda category: category == "Source", "First stage is not a Source stage (set cicd.source)"),
+    Predicate("stages", lambda stages: len(stages or []) >= 2, "CodePipeline needs at least two stages"),
+])
 
-    if not pipeline.get("name"):
-        issues.append("Missing pipeline name")
-    if not pipeline.get("stages"):
-        issues.append("No stages defined")
-    if not pipeline.get("artifactStore", {}).get("location"):
-        issues.append("Missing artifact store location")
+def validate_pipeline(pipeline, logger):
+    issues = PIPELINE_RULES.evaluate([pipeline]).issues[0]
 
     if issues:
         logger.warning(f" Pipeline validation issues: {', '.join(issues)}")
@@ -70,18 +94,125 @@ def validate_pipeline(pipeline, logger):
 
     return pipeline
 
-# Step 4: Deploy to AWS CodePipeline
-def deploy_aws_pipeline(pipeline, logger, dry_run=False):
+# get_pipeline returns secret configuration values as this placeholder
+MASKED_VALUE = "****"
+
+# Action configuration keyed by "stage/action". With a reference (the converted pipeline),
+# only the keys it sets are kept, since CodePipeline fills in defaults, and masked values
+# count as equal to the reference, since they cannot be read back.
+def action_configurations(pipeline, reference=None):
+    configurations = {}
+    for stage in pipeline.get("stages", []):
+        for action in stage.get("actions", []):
+            key = f"{stage['name']}/{action['name']}"
+            configuration = action.get("configuration") or {}
+            if reference is not None:
+                wanted = reference.get(key, {})
+                configuration = {
+                    k: wanted[k] if v == MASKED_VALUE else v
+                    for k, v in configuration.items() if k in wanted
+                }
+            configurations[key] = configuration
+    return configurations
+
+# Step 4: Plan the pipeline change. list_pipelines only returns names, so the
+# structure of an existing pipeline is fetched with get_pipeline before diffing.
+# Batch runs pass the listing in, so it is read once for all pipelines. Pipelines are
+# compared on pipeline_structure plus the normalized action configuration, as get_pipeline
+# reports them differently from what was sent.
+def plan_aws_pipeline(client, pipeline, logger, existing=None):
+    if existing is None:
+        existing = load_state(logger, "pipeline", client, "list_pipelines", "pipelines", "name")
+    plan = Plan("pipeline")
+    if pipeline["name"] not in existing:
+        plan.add(CREATE, pipeline["name"], pipeline)
+        return plan
+
+    current = client.get_pipeline(name=pipeline["name"])["pipeline"]
+    desired = dict(pipeline_structure(pipeline), configuration=action_configurations(pipeline))
+    actual = dict(pipeline_structure(current), configuration=action_configurations(current, desired["configuration"]))
+    changes = changed_fields(desired, actual, {field: field for field in ("roleArn", "artifactStore", "stages", "configuration")})
+    plan.add(UPDATE if changes else NOOP, pipeline["name"], dict(pipeline, version=current.get("version")), changes)
+    return plan
+
+# Step 5: Deploy to AWS CodePipeline
+def deploy_aws_pipeline(pipeline, logger, dry_run=False, plan_only=False, existing=None):
     if dry_run:
         logger.info(f"[Dry Run] Would deploy pipeline: {pipeline['name']}")
         return
 
-    client = boto3.client("codepipeline")
+    client = get_client("codepipeline")
 
     try:
-        response = client.create_pipeline(pipeline=pipeline)
-        logger.info(f" Deployed AWS CodePipeline: {pipeline['name']}")
-    except client.exceptions.PipelineNameInUseException:
-        logger.warning(f" Pipeline already exists: {pipeline['name']}")
+        plan = plan_aws_pipeline(client, pipeline, logger, existing)
     except Exception as e:
-        logger.error(f" Failed to deploy pipeline: {e}")
\ No newline at end of file
+        logger.error(f" Failed to read pipeline {pipeline['name']}: {e}")
+        return
+    plan.log(logger)
+    if plan_only:
+        return plan
+
+    for entry in plan.of(UPDATE):
+        try:
+            client.update_pipeline(pipeline=entry["item"])
+            logger.info(f" Updated AWS CodePipeline: {entry['name']} ({', '.join(sorted(entry['changes']))})")
+        except Exception as e:
+            logger.error(f" Failed to update pipeline: {e}")
+
+    for entry in plan.of(CREATE):
+        try:
+            response = client.create_pipeline(pipeline=entry["item"])
+            logger.info(f" Deployed AWS CodePipeline: {entry['name']}")
+        except client.exceptions.PipelineNameInUseException:
+            logger.warning(f" Pipeline already exists: {entry['name']}")
+        except Exception as e:
+            logger.error(f" Failed to deploy pipeline: {e}")
+    return plan
+
+# Step 6: Verify deployed pipelines against a fresh conversion of the same Azure pipelines.
+# Pipelines are compared on their structure: role, artifact store, stage order and each
+# action's type, run order and artifacts. Action configuration is left out, since
+# CodePipeline masks secret values in it.
+def pipeline_structure(pipeline):
+    return {
+        "roleArn": pipeline.get("roleArn"),
+        "artifactStore": pipeline.get("artifactStore"),
+        "stages": [
+            {
+                "name": stage["name"],
+                "actions": [
+                    {
+                        "name": action["name"],
+                        "actionTypeId": action["actionTypeId"],
+                        "runOrder": action.get("runOrder", 1),
+                        "inputArtifacts": [a["name"] for a in action.get("inputArtifacts") or []],
+                        "outputArtifacts": [a["name"] for a in action.get("outputArtifacts") or []],
+                    }
+                    for action in stage.get("actions", [])
+                ],
+            }
+            for stage in pipeline.get("stages", [])
+        ],
+    }
+
+def verify(config, logger, reconciliation, settings):
+    cicd_settings = load_cicd_settings(config.get("cicd"))
+    # Nothing is written while verifying
+    cicd_settings["output_dir"] = None
+    if "{account_id}" in cicd_settings["role_arn"]:
+        cicd_settings["role_arn"] = cicd_settings["role_arn"].format(account_id=target_account_id())
+    conversions = convert_pipelines(config.get("azure_pipeline_path", "data/azure_pipeline.yaml"), logger, cicd_settings, config.get("parallel_transform"))
+    pipelines = {conversion["pipeline"]["name"]: conversion["pipeline"] for conversion in conversions}
+    for name, pipeline in pipelines.items():
+        reconciliation.expect("pipeline", name, pipeline_structure(pipeline))
+    reconciliation.rebuild("pipeline", lambda name: pipeline_structure(pipelines[name]))
+
+    client = get_client("codepipeline")
+    existing = list_index(client, "list_pipelines", "pipelines", "name")
+    names = [c["pipeline"]["name"] for c in conversions if c["pipeline"]["name"] in existing]
+
+    def read_pipeline(name):
+        reconciliation.observe("pipeline", name, pipeline_structure(client.get_pipeline(name=name)["pipeline"]))
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        list(pool.map(read_pipeline, names))
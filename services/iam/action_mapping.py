@@ -0,0 +1,126 @@
+import re
+from functools import lru_cache
+
+from utils.config_loader import load_yaml_config
+
+DEFAULT_ACTION_MAP_PATH = "config/iam_action_map.yaml"
+
+EXACT, PREFIX, WILDCARD = 0, 1, 2
+
+class Rule:
+    __slots__ = ("pattern", "aws", "kind", "specificity", "anchored", "regex")
+
+    def __init__(self, pattern, aws):
+        self.pattern = pattern.lower()
+        self.aws = tuple(aws)
+        segments = self.pattern.split("/")
+        # Number of literal path segments: the more a rule pins down, the more specific it is
+        self.specificity = sum(1 for s in segments if "*" not in s)
+        self.anchored = "*" not in segments[0]
+        self.regex = None
+        if "*" not in self.pattern:
+            self.kind = EXACT
+        elif self.pattern.endswith("/*") and "*" not in self.pattern[:-2]:
+            self.kind = PREFIX
+        else:
+            self.kind = WILDCARD
+            self.regex = re.compile(".*".join(re.escape(part) for part in self.pattern.split("*")) + r"\Z")
+
+    def matches(self, action):
+        if self.kind == EXACT:
+            return action == self.pattern
+        if self.kind == PREFIX:
+            return action.startswith(self.pattern[:-1])
+        return self.regex.match(action) is not None
+
+    def rank(self):
+        # Exact beats any pattern; otherwise more literal segments win, then rules pinned to a
+        # provider namespace, then wildcard over prefix
+        return (1 if self.kind == EXACT else 0, self.specificity, self.anchored, 1 if self.kind == WILDCARD else 0)
+
+def is_aws_action(action):
+    return ":" in action and "/" not in action
+
+# "*" and service-wide "service:*" actions; the IAM validator rejects policies containing them
+def is_overly_permissive(action):
+    return action == "*" or action.endswith(":*")
+
+# Rules are compiled once into an exact-match dict, a segment trie of prefix rules and
+# wildcard rules bucketed by provider namespace, so a lookup never scans the whole table.
+class ActionMapper:
+    def __init__(self, rules):
+        self.rules = [Rule(r["azure"], r["aws"]) for r in rules]
+        # A rule mapping ordinary Azure actions to a wildcard would get every role using them
+        # dropped by validation; only the Azure "*" itself may map to one
+        permissive = [r.pattern for r in self.rules if r.pattern != "*" and any(is_overly_permissive(a) for a in r.aws)]
+        if permissive:
+            raise ValueError(f"Action map rules produce wildcard AWS actions rejected by validation: {', '.join(permissive)}")
+        self.exact = {}
+        self.trie = {}
+        self.wildcards = {}
+        self.cache = {}
+
+        for rule in self.rules:
+            # Azure actions can themselves contain wildcards, so every rule also matches its own text
+            self.exact.setdefault(rule.pattern, rule)
+            if rule.kind == EXACT or rule.specificity == 0:
+                continue
+            if rule.kind == PREFIX:
+                node = self.trie
+                for segment in rule.pattern[:-2].split("/"):
+                    node = node.setdefault(segment, {})
+                node.setdefault(None, rule)
+            else:
+                first = rule.pattern.split("/", 1)[0]
+                self.wildcards.setdefault(first if "*" not in first else "*", []).append(rule)
+
+    def _longest_prefix(self, action):
+        best = None
+        node = self.trie
+        for segment in action.split("/")[:-1]:
+            node = node.get(segment)
+            if node is None:
+                break
+            best = node.get(None, best)
+        return best
+
+    def _best_wildcard(self, action):
+        best = None
+        first = action.split("/", 1)[0]
+        for rule in self.wildcards.get(first, []) + self.wildcards.get("*", []):
+            if (best is None or rule.rank() > best.rank()) and rule.matches(action):
+                best = rule
+        return best
+
+    def lookup(self, action):
+        key = action.lower()
+        if key in self.cache:
+            return self.cache[key]
+
+        if is_aws_action(action):
+            result = (action,)
+        else:
+            rule = self.exact.get(key)
+            if rule is None:
+                candidates = [r for r in (self._longest_prefix(key), self._best_wildcard(key)) if r]
+                rule = max(candidates, key=Rule.rank) if candidates else None
+            result = rule.aws if rule else None
+
+        self.cache[key] = result
+        return result
+
+    def map_actions(self, actions):
+        mapped = {}
+        unmapped = []
+        for action in actions:
+            aws = self.lookup(action)
+            if aws is None:
+                unmapped.append(action)
+                continue
+            for a in aws:
+                mapped.setdefault(a, None)
+        return list(mapped), unmapped
+
+@lru_cache(maxsize=None)
+def load_action_mapper(path=DEFAULT_ACTION_MAP_PATH):
+    return ActionMapper(load_yaml_config(path).get("rules", []))
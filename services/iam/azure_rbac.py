@@ -0,0 +1,144 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_EXTRACT_WORKERS = 8
+
+def build_client_factory(tenant_id, client_id, client_secret):
+    # Imported here so snapshot replays and dry runs never load the Azure SDK
+    from azure.identity import ClientSecretCredential
+    from azure.mgmt.authorization import AuthorizationManagementClient
+
+    credential = ClientSecretCredential(tenant_id, client_id, client_secret)
+
+    def factory(subscription_id):
+        return AuthorizationManagementClient(credential, subscription_id)
+    return factory
+
+# Yields pages while the next one is already being fetched in the background
+def iter_pages(paged):
+    pages = paged.by_page() if hasattr(paged, "by_page") else iter([paged])
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        future = prefetch.submit(next, pages, None)
+        while True:
+            page = future.result()
+            if page is None:
+                return
+            future = prefetch.submit(next, pages, None)
+            yield list(page)
+
+def role_definition_record(role):
+    actions = []
+    not_actions = []
+    for permission in role.permissions or []:
+        actions.extend(permission.actions or [])
+        actions.extend(permission.data_actions or [])
+        not_actions.extend(permission.not_actions or [])
+        not_actions.extend(permission.not_data_actions or [])
+    return {
+        "id": role.id,
+        "name": role.role_name or role.name,
+        "description": role.description,
+        "permissions": actions,
+        "not_permissions": not_actions,
+    }
+
+def role_assignment_record(assignment):
+    return {
+        "id": assignment.id,
+        "scope": assignment.scope,
+        "role_definition_id": assignment.role_definition_id,
+        "principal_id": assignment.principal_id,
+        "principal_type": assignment.principal_type,
+    }
+
+def _list_scope(client, scope, kind):
+    if kind == "roles":
+        paged = client.role_definitions.list(scope)
+        convert = role_definition_record
+    else:
+        paged = client.role_assignments.list_for_scope(scope)
+        convert = role_assignment_record
+    records = []
+    for page in iter_pages(paged):
+        records.extend(convert(item) for item in page)
+    return records
+
+def subscription_scopes(subscriptions, scopes=None):
+    targets = []
+    for subscription_id in subscriptions:
+        for scope in scopes or [f"/subscriptions/{subscription_id}"]:
+            targets.append((subscription_id, scope))
+    return targets
+
+# Built-in role definitions are listed under every subscription with a subscription-specific
+# id; the role definition GUID, the last segment of the id, is the same everywhere
+def role_definition_key(record):
+    return record["id"].rstrip("/").rsplit("/", 1)[-1].lower()
+
+# Lists role definitions and assignments for every subscription/scope in parallel.
+# Built-in roles show up under each subscription, so definitions are de-duplicated by GUID.
+def extract_rbac(client_factory, targets, logger, max_workers=DEFAULT_EXTRACT_WORKERS):
+    clients = {subscription_id: client_factory(subscription_id) for subscription_id in {s for s, _ in targets}}
+    tasks = [(subscription_id, scope, kind) for subscription_id, scope in targets for kind in ("roles", "assignments")]
+
+    roles = {}
+    assignments = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_list_scope, clients[s], scope, kind): (scope, kind) for s, scope, kind in tasks}
+        for future, (scope, kind) in futures.items():
+            try:
+                records = future.result()
+            except Exception as e:
+                logger.error(f" Error extracting Azure {kind} for scope {scope}: {e}")
+                continue
+            if kind == "roles":
+                for record in records:
+                    roles.setdefault(role_definition_key(record), record)
+            else:
+                for record in records:
+                    assignments.setdefault(record["id"], record)
+
+    return list(roles.values()), list(assignments.values())
+
+class _FixturePaged:
+    def __init__(self, items, page_size):
+        self.items = items
+        self.page_size = page_size
+
+    def by_page(self):
+        for i in range(0, len(self.items), self.page_size):
+            yield iter(self.items[i:i + self.page_size])
+
+    def __iter__(self):
+        return iter(self.items)
+
+class _FixtureRecord:
+    def __init__(self, data):
+        for key, value in data.items():
+            if isinstance(value, list):
+                value = [_FixtureRecord(v) if isinstance(v, dict) else v for v in value]
+            setattr(self, key, value)
+
+    # Attributes missing from the fixture read as None, like unset SDK model fields
+    def __getattr__(self, name):
+        return None
+
+class _FixtureOperations:
+    def __init__(self, items_by_scope, page_size):
+        self.items_by_scope = items_by_scope
+        self.page_size = page_size
+
+    def list(self, scope, filter=None):
+        return _FixturePaged([_FixtureRecord(d) for d in self.items_by_scope.get(scope, [])], self.page_size)
+
+    list_for_scope = list
+
+# Stand-in for AuthorizationManagementClient backed by a JSON fixture of the form
+# {"role_definitions": {scope: [...]}, "role_assignments": {scope: [...]}}
+class FixtureAuthorizationClient:
+    def __init__(self, fixture, page_size=100):
+        if isinstance(fixture, str):
+            with open(fixture, "r") as f:
+                fixture = json.load(f)
+        self.role_definitions = _FixtureOperations(fixture.get("role_definitions", {}), page_size)
+        self.role_assignments = _FixtureOperations(fixture.get("role_assignments", {}), page_size)
@@ -0,0 +1,164 @@
+import fnmatch
+import hashlib
+import json
+
+from utils.parallel import map_chunks
+
+# IAM counts managed policy size without whitespace
+MANAGED_POLICY_MAX_CHARS = 6144
+
+DEFAULT_OPTIMIZE_SETTINGS = {
+    "max_policy_chars": MANAGED_POLICY_MAX_CHARS,
+    "max_policies_per_role": 10,
+    "collapse_service_wildcards": False,   # replace long per-service action lists with service:*
+    "collapse_threshold": 20,              # actions of one service needed before collapsing
+}
+
+def load_optimize_settings(overrides=None):
+    settings = dict(DEFAULT_OPTIMIZE_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def compact_json(document):
+    return json.dumps(document, sort_keys=True, separators=(",", ":"))
+
+def content_hash(document):
+    return hashlib.sha256(compact_json(document).encode()).hexdigest()
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+def _drop_covered(actions):
+    wildcards = [a.lower() for a in actions if "*" in a]
+    kept = []
+    for action in actions:
+        lowered = action.lower()
+        if any(w != lowered and fnmatch.fnmatchcase(lowered, w) for w in wildcards):
+            continue
+        kept.append(action)
+    return kept
+
+def _collapse_services(actions, threshold):
+    by_service = {}
+    for action in actions:
+        by_service.setdefault(action.split(":", 1)[0] if ":" in action else action, []).append(action)
+    collapsed = []
+    for service, service_actions in by_service.items():
+        if service != "*" and len(service_actions) >= threshold:
+            collapsed.append(f"{service}:*")
+        else:
+            collapsed.extend(service_actions)
+    return collapsed
+
+# Merge statements that only differ in their actions, drop actions already covered by a
+# wildcard in the same statement, and sort everything so equal documents hash equally.
+def canonical_statements(document, settings):
+    groups = {}
+    for statement in _as_list(document.get("Statement", [])):
+        rest = {k: v for k, v in statement.items() if k not in ("Action", "Sid")}
+        if isinstance(rest.get("Resource"), list):
+            rest["Resource"] = sorted(set(rest["Resource"]))
+        group = groups.setdefault(compact_json(rest), {"rest": rest, "actions": set()})
+        group["actions"].update(_as_list(statement.get("Action", [])))
+
+    statements = []
+    for key in sorted(groups):
+        actions = _drop_covered(sorted(groups[key]["actions"]))
+        if settings["collapse_service_wildcards"]:
+            actions = _drop_covered(sorted(set(_collapse_services(actions, settings["collapse_threshold"]))))
+        statements.append(dict(groups[key]["rest"], Action=actions))
+    return statements
+
+def _document(statements):
+    return {"Version": "2012-10-17", "Statement": statements}
+
+# Greedy packing of actions into as few documents as fit under the size limit.
+# Sizes are tracked incrementally, counting a separator for every element to stay conservative.
+def split_statements(statements, max_chars):
+    if len(compact_json(_document(statements))) <= max_chars:
+        return [_document(statements)]
+
+    empty_size = len(compact_json(_document([])))
+    documents = []
+    current = []
+    size = empty_size
+    for statement in statements:
+        overhead = len(compact_json(dict(statement, Action=[]))) + 1
+        chunk = None
+        for action in statement["Action"]:
+            cost = len(json.dumps(action)) + 1 + (overhead if chunk is None else 0)
+            if size + cost > max_chars and (current or chunk):
+                if chunk:
+                    current.append(chunk)
+                documents.append(_document(current))
+                current, chunk, size = [], None, empty_size
+                cost = len(json.dumps(action)) + 1 + overhead
+            if chunk is None:
+                chunk = dict(statement, Action=[])
+            chunk["Action"].append(action)
+            size += cost
+        if chunk:
+            current.append(chunk)
+    if current:
+        documents.append(_document(current))
+    return documents
+
+# Canonicalize, split and hash each policy document. This is the CPU-bound part of the
+# optimizer and is independent per policy, so large inputs are spread over worker processes.
+def pack_policies(documents, settings):
+    packed = []
+    for document in documents:
+        parts = split_statements(canonical_statements(document, settings), settings["max_policy_chars"])
+        packed.append({"documents": parts, "hashes": [content_hash(part) for part in parts]})
+    return packed
+
+# Turns one-policy-per-role input into a plan of unique managed policies plus the roles
+# that attach them, and counts the policies and API calls this saves.
+def optimize_policies(policies, logger, settings=None, parallel=None):
+    settings = load_optimize_settings(settings)
+    unique = {}
+    names = set()
+    roles = []
+
+    packed = [
+        entry
+        for chunk in map_chunks(pack_policies, [p["PolicyDocument"] for p in policies], parallel, settings)
+        for entry in chunk
+    ]
+    for policy, entry in zip(policies, packed):
+        documents = entry["documents"]
+        hashes = []
+        for index, (document, digest) in enumerate(zip(documents, entry["hashes"]), start=1):
+            if digest not in unique:
+                name = policy["PolicyName"] if len(documents) == 1 else f"{policy['PolicyName']}_part{index}"
+                if name in names:
+                    name = f"{name}_{digest[:8]}"
+                names.add(name)
+                unique[digest] = {"PolicyName": name, "PolicyDocument": document}
+            hashes.append(digest)
+
+        if len(hashes) > settings["max_policies_per_role"]:
+            logger.warning(f" Role for '{policy['PolicyName']}' needs {len(hashes)} managed policies (limit {settings['max_policies_per_role']})")
+        roles.append({
+            "RoleName": f"{policy['PolicyName']}_Role",
+            "TrustPolicy": policy["TrustPolicy"],
+            "Description": policy.get("description", ""),
+            "PolicyHashes": hashes,
+        })
+
+    attachments = sum(len(r["PolicyHashes"]) for r in roles)
+    # Without the optimizer every role gets its own policy: create_policy + create_role + attach
+    naive_calls = 3 * len(policies)
+    calls = len(unique) + len(roles) + attachments
+    stats = {
+        "input_policies": len(policies),
+        "managed_policies": len(unique),
+        "policies_saved": len(policies) - len(unique),
+        "api_calls": calls,
+        "api_calls_saved": naive_calls - calls,
+    }
+    logger.info(
+        f" IAM optimizer: {stats['input_policies']} policies -> {stats['managed_policies']} managed policies "
+        f"({stats['policies_saved']} saved), {stats['api_calls']} API calls ({stats['api_calls_saved']} saved)"
+    )
+    return {"policies": unique, "roles": roles, "stats": stats}
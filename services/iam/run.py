@@ -1,67 +1,114 @@
 import os
 import json
-import boto3
-from azure.identity import ClientSecretCredential
-from azure.graphrbac import GraphRbacManagementClient
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+from utils.aws import get_client
+from services.iam.azure_rbac import build_client_factory, extract_rbac, subscription_scopes, FixtureAuthorizationClient, DEFAULT_EXTRACT_WORKERS
+from services.iam.snapshot import save_snapshot, load_snapshot, DEFAULT_SNAPSHOT_DIR
+from services.iam.action_mapping import load_action_mapper, is_overly_permissive, DEFAULT_ACTION_MAP_PATH
+from services.iam.optimize import optimize_policies
+from utils.validation import RuleSet, Required, Predicate
+from utils.metrics import METRICS
+from utils.parallel import map_chunks
+from utils.plan import Plan, list_index, load_state, changed_fields, CREATE, UPDATE, NOOP
 
 def run(config, logger):
     logger.info(" Starting IAM migration...")
 
     dry_run = config.get("dry_run", False)
 
-    azure_policies = extract_azure_iam(config, logger)
+    with METRICS.timer("migration_step_seconds", service="iam", step="extract"):
+        azure_policies = extract_azure_iam(config, logger)
+    METRICS.inc("migration_records_total", len(azure_policies), service="iam", stage="extracted")
     logger.info(f" Extracted {len(azure_policies)} Azure IAM policies.")
 
-    transformed_policies = transform_to_aws_format(azure_policies, logger)
+    with METRICS.timer("migration_step_seconds", service="iam", step="transform"):
+        transformed_policies = transform_to_aws_format(
+            azure_policies, logger, config.get("iam_action_map_path", DEFAULT_ACTION_MAP_PATH), config.get("parallel_transform")
+        )
     logger.info(" Transformed policies to AWS format.")
 
-    validated_policies = validate_policies(transformed_policies, logger)
-    apply_aws_iam(validated_policies, logger, dry_run)
+    with METRICS.timer("migration_step_seconds", service="iam", step="validate"):
+        validated_policies = validate_policies(transformed_policies, logger)
+    METRICS.inc("migration_records_total", len(validated_policies), service="iam", stage="validated")
+
+    with METRICS.timer("migration_step_seconds", service="iam", step="deploy"):
+        apply_aws_iam(validated_policies, logger, dry_run, config.get("iam_optimize"), config.get("plan_only", False), config.get("parallel_transform"))
     logger.info(" IAM migration completed.")
 
-# Step 1: Extract Azure IAM policies
-def extract_azure_iam(config, logger):
+# Step 1: Extract Azure IAM policies (live, or from a saved snapshot)
+def extract_azure_iam(config, logger, client_factory=None):
+    settings = config.get("azure_iam") or {}
+    snapshot_dir = settings.get("snapshot_dir", DEFAULT_SNAPSHOT_DIR)
     tenant_id = os.getenv("AZURE_TENANT_ID")
-    client_id = os.getenv("AZURE_CLIENT_ID")
-    client_secret = os.getenv("AZURE_CLIENT_SECRET")
 
-    if not all([tenant_id, client_id, client_secret]):
-        logger.error(" Missing Azure credentials.")
+    if config.get("from_snapshot"):
+        snapshot = load_snapshot(config["from_snapshot"], snapshot_dir, tenant_id, logger)
+        return snapshot["role_definitions"] if snapshot else []
+
+    if client_factory is None and settings.get("fixture_path"):
+        # Offline stand-in for Azure, e.g. for benchmarks and rehearsals
+        fixture = FixtureAuthorizationClient(settings["fixture_path"])
+        client_factory = lambda subscription_id: fixture
+    if client_factory is None:
+        client_id = os.getenv("AZURE_CLIENT_ID")
+        client_secret = os.getenv("AZURE_CLIENT_SECRET")
+
+        if not all([tenant_id, client_id, client_secret]):
+            logger.error(" Missing Azure credentials.")
+            return []
+        client_factory = build_client_factory(tenant_id, client_id, client_secret)
+
+    subscriptions = settings.get("subscriptions") or [s for s in [os.getenv("AZURE_SUBSCRIPTION_ID")] if s]
+    if not subscriptions:
+        logger.error(" Missing Azure subscription id.")
         return []
 
-    credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-    client = GraphRbacManagementClient(credential, tenant_id)
-
-    policies = []
-    try:
-        for role in client.roles.list():
-            permissions = []
-            for p in role.permissions:
-                permissions.append(p.action)
-            policies.append({
-                "name": role.name,
-                "description": role.description,
-                "permissions": permissions
-            })
-    except Exception as e:
-        logger.error(f" Error extracting Azure IAM roles: {e}")
-    return policies
+    targets = subscription_scopes(subscriptions, settings.get("scopes"))
+    roles, assignments = extract_rbac(client_factory, targets, logger, settings.get("max_workers", DEFAULT_EXTRACT_WORKERS))
+
+    if settings.get("save_snapshot", True):
+        try:
+            save_snapshot(snapshot_dir, tenant_id or "unknown", [scope for _, scope in targets], roles, assignments, logger)
+        except Exception as e:
+            logger.error(f" Failed to save Azure IAM snapshot: {e}")
+    return roles
 
 # Step 2: Transform to AWS-compatible format
-def transform_to_aws_format(policies, logger):
+# Runs in worker processes for large tenants, so it takes and returns plain JSON data.
+# NotActions/NotDataActions become a Deny statement; a role with a not-action that has no
+# AWS mapping is refused, since converting it without the exclusion would grant more.
+def convert_policies(policies, action_map_path=DEFAULT_ACTION_MAP_PATH):
+    mapper = load_action_mapper(action_map_path)
+    unmapped = Counter()
     transformed = []
+    refused = []
     for policy in policies:
+        actions, missing = mapper.map_actions(policy["permissions"])
+        denied, missing_denied = mapper.map_actions(policy.get("not_permissions") or [])
+        if missing_denied:
+            refused.append({"name": policy["name"], "not_actions": missing_denied})
+            continue
+        unmapped.update(missing)
+        statements = [
+            {
+                "Effect": "Allow",
+                "Action": actions,
+                "Resource": "*"
+            }
+        ]
+        if denied:
+            statements.append({
+                "Effect": "Deny",
+                "Action": denied,
+                "Resource": "*"
+            })
         aws_policy = {
             "PolicyName": policy["name"].replace(" ", "_"),
             "PolicyDocument": {
                 "Version": "2012-10-17",
-                "Statement": [
-                    {
-                        "Effect": "Allow",
-                        "Action": policy["permissions"],
-                        "Resource": "*"
-                    }
-                ]
+                "Statement": statements
             },
             "TrustPolicy": {
                 "Version": "2012-10-17",
@@ -77,73 +124,237 @@ def transform_to_aws_format(policies, logger):
             }
         }
         transformed.append(aws_policy)
+    return {"policies": transformed, "unmapped": dict(unmapped), "refused": refused}
+
+def transform_to_aws_format(policies, logger, action_map_path=DEFAULT_ACTION_MAP_PATH, parallel=None):
+    unmapped = Counter()
+    transformed = []
+    for chunk in map_chunks(convert_policies, policies, parallel, action_map_path):
+        transformed.extend(chunk["policies"])
+        unmapped.update(chunk["unmapped"])
+        for role in chunk["refused"]:
+            logger.error(f" Skipping Azure role '{role['name']}': NotActions without an AWS mapping cannot be denied: {', '.join(role['not_actions'])}")
+
+    if unmapped:
+        top = ", ".join(f"{a} ({n})" for a, n in unmapped.most_common(10))
+        logger.warning(f" {len(unmapped)} Azure actions have no AWS mapping ({sum(unmapped.values())} occurrences): {top}")
     return transformed
 # Step 3: validate policies for AWS compatibility
+POLICY_RULES = RuleSet([
+    Required("PolicyDocument.Statement.0.Action", "Missing actions"),
+    Predicate(
+        "PolicyDocument.Statement.0.Action",
+        lambda actions: not any(is_overly_permissive(a) for a in actions or []),
+        "Overly permissive actions (wildcards)"
+    ),
+    Required("PolicyName", "Missing policy name"),
+    Predicate(
+        "PolicyDocument",
+        lambda doc: isinstance(doc, dict) and "Version" in doc and "Statement" in doc,
+        "Malformed policy document"
+    ),
+], key_path="PolicyName")
+
 def validate_policies(policies, logger):
-    validated = []
-    for policy in policies:
-        issues = []
+    report = POLICY_RULES.evaluate(policies)
+    report.log(logger, "Policy")
+    validated = report.valid_records()
+
+    logger.info(f" {len(validated)} policies passed validation.")
+    return validated
 
-        # Check for empty actions
-        actions = policy["PolicyDocument"]["Statement"][0].get("Action", [])
-        if not actions:
-            issues.append("Missing actions")
 
-        # Check for wildcard permissions
-        if any(a == "*" or a.endswith(":*") for a in actions):
-            issues.append("Overly permissive actions (wildcards)")
+# Default-version documents of existing policies are read in parallel while planning
+POLICY_READ_WORKERS = 8
+# IAM keeps at most five versions of a managed policy
+MAX_POLICY_VERSIONS = 5
 
-        # Check for missing description
-        if not policy.get("PolicyName"):
-            issues.append("Missing policy name")
+def _default_document(iam_client, policy):
+    version = iam_client.get_policy_version(PolicyArn=policy["Arn"], VersionId=policy["DefaultVersionId"])
+    return _policy_document(version["PolicyVersion"]["Document"])
 
-        # Check for malformed structure
-        if "Version" not in policy["PolicyDocument"] or "Statement" not in policy["PolicyDocument"]:
-            issues.append("Malformed policy document")
+# Customer managed policies are matched by name and diffed on the document of their default
+# version (list_policies does not return document content). Roles are diffed on their trust policy.
+def plan_aws_iam(iam_client, plan, logger):
+    existing_policies = load_state(logger, "IAM policy", iam_client, "list_policies", "Policies", "PolicyName", Scope="Local")
+    existing_roles = load_state(logger, "IAM role", iam_client, "list_roles", "Roles", "RoleName")
 
-        if issues:
-            logger.warning(f"Policy '{policy.get('PolicyName', 'Unnamed')}' has issues: {', '.join(issues)}")
-        else:
-            validated.append(policy)
+    wanted = [existing_policies[p["PolicyName"]] for p in plan["policies"].values() if p["PolicyName"] in existing_policies]
+    with ThreadPoolExecutor(max_workers=POLICY_READ_WORKERS) as pool:
+        documents = dict(zip((p["PolicyName"] for p in wanted), pool.map(lambda p: _default_document(iam_client, p), wanted)))
 
-    logger.info(f" {len(validated)} policies passed validation.")
-    return validated
+    policy_plan = Plan("IAM policy")
+    for digest, policy in plan["policies"].items():
+        current = existing_policies.get(policy["PolicyName"])
+        item = dict(policy, Digest=digest, Arn=current["Arn"] if current else None)
+        if current is None:
+            policy_plan.add(CREATE, policy["PolicyName"], item)
+            continue
+        changes = changed_fields(policy, {"PolicyDocument": documents[policy["PolicyName"]]}, {"PolicyDocument": "PolicyDocument"})
+        policy_plan.add(UPDATE if changes else NOOP, policy["PolicyName"], item, changes)
 
+    role_plan = Plan("IAM role")
+    for role in plan["roles"]:
+        current = existing_roles.get(role["RoleName"])
+        if current is None:
+            role_plan.add(CREATE, role["RoleName"], role)
+            continue
+        changes = changed_fields(role, current, {"TrustPolicy": "AssumeRolePolicyDocument"})
+        role_plan.add(UPDATE if changes else NOOP, role["RoleName"], role, changes)
+    return policy_plan, role_plan
 
-# Step 4: Apply policies to AWS
-def apply_aws_iam(policies, logger, dry_run=False):
-    iam_client = boto3.client("iam")
+# A changed document becomes the new default version; the oldest non-default version is
+# deleted first when the policy already has the maximum number of versions
+def _update_policy(iam_client, policy):
+    versions = iam_client.list_policy_versions(PolicyArn=policy["Arn"])["Versions"]
+    old = sorted((v for v in versions if not v["IsDefaultVersion"]), key=lambda v: v["CreateDate"])
+    if len(versions) >= MAX_POLICY_VERSIONS and old:
+        iam_client.delete_policy_version(PolicyArn=policy["Arn"], VersionId=old[0]["VersionId"])
+    iam_client.create_policy_version(
+        PolicyArn=policy["Arn"],
+        PolicyDocument=json.dumps(policy["PolicyDocument"]),
+        SetAsDefault=True
+    )
 
-    for policy in policies:
-        policy_name = policy["PolicyName"]
-        policy_doc = json.dumps(policy["PolicyDocument"])
-        trust_doc = json.dumps(policy["TrustPolicy"])
+# Step 4: Apply policies to AWS (deduplicated and size-packed by the optimizer)
+def apply_aws_iam(policies, logger, dry_run=False, optimize_settings=None, plan_only=False, parallel=None):
+    plan = optimize_policies(policies, logger, optimize_settings, parallel)
 
-        if dry_run:
-            logger.info(f"[Dry Run] Would create IAM policy: {policy_name}")
-            continue
+    if dry_run:
+        for policy in plan["policies"].values():
+            logger.info(f"[Dry Run] Would create IAM policy: {policy['PolicyName']}")
+        for role in plan["roles"]:
+            logger.info(f"[Dry Run] Would create IAM role: {role['RoleName']} with {len(role['PolicyHashes'])} policies")
+        return plan
+
+    iam_client = get_client("iam")
+    policy_plan, role_plan = plan_aws_iam(iam_client, plan, logger)
+    policy_plan.log(logger)
+    role_plan.log(logger)
+    plan["changes"] = {"policies": policy_plan, "roles": role_plan}
+    if plan_only:
+        return plan
+
+    arns = {}
+    account_id = None
 
+    for entry in policy_plan.entries:
+        policy = entry["item"]
+        digest = policy["Digest"]
+        policy_name = entry["name"]
+        if entry["action"] == NOOP:
+            arns[digest] = policy["Arn"]
+            continue
+        if entry["action"] == UPDATE:
+            arns[digest] = policy["Arn"]
+            try:
+                _update_policy(iam_client, policy)
+                logger.info(f" Updated IAM policy: {policy_name}")
+            except Exception as e:
+                logger.error(f" Failed to update policy {policy_name}: {e}")
+            continue
         try:
             # Create IAM policy
-            iam_client.create_policy(
+            response = iam_client.create_policy(
                 PolicyName=policy_name,
-                PolicyDocument=policy_doc
+                PolicyDocument=json.dumps(policy["PolicyDocument"])
             )
+            arns[digest] = response["Policy"]["Arn"]
             logger.info(f" Created IAM policy: {policy_name}")
         except iam_client.exceptions.EntityAlreadyExistsException:
             logger.warning(f" Policy already exists: {policy_name}")
+            if account_id is None:
+                account_id = get_client("sts").get_caller_identity()["Account"]
+            arns[digest] = f"arn:aws:iam::{account_id}:policy/{policy_name}"
         except Exception as e:
             logger.error(f" Failed to create policy {policy_name}: {e}")
 
+    for entry in role_plan.entries:
+        role = entry["item"]
+        role_name = entry["name"]
+        attached = set()
         try:
-            # Create IAM role with trust policy
-            iam_client.create_role(
-                RoleName=f"{policy_name}_Role",
-                AssumeRolePolicyDocument=trust_doc,
-                Description=policy.get("description", "")
-            )
-            logger.info(f" Created IAM role: {policy_name}_Role")
+            if entry["action"] == CREATE:
+                # Create IAM role with trust policy
+                iam_client.create_role(
+                    RoleName=role_name,
+                    AssumeRolePolicyDocument=json.dumps(role["TrustPolicy"]),
+                    Description=role["Description"]
+                )
+                logger.info(f" Created IAM role: {role_name}")
+            else:
+                if entry["action"] == UPDATE:
+                    iam_client.update_assume_role_policy(
+                        RoleName=role_name,
+                        PolicyDocument=json.dumps(role["TrustPolicy"])
+                    )
+                    logger.info(f" Updated trust policy of IAM role: {role_name}")
+                attached = {
+                    p["PolicyArn"]
+                    for page in iam_client.get_paginator("list_attached_role_policies").paginate(RoleName=role_name)
+                    for p in page["AttachedPolicies"]
+                }
         except iam_client.exceptions.EntityAlreadyExistsException:
-            logger.warning(f" Role already exists: {policy_name}_Role")
+            logger.warning(f" Role already exists: {role_name}")
         except Exception as e:
-            logger.error(f" Failed to create role {policy_name}_Role: {e}")
\ No newline at end of file
+            logger.error(f" Failed to {entry['action']} role {role_name}: {e}")
+            continue
+
+        for digest in role["PolicyHashes"]:
+            if digest not in arns or arns[digest] in attached:
+                continue
+            try:
+                iam_client.attach_role_policy(RoleName=role_name, PolicyArn=arns[digest])
+            except Exception as e:
+                logger.error(f" Failed to attach policy {plan['policies'][digest]['PolicyName']} to role {role_name}: {e}")
+    return plan
+
+# Step 5: Verify policies and roles against the optimizer's plan for the same Azure input.
+# Policy documents are read from each policy's default version; roles are compared on their
+# trust policy and the names of their attached policies.
+def _policy_document(document):
+    # The SDK decodes policy documents, but raw responses carry URL-encoded JSON
+    return json.loads(unquote(document)) if isinstance(document, str) else document
+
+def verify(config, logger, reconciliation, settings):
+    # A verification pass must not write a new snapshot of the Azure tenant
+    extract_config = dict(config, azure_iam=dict(config.get("azure_iam") or {}, save_snapshot=False))
+    azure_policies = extract_azure_iam(extract_config, logger)
+    transformed = transform_to_aws_format(azure_policies, logger, config.get("iam_action_map_path", DEFAULT_ACTION_MAP_PATH), config.get("parallel_transform"))
+    plan = optimize_policies(validate_policies(transformed, logger), logger, config.get("iam_optimize"), config.get("parallel_transform"))
+
+    names = {digest: policy["PolicyName"] for digest, policy in plan["policies"].items()}
+    documents = {policy["PolicyName"]: policy["PolicyDocument"] for policy in plan["policies"].values()}
+    planned_roles = {role["RoleName"]: role for role in plan["roles"]}
+
+    def role_fields(role):
+        return {"trust": role["TrustPolicy"], "policies": sorted(names[d] for d in role["PolicyHashes"])}
+
+    for name, document in documents.items():
+        reconciliation.expect("policy", name, {"document": document})
+    for name, role in planned_roles.items():
+        reconciliation.expect("role", name, role_fields(role))
+    reconciliation.rebuild("policy", lambda name: {"document": documents[name]})
+    reconciliation.rebuild("role", lambda name: role_fields(planned_roles[name]))
+
+    iam_client = get_client("iam")
+    policies = list_index(iam_client, "list_policies", "Policies", "PolicyName", Scope="Local")
+    roles = list_index(iam_client, "list_roles", "Roles", "RoleName")
+    wanted_policies = [policies[name] for name in set(names.values()) if name in policies]
+    wanted_roles = [roles[role["RoleName"]] for role in plan["roles"] if role["RoleName"] in roles]
+
+    def read_policy(policy):
+        version = iam_client.get_policy_version(PolicyArn=policy["Arn"], VersionId=policy["DefaultVersionId"])
+        reconciliation.observe("policy", policy["PolicyName"], {"document": _policy_document(version["PolicyVersion"]["Document"])})
+
+    def read_role(role):
+        attached = [
+            p["PolicyName"]
+            for page in iam_client.get_paginator("list_attached_role_policies").paginate(RoleName=role["RoleName"])
+            for p in page["AttachedPolicies"]
+        ]
+        reconciliation.observe("role", role["RoleName"], {"trust": _policy_document(role["AssumeRolePolicyDocument"]), "policies": sorted(attached)})
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        list(pool.map(read_policy, wanted_policies))
+        list(pool.map(read_role, wanted_roles))
@@ -0,0 +1,59 @@
+import glob
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_DIR = "logs/snapshots"
+
+def snapshot_path(directory, tenant_id, created):
+    return os.path.join(directory, f"iam_{tenant_id}_{created.strftime('%Y%m%dT%H%M%SZ')}.json.gz")
+
+def save_snapshot(directory, tenant_id, scopes, roles, assignments, logger=None):
+    created = datetime.now(timezone.utc)
+    path = snapshot_path(directory, tenant_id, created)
+    os.makedirs(directory, exist_ok=True)
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "tenant_id": tenant_id,
+        "created": created.isoformat(),
+        "scopes": scopes,
+        "role_definitions": roles,
+        "role_assignments": assignments,
+    }
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+    if logger:
+        logger.info(f" Saved Azure IAM snapshot: {path} ({len(roles)} roles, {len(assignments)} assignments)")
+    return path
+
+def latest_snapshot(directory, tenant_id=None):
+    pattern = f"iam_{tenant_id or '*'}_*.json.gz"
+    candidates = sorted(glob.glob(os.path.join(directory, pattern)), key=lambda p: p.rsplit("_", 1)[-1])
+    return candidates[-1] if candidates else None
+
+# "latest" picks the newest snapshot in the directory (for the tenant, if known)
+def load_snapshot(path, directory=DEFAULT_SNAPSHOT_DIR, tenant_id=None, logger=None):
+    if path == "latest":
+        path = latest_snapshot(directory, tenant_id)
+        if not path:
+            if logger:
+                logger.error(f" No Azure IAM snapshot found in {directory}")
+            return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except Exception as e:
+        if logger:
+            logger.error(f" Failed to load Azure IAM snapshot {path}: {e}")
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        if logger:
+            logger.error(f" Unsupported Azure IAM snapshot version in {path}: {snapshot.get('version')}")
+        return None
+    if logger:
+        logger.info(f" Loaded Azure IAM snapshot: {path} (taken {snapshot['created']})")
+    return snapshot
@@ -0,0 +1,92 @@
+import base64
+import hashlib
+import os
+import threading
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+MB = 1024 * 1024
+READ_SIZE = 1 * MB
+
+DEFAULT_ARTIFACT_SETTINGS = {
+    "bucket": None,               # S3 bucket used to stage large or shared artifacts
+    "prefix": "lambda-artifacts/",
+    "inline_max_mb": 10,          # artifacts up to this size are sent as ZipFile bytes
+}
+
+def load_artifact_settings(overrides=None):
+    settings = dict(DEFAULT_ARTIFACT_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+# Resolves each function's Code argument at deploy time, one artifact at a time.
+# Zips are identified by content hash so a zip shared by several functions is staged once.
+class ArtifactStager:
+    def __init__(self, s3_client, settings, logger):
+        self.s3 = s3_client
+        self.settings = load_artifact_settings(settings)
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.digests = {}
+        self.usage = {}
+        self.staged = {}
+        self.stage_locks = {}
+
+    def digest(self, path):
+        stat = os.stat(path)
+        cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        with self.lock:
+            cached = self.digests.get(cache_key)
+        if cached is None:
+            sha = file_sha256(path)
+            cached = {"hex": sha.hexdigest(), "b64": base64.b64encode(sha.digest()).decode(), "size": stat.st_size}
+            with self.lock:
+                self.digests[cache_key] = cached
+        return cached
+
+    def prepare(self, paths):
+        for path, count in Counter(paths).items():
+            try:
+                digest = self.digest(path)["hex"]
+            except OSError:
+                continue
+            self.usage[digest] = self.usage.get(digest, 0) + count
+
+    def code_for(self, path):
+        info = self.digest(path)
+        bucket = self.settings["bucket"]
+        too_large = info["size"] > self.settings["inline_max_mb"] * MB
+        shared = self.usage.get(info["hex"], 0) > 1
+        if bucket and (too_large or shared):
+            return {"S3Bucket": bucket, "S3Key": self.stage(path, info["hex"])}
+        with open(path, "rb") as f:
+            return {"ZipFile": f.read()}
+
+    def stage(self, path, digest):
+        with self.lock:
+            if digest in self.staged:
+                return self.staged[digest]
+            stage_lock = self.stage_locks.setdefault(digest, threading.Lock())
+
+        with stage_lock:
+            if digest in self.staged:
+                return self.staged[digest]
+            bucket = self.settings["bucket"]
+            key = f"{self.settings['prefix']}{digest}.zip"
+            try:
+                self.s3.head_object(Bucket=bucket, Key=key)
+                self.logger.info(f" Lambda artifact already staged: s3://{bucket}/{key}")
+            except ClientError:
+                self.s3.upload_file(Filename=path, Bucket=bucket, Key=key)
+                self.logger.info(f" Staged Lambda artifact {path} to s3://{bucket}/{key}")
+            with self.lock:
+                self.staged[digest] = key
+            return key
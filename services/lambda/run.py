@@ -1,7 +1,26 @@
 import os
 import json
-import boto3
-import yaml
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.aws import get_client
+from utils.config_loader import iter_yaml_list
+from utils.helpers import latency_histogram
+from utils.throttling import AdaptiveConcurrency, call_with_backoff, NO_SDK_RETRIES
+from utils.validation import RuleSet, Required, FileExists
+from utils.plan import Plan, list_index, load_state, changed_fields, CREATE, UPDATE, NOOP
+from utils.pipeline import stream, batched, load_pipeline_settings, DEFAULT_PIPELINE_SETTINGS
+from .artifacts import ArtifactStager
+
+DEFAULT_DEPLOY_SETTINGS = {
+    "max_workers": 16,            # upper bound on concurrent Lambda API calls
+    "initial_concurrency": 4,
+    "max_attempts": 6,            # attempts per call when AWS throttles
+    "base_delay": 0.5,
+    "max_delay": 20.0,
+}
+
+# Configuration fields compared against list_functions when planning updates
+LAMBDA_CONFIG_FIELDS = ("Role", "Handler", "Runtime", "Description", "Timeout", "MemorySize")
 
 def run(config, logger):
     logger.info(" Starting Lambda service migration...")
@@ -9,22 +28,23 @@ def run(config, logger):
     dry_run = config.get("dry_run", False)
     lambda_config_path = config.get("lambda_config_path", "data/lambda_config.yaml")
 
-    lambda_definitions = extract_lambda_configs(lambda_config_path, logger)
-    transformed_functions = transform_lambda_configs(lambda_definitions, logger)
-    validated_functions = validate_lambda_configs(transformed_functions, logger)
+    pipeline = load_pipeline_settings(config.get("pipeline"))
+
+    lambda_definitions = extract_lambda_configs(lambda_config_path, logger, pipeline["stream_sources"])
+    # Functions are transformed and validated batch by batch while earlier batches deploy
+    validated_functions = stream(lambda_definitions, {
+        "transform": lambda batch: transform_lambda_configs(batch, logger),
+        "validate": lambda batch: validate_lambda_configs(batch, logger),
+    }, pipeline, "lambda")
 
-    deploy_lambda_functions(validated_functions, logger, dry_run)
+    deploy_lambda_functions(
+        validated_functions, logger, dry_run, config.get("lambda_artifacts"), config.get("lambda_deploy"),
+        config.get("plan_only", False), pipeline["batch_size"]
+    )
 
 # Step 1: Extract Lambda config from YAML
-def extract_lambda_configs(path, logger):
-    try:
-        with open(path, 'r') as f:
-            config_data = yaml.safe_load(f)
-            logger.info(f" Loaded Lambda config from {path}")
-            return config_data.get("functions", [])
-    except Exception as e:
-        logger.error(f" Failed to load Lambda config: {e}")
-        return []
+def extract_lambda_configs(path, logger, stream=True):
+    return iter_yaml_list(path, "functions", logger, stream)
 
 # Step 2: Transform to AWS-compatible format
 def transform_lambda_configs(functions, logger):
@@ -35,9 +55,8 @@ def transform_lambda_configs(functions, logger):
             "Runtime": fn.get("runtime", "python3.9"),
             "Role": fn.get("role_arn"),
             "Handler": fn.get("handler", "lambda_function.lambda_handler"),
-            "Code": {
-                "ZipFile": open(fn.get("artifact_path", "dist/lambda.zip"), "rb").read()
-            },
+            # Artifact bytes are only read at deploy time, see deploy_lambda_functions
+            "ArtifactPath": fn.get("artifact_path", "dist/lambda.zip"),
             "Description": fn.get("description", ""),
             "Timeout": fn.get("timeout", 10),
             "MemorySize": fn.get("memory", 128),
@@ -47,54 +66,174 @@ def transform_lambda_configs(functions, logger):
     return transformed
 
 # Step 3: Validate Lambda configs
+LAMBDA_RULES = RuleSet([
+    Required("FunctionName", "Missing function name"),
+    Required("Role", "Missing IAM role ARN"),
+    Required("Handler", "Missing handler"),
+    Required("Runtime", "Missing runtime"),
+    FileExists("ArtifactPath", "Missing code artifact: {value}"),
+], key_path="FunctionName")
+
 def validate_lambda_configs(functions, logger):
-    validated = []
-    for fn in functions:
-        issues = []
-
-        if not fn.get("FunctionName"):
-            issues.append("Missing function name")
-        if not fn.get("Role"):
-            issues.append("Missing IAM role ARN")
-        if not fn.get("Handler"):
-            issues.append("Missing handler")
-        if not fn.get("Runtime"):
-            issues.append("Missing runtime")
-        if not fn.get("Code"):
-            issues.append("Missing code artifact")
-
-        if issues:
-            logger.warning(f" Lambda '{fn.get('FunctionName', 'Unnamed')}' has issues: {', '.join(issues)}")
-        else:
-            validated.append(fn)
+    report = LAMBDA_RULES.evaluate(functions)
+    report.log(logger, "Lambda")
+    validated = report.valid_records()
 
     logger.info(f" {len(validated)} Lambda functions passed validation.")
     return validated
 
-# Step 4: Deploy Lambda functions
-def deploy_lambda_functions(functions, logger, dry_run=False):
-    client = boto3.client("lambda")
-
+# Step 4: Plan function changes. Code is compared by SHA-256, which list_functions returns
+# as CodeSha256, so unchanged functions cost no upload and no API call.
+def plan_lambda_functions(plan, existing, stager, functions):
+    entries = []
     for fn in functions:
         name = fn["FunctionName"]
-
-        if dry_run:
-            logger.info(f"[Dry Run] Would deploy Lambda function: {name}")
+        current = existing.get(name)
+        if current is None:
+            entries.append(plan.add(CREATE, name, fn))
             continue
+        changes = changed_fields(fn, current, {field: field for field in LAMBDA_CONFIG_FIELDS})
+        try:
+            code_sha = stager.digest(fn["ArtifactPath"])["b64"]
+        except OSError:
+            code_sha = None
+        if code_sha != current.get("CodeSha256"):
+            changes["Code"] = {"from": current.get("CodeSha256"), "to": code_sha}
+        entries.append(plan.add(UPDATE if changes else NOOP, name, fn, changes))
+    return entries
+
+# Step 5: Deploy Lambda functions
+def _update_function(client, stager, fn, changes, limiter, retry, logger):
+    name = fn["FunctionName"]
+    config_changes = {field: fn[field] for field in LAMBDA_CONFIG_FIELDS if field in changes}
+    if config_changes:
+        call_with_backoff(client.update_function_configuration, limiter, **retry, FunctionName=name, **config_changes)
+        logger.info(f" Updated configuration for Lambda: {name} ({', '.join(sorted(config_changes))})")
+    if "Code" in changes:
+        if config_changes:
+            # A code update is rejected while the configuration update is still in progress;
+            # the waiter polls on the default client, which keeps the SDK's retries
+            get_client("lambda").get_waiter("function_updated").wait(FunctionName=name)
+        update_payload = {"FunctionName": name}
+        update_payload.update(stager.code_for(fn["ArtifactPath"]))
+        call_with_backoff(client.update_function_code, limiter, **retry, **update_payload)
+        logger.info(f" Updated code for existing Lambda: {name}")
+
+def _deploy_function(client, stager, entry, limiter, settings, logger):
+    fn = entry["item"]
+    name = fn["FunctionName"]
+    retry = {k: settings[k] for k in ("max_attempts", "base_delay", "max_delay")}
+    started = time.perf_counter()
+
+    if entry["action"] == UPDATE:
+        try:
+            _update_function(client, stager, fn, entry["changes"], limiter, retry, logger)
+        except Exception as e:
+            logger.error(f" Failed to update Lambda function {name}: {e}")
+            return None
+        return time.perf_counter() - started
+
+    try:
+        code = stager.code_for(fn["ArtifactPath"])
+    except Exception as e:
+        logger.error(f" Failed to load artifact for Lambda function {name}: {e}")
+        return None
+
+    payload = {k: v for k, v in fn.items() if k != "ArtifactPath"}
+    payload["Code"] = code
 
+    try:
+        call_with_backoff(client.create_function, limiter, **retry, **payload)
+        logger.info(f" Created Lambda function: {name}")
+    except client.exceptions.ResourceConflictException:
+        logger.warning(f" Function already exists: {name}")
         try:
-            client.create_function(**fn)
-            logger.info(f" Created Lambda function: {name}")
-        except client.exceptions.ResourceConflictException:
-            logger.warning(f" Function already exists: {name}")
-            try:
-                update_payload = {
-                    "FunctionName": name,
-                    "ZipFile": fn["Code"]["ZipFile"]
-                }
-                client.update_function_code(**update_payload)
-                logger.info(f" Updated code for existing Lambda: {name}")
-            except Exception as e:
-                logger.error(f" Failed to update Lambda code: {e}")
+            update_payload = {"FunctionName": name}
+            update_payload.update(code)
+            call_with_backoff(client.update_function_code, limiter, **retry, **update_payload)
+            logger.info(f" Updated code for existing Lambda: {name}")
         except Exception as e:
-            logger.error(f" Failed to create Lambda function {name}: {e}")
\ No newline at end of file
+            logger.error(f" Failed to update Lambda code: {e}")
+            return None
+    except Exception as e:
+        logger.error(f" Failed to create Lambda function {name}: {e}")
+        return None
+    return time.perf_counter() - started
+
+# Functions may be any iterable (e.g. a streamed pipeline). Each batch is planned and
+# deployed on one shared pool, so the adaptive limiter carries over between batches.
+def deploy_lambda_functions(functions, logger, dry_run=False, artifact_settings=None, deploy_settings=None, plan_only=False, batch_size=DEFAULT_PIPELINE_SETTINGS["batch_size"]):
+    if dry_run:
+        for fn in functions:
+            logger.info(f"[Dry Run] Would deploy Lambda function: {fn['FunctionName']}")
+        return
+
+    settings = dict(DEFAULT_DEPLOY_SETTINGS)
+    settings.update({k: v for k, v in (deploy_settings or {}).items() if v is not None})
+
+    client = get_client("lambda")
+    # Deploy calls are retried by call_with_backoff, which needs to see every throttling error
+    deploy_client = get_client("lambda", retries=NO_SDK_RETRIES)
+    stager = ArtifactStager(get_client("s3"), artifact_settings, logger)
+    existing = load_state(logger, "Lambda function", client, "list_functions", "Functions", "FunctionName")
+    plan = Plan("Lambda function")
+    limiter = AdaptiveConcurrency(settings["initial_concurrency"], 1, settings["max_workers"])
+    latencies = []
+    attempted = 0
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        for batch in batched(functions, batch_size):
+            entries = plan_lambda_functions(plan, existing, stager, batch)
+            plan.log_entries(logger, entries)
+            if plan_only:
+                continue
+
+            changes = [entry for entry in entries if entry["action"] != NOOP]
+            stager.prepare([entry["item"]["ArtifactPath"] for entry in changes])
+            attempted += len(changes)
+            latencies.extend(pool.map(lambda entry: _deploy_function(deploy_client, stager, entry, limiter, settings, logger), changes))
+
+    plan.log_summary(logger)
+    if plan_only:
+        return plan
+
+    deployed = [latency for latency in latencies if latency is not None]
+    histogram = latency_histogram(deployed)
+    logger.info(
+        f" Deployed {len(deployed)}/{attempted} changed Lambda functions "
+        f"(throttled {limiter.throttled} times, final concurrency {int(limiter.limit)}): "
+        f"p50 {histogram['p50']:.2f}s, p95 {histogram['p95']:.2f}s, max {histogram['max']:.2f}s"
+    )
+    logger.info(f" Lambda deploy latency histogram: {histogram['buckets']}")
+    return histogram
+
+# Step 6: Verify deployed functions against the inventory. list_functions returns CodeSha256
+# and the configuration fields, so one paginated listing covers every function.
+def verify(config, logger, reconciliation, settings):
+    definitions = extract_lambda_configs(config.get("lambda_config_path", "data/lambda_config.yaml"), logger, False)
+    functions = validate_lambda_configs(transform_lambda_configs(definitions, logger), logger)
+    # Only digests are needed, so the stager never touches S3
+    stager = ArtifactStager(None, config.get("lambda_artifacts"), logger)
+
+    def code_sha(fn):
+        try:
+            return stager.digest(fn["ArtifactPath"])["b64"]
+        except OSError:
+            return None
+
+    def expected_fields(fn, digest):
+        fields = {field: fn[field] for field in LAMBDA_CONFIG_FIELDS}
+        fields["CodeSha256"] = digest
+        return fields
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        digests = list(pool.map(code_sha, functions))
+    by_name = {fn["FunctionName"]: (fn, digest) for fn, digest in zip(functions, digests)}
+    for name, (fn, digest) in by_name.items():
+        reconciliation.expect("function", name, expected_fields(fn, digest))
+    reconciliation.rebuild("function", lambda name: expected_fields(*by_name[name]))
+
+    for name, current in list_index(get_client("lambda"), "list_functions", "Functions", "FunctionName").items():
+        fields = {field: current.get(field) for field in LAMBDA_CONFIG_FIELDS + ("CodeSha256",)}
+        # Functions in the account that this inventory does not manage are only drift with report_unexpected
+        reconciliation.observe("function", name, fields, unexpected=settings["report_unexpected"])
@@ -0,0 +1,461 @@
+import datetime
+import decimal
+import importlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.metrics import METRICS
+
+DEFAULT_COPY_SETTINGS = {
+    "enabled": False,
+    "copies": [],                 # [{name, source, target, tables}]; see config/default.yaml
+    "max_workers": 8,             # chunks copied in parallel across all tables
+    "chunk_rows": 50000,          # rows per primary-key range; a chunk is one target transaction
+    "batch_size": 5000,           # rows per fetchmany / executemany / COPY call
+    "bulk": "executemany",        # "copy" uses COPY FROM STDIN on PostgreSQL targets
+    "checkpoint_dir": "logs/rds_copy",
+    "verify_counts": True,
+}
+
+def load_copy_settings(overrides=None):
+    settings = dict(DEFAULT_COPY_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+MYSQL_DRIVERS = {"pymysql", "MySQLdb", "mysql.connector"}
+
+# A DB-API 2.0 database: {"driver": "sqlite3" | "psycopg2" | "pymysql" | ..., "connect": {kwargs}
+# or "dsn": "...", "schema": ...}. "password_env" names an environment variable holding the password.
+class Endpoint:
+    def __init__(self, spec):
+        self.driver = spec.get("driver", "sqlite3")
+        self.module = importlib.import_module(self.driver)
+        self.dsn = spec.get("dsn")
+        self.kwargs = dict(spec.get("connect") or {})
+        if spec.get("password_env"):
+            self.kwargs["password"] = os.environ[spec["password_env"]]
+        self.schema = spec.get("schema")
+        self.paramstyle = getattr(self.module, "paramstyle", "qmark")
+        self.mysql = self.driver in MYSQL_DRIVERS
+
+    def connect(self):
+        return self.module.connect(self.dsn, **self.kwargs) if self.dsn else self.module.connect(**self.kwargs)
+
+    def quote(self, name):
+        mark = "`" if self.mysql else '"'
+        return ".".join(f"{mark}{part.replace(mark, mark * 2)}{mark}" for part in name.split("."))
+
+    # Returns n placeholders and a function turning a value tuple into driver parameters
+    def placeholders(self, n):
+        if self.paramstyle == "qmark":
+            return ["?"] * n, tuple
+        if self.paramstyle == "numeric":
+            return [f":{i + 1}" for i in range(n)], tuple
+        if self.paramstyle == "named":
+            return [f":p{i}" for i in range(n)], lambda values: {f"p{i}": v for i, v in enumerate(values)}
+        return ["%s"] * n, tuple
+
+# A cursor that streams results instead of buffering the whole result set on the client:
+# a named (server-side) cursor on PostgreSQL, SSCursor on MySQL. sqlite3 already streams.
+def streaming_cursor(conn, endpoint, name):
+    if endpoint.driver.startswith("psycopg"):
+        return conn.cursor(name=name)
+    if endpoint.driver in ("pymysql", "MySQLdb"):
+        return conn.cursor(importlib.import_module(f"{endpoint.driver}.cursors").SSCursor)
+    if endpoint.driver == "mysql.connector":
+        return conn.cursor(buffered=False)
+    return conn.cursor()
+
+def _fetch(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def discover_tables(conn, endpoint):
+    if endpoint.driver == "sqlite3":
+        rows = _fetch(conn, "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        return [r[0] for r in rows]
+    marks, params = endpoint.placeholders(1)
+    schema = endpoint.schema or ("public" if not endpoint.mysql else None)
+    if schema is None:
+        rows = _fetch(conn, "SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE' ORDER BY table_name")
+    else:
+        rows = _fetch(conn, f"SELECT table_name FROM information_schema.tables WHERE table_schema = {marks[0]} AND table_type = 'BASE TABLE' ORDER BY table_name", params((schema,)))
+    return [r[0] for r in rows]
+
+def primary_key(conn, endpoint, table):
+    if endpoint.driver == "sqlite3":
+        rows = _fetch(conn, f"PRAGMA table_info({endpoint.quote(table)})")
+        return [r[1] for r in sorted((r for r in rows if r[5]), key=lambda r: r[5])]
+    if endpoint.mysql and not endpoint.schema:
+        schema_filter, values = "DATABASE()", (table,)
+    else:
+        schema_filter, values = "{}", (endpoint.schema or "public", table)
+    marks, params = endpoint.placeholders(len(values))
+    rows = _fetch(conn, (
+        "SELECT k.column_name FROM information_schema.table_constraints c "
+        "JOIN information_schema.key_column_usage k "
+        "ON k.constraint_name = c.constraint_name AND k.table_schema = c.table_schema AND k.table_name = c.table_name "
+        f"WHERE c.constraint_type = 'PRIMARY KEY' AND c.table_schema = {schema_filter.format(marks[0])} AND c.table_name = {marks[-1]} "
+        "ORDER BY k.ordinal_position"
+    ), params(values))
+    return [r[0] for r in rows]
+
+def table_columns(conn, endpoint, table):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {endpoint.quote(table)} WHERE 1 = 0")
+        return [d[0] for d in cursor.description]
+    finally:
+        cursor.close()
+
+# Half-open key range [low, high); None leaves that side open, so rows added past the ends
+# after planning still land in the first or last chunk.
+def _range_clause(endpoint, key, chunk):
+    conditions, values = [], []
+    if chunk["low"] is not None:
+        conditions.append(f"{endpoint.quote(key)} >= {{}}")
+        values.append(chunk["low"])
+    if chunk["high"] is not None:
+        conditions.append(f"{endpoint.quote(key)} < {{}}")
+        values.append(chunk["high"])
+    if not conditions:
+        return "", ()
+    marks, params = endpoint.placeholders(len(values))
+    return " WHERE " + " AND ".join(c.format(m) for c, m in zip(conditions, marks)), params(values)
+
+# Integer keys are split arithmetically from MIN/MAX/COUNT; other keys by reading every
+# chunk_rows-th key in order through a streaming cursor, so only the boundaries are kept.
+# Tables without a single-column key are copied as one chunk.
+def plan_chunks(conn, endpoint, table, key, chunk_rows):
+    if key is None:
+        return [{"id": 0, "low": None, "high": None}]
+    low, high, count = _fetch(conn, f"SELECT MIN({endpoint.quote(key)}), MAX({endpoint.quote(key)}), COUNT(*) FROM {endpoint.quote(table)}")[0]
+    if not count:
+        return [{"id": 0, "low": None, "high": None}]
+
+    if isinstance(low, int) and isinstance(high, int):
+        chunks = max(1, -(-count // chunk_rows))
+        step = max(1, -(-(high - low + 1) // chunks))
+        bounds = [low + i * step for i in range(1, chunks) if low + i * step <= high]
+    else:
+        bounds = []
+        cursor = streaming_cursor(conn, endpoint, "plan_chunks")
+        try:
+            cursor.execute(f"SELECT {endpoint.quote(key)} FROM {endpoint.quote(table)} ORDER BY {endpoint.quote(key)}")
+            seen = 0
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                if seen:
+                    bounds.append(rows[0][0])
+                seen += len(rows)
+        finally:
+            cursor.close()
+
+    edges = [None] + bounds + [None]
+    return [{"id": i, "low": edges[i], "high": edges[i + 1]} for i in range(len(edges) - 1)]
+
+# Chunk bounds that JSON cannot carry are journaled as {"type": ..., "value": ...} and
+# restored on load, so a resumed run compares keys with values of the original type
+BOUND_TYPES = {
+    "bytes": (lambda v: bytes(v).hex(), bytes.fromhex),
+    "datetime": (lambda v: v.isoformat(), datetime.datetime.fromisoformat),
+    "date": (lambda v: v.isoformat(), datetime.date.fromisoformat),
+    "time": (lambda v: v.isoformat(), datetime.time.fromisoformat),
+    "decimal": (str, decimal.Decimal),
+    "uuid": (str, uuid.UUID),
+}
+
+def _bound_type(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes"
+    # datetime is a subclass of date, so it is checked first
+    for name, cls in (("datetime", datetime.datetime), ("date", datetime.date), ("time", datetime.time), ("decimal", decimal.Decimal), ("uuid", uuid.UUID)):
+        if isinstance(value, cls):
+            return name
+    return None
+
+def encode_bound(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    kind = _bound_type(value)
+    if kind is None:
+        raise TypeError(f"Cannot journal a chunk bound of type {type(value).__name__}")
+    return {"type": kind, "value": BOUND_TYPES[kind][0](value)}
+
+def decode_bound(value):
+    if isinstance(value, dict):
+        return BOUND_TYPES[value["type"]][1](value["value"])
+    return value
+
+# Append-only JSONL journal per table: the chunk plan first, then one line per committed
+# chunk. A restart reuses the saved plan, so chunk boundaries match the earlier run.
+class TableCheckpoint:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.plan = None
+        self.done = {}
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("event") == "plan":
+                        entry["chunks"] = [dict(c, low=decode_bound(c["low"]), high=decode_bound(c["high"])) for c in entry["chunks"]]
+                        self.plan = entry
+                        self.done = {}
+                    elif entry.get("event") == "chunk":
+                        self.done[entry["id"]] = entry
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.handle = open(path, "a")
+
+    def _append(self, entry):
+        with self.lock:
+            self.handle.write(json.dumps(entry) + "\n")
+            self.handle.flush()
+
+    def record_plan(self, key, columns, chunks):
+        self.plan = {"event": "plan", "key": key, "columns": columns, "chunks": chunks}
+        self.done = {}
+        self._append(dict(self.plan, chunks=[dict(c, low=encode_bound(c["low"]), high=encode_bound(c["high"])) for c in chunks]))
+
+    def record_chunk(self, chunk, rows, seconds):
+        entry = {"event": "chunk", "id": chunk["id"], "rows": rows, "seconds": round(seconds, 4)}
+        with self.lock:
+            self.done[chunk["id"]] = entry
+        self._append(entry)
+
+    def close(self):
+        with self.lock:
+            self.handle.close()
+
+def _executemany(endpoint, cursor, insert, batch):
+    cursor.executemany(insert, batch)
+
+COPY_TYPES = (str, int, float, decimal.Decimal, uuid.UUID, datetime.date, datetime.time, dict, bytes, bytearray, memoryview)
+
+# One CSV field for COPY: NULL is the unquoted empty field and every other value is quoted,
+# so empty strings survive; binary values use bytea's \x hex form
+def _copy_field(value):
+    if value is None:
+        return ""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    text = json.dumps(value) if isinstance(value, dict) else str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+# COPY FROM STDIN for PostgreSQL targets: psycopg 3 adapts each value itself; for psycopg2
+# the batch is written as CSV, and batches holding types CSV cannot carry (arrays,
+# intervals, ...) fall back to executemany
+def _copy(cursor, table_sql, insert, batch):
+    if not hasattr(cursor, "copy_expert"):
+        with cursor.copy(f"COPY {table_sql} FROM STDIN") as copy:
+            for row in batch:
+                copy.write_row(row)
+        return
+    if any(v is not None and not isinstance(v, COPY_TYPES) for row in batch for v in row):
+        cursor.executemany(insert, batch)
+        return
+    buffer = io.StringIO()
+    for row in batch:
+        buffer.write(",".join(_copy_field(v) for v in row) + "\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table_sql} FROM STDIN WITH (FORMAT csv)", buffer)
+
+# Copies one key range in one target transaction. The range is deleted first, so a chunk that
+# was committed but not yet journaled before a crash is copied again without duplicates.
+def copy_chunk(job, connections, settings):
+    source, target = job["source"], job["target"]
+    src_conn, dst_conn = connections(source), connections(target)
+    table, key, columns = job["table"], job["key"], job["columns"]
+    started = time.perf_counter()
+
+    src_where, src_params = _range_clause(source, key, job["chunk"]) if key else ("", ())
+    dst_where, dst_params = _range_clause(target, key, job["chunk"]) if key else ("", ())
+    select = f"SELECT {', '.join(source.quote(c) for c in columns)} FROM {source.quote(table)}{src_where}"
+    if key:
+        select += f" ORDER BY {source.quote(key)}"
+    marks, _ = target.placeholders(len(columns))
+    column_list = ", ".join(target.quote(c) for c in columns)
+    statement, write = f"INSERT INTO {target.quote(table)} ({column_list}) VALUES ({', '.join(marks)})", _executemany
+    if target.paramstyle == "named":
+        statement_params = target.placeholders(len(columns))[1]
+        write = lambda endpoint, cursor, sql, batch: cursor.executemany(sql, [statement_params(r) for r in batch])
+    if settings["bulk"] == "copy" and target.driver.startswith("psycopg"):
+        table_sql = f"{target.quote(table)} ({column_list})"
+        write = lambda endpoint, cursor, sql, batch: _copy(cursor, table_sql, sql, batch)
+
+    rows = 0
+    src_cursor, dst_cursor = streaming_cursor(src_conn, source, f"copy_chunk_{job['chunk']['id']}"), dst_conn.cursor()
+    try:
+        dst_cursor.execute(f"DELETE FROM {target.quote(table)}{dst_where}", dst_params)
+        src_cursor.execute(select, src_params)
+        while True:
+            batch = src_cursor.fetchmany(settings["batch_size"])
+            if not batch:
+                break
+            write(target, dst_cursor, statement, batch)
+            rows += len(batch)
+            METRICS.inc("migration_rds_rows_copied_total", len(batch), table=table)
+        dst_conn.commit()
+    except Exception:
+        dst_conn.rollback()
+        raise
+    finally:
+        src_cursor.close()
+        dst_cursor.close()
+        # Ends the source read transaction so it does not pin old row versions
+        src_conn.rollback()
+    seconds = time.perf_counter() - started
+    METRICS.observe("migration_rds_chunk_seconds", seconds, table=table)
+    return rows, seconds
+
+# Each worker thread keeps one connection per endpoint; DB-API connections are not shared
+class _Connections:
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened = []
+
+    def __call__(self, endpoint):
+        connections = getattr(self.local, "connections", None)
+        if connections is None:
+            connections = self.local.connections = {}
+        if id(endpoint) not in connections:
+            conn = endpoint.connect()
+            connections[id(endpoint)] = conn
+            with self.lock:
+                self.opened.append(conn)
+        return connections[id(endpoint)]
+
+    def close(self):
+        with self.lock:
+            for conn in self.opened:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self.opened = []
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+def _prepare_tables(copy, source, settings, logger):
+    conn = source.connect()
+    try:
+        tables = copy.get("tables") or discover_tables(conn, source)
+        prepared = []
+        for entry in tables:
+            entry = {"name": entry} if isinstance(entry, str) else dict(entry)
+            table = entry["name"]
+            checkpoint = TableCheckpoint(os.path.join(settings["checkpoint_dir"], _safe_name(copy["name"]), f"{_safe_name(table)}.jsonl"))
+            if checkpoint.plan is None:
+                keys = [entry["key"]] if entry.get("key") else primary_key(conn, source, table)
+                key = keys[0] if len(keys) == 1 else None
+                if key is None:
+                    logger.warning(f" Table {table} has no single-column primary key; it is copied as one chunk")
+                columns = entry.get("columns") or table_columns(conn, source, table)
+                checkpoint.record_plan(key, columns, plan_chunks(conn, source, table, key, entry.get("chunk_rows") or settings["chunk_rows"]))
+            conn.rollback()
+            prepared.append((table, checkpoint))
+        return prepared
+    finally:
+        conn.close()
+
+def _count(endpoint, table):
+    conn = endpoint.connect()
+    try:
+        return _fetch(conn, f"SELECT COUNT(*) FROM {endpoint.quote(table)}")[0][0]
+    finally:
+        conn.close()
+
+# Copies the tables of one source database to the target. Target tables must already exist.
+# Chunks of all tables share one pool, so a large table is spread over every worker.
+# The source should be quiesced or a replica: chunks are read in separate transactions.
+def copy_database(copy, logger, settings=None):
+    settings = load_copy_settings(settings)
+    source, target = Endpoint(copy["source"]), Endpoint(copy["target"])
+    started = time.perf_counter()
+    tables = _prepare_tables(copy, source, settings, logger)
+
+    jobs = []
+    report = {}
+    for table, checkpoint in tables:
+        plan = checkpoint.plan
+        pending = [c for c in plan["chunks"] if c["id"] not in checkpoint.done]
+        report[table] = {
+            "chunks": len(plan["chunks"]),
+            "resumed_chunks": len(plan["chunks"]) - len(pending),
+            "rows": sum(e["rows"] for e in checkpoint.done.values()),
+            "copied_rows": 0,
+            "seconds": 0.0,
+            "failed_chunks": [],
+        }
+        for chunk in pending:
+            jobs.append({"table": table, "key": plan["key"], "columns": plan["columns"], "chunk": chunk,
+                         "source": source, "target": target, "checkpoint": checkpoint})
+    logger.info(f" Copying {copy['name']}: {len(tables)} tables, {len(jobs)} chunks to copy")
+
+    connections = _Connections()
+    try:
+        with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+            futures = {pool.submit(copy_chunk, job, connections, settings): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                entry = report[job["table"]]
+                try:
+                    rows, seconds = future.result()
+                except Exception as e:
+                    entry["failed_chunks"].append(job["chunk"]["id"])
+                    logger.error(f" Failed to copy {job['table']} chunk {job['chunk']['id']}: {e}")
+                    continue
+                job["checkpoint"].record_chunk(job["chunk"], rows, seconds)
+                entry["rows"] += rows
+                entry["copied_rows"] += rows
+                entry["seconds"] += seconds
+    finally:
+        connections.close()
+        for _, checkpoint in tables:
+            checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    for table, entry in report.items():
+        entry["status"] = "failed" if entry["failed_chunks"] else "copied"
+        if settings["verify_counts"] and not entry["failed_chunks"]:
+            entry["source_count"], entry["target_count"] = _count(source, table), _count(target, table)
+            if entry["source_count"] != entry["target_count"]:
+                entry["status"] = "count_mismatch"
+                logger.warning(f" {table}: {entry['source_count']} rows in the source, {entry['target_count']} in the target")
+        rate = entry["copied_rows"] / entry["seconds"] if entry["seconds"] else 0.0
+        logger.info(f" {table}: {entry['status']}, {entry['copied_rows']} rows copied ({entry['resumed_chunks']}/{entry['chunks']} chunks resumed), {rate:,.0f} rows/s per worker")
+
+    copied = sum(e["copied_rows"] for e in report.values())
+    logger.info(f" Copied {copied} rows for {copy['name']} in {elapsed:.2f}s ({copied / max(elapsed, 1e-9):,.0f} rows/s)")
+    return {"name": copy["name"], "seconds": elapsed, "rows": copied, "rows_per_second": copied / max(elapsed, 1e-9), "tables": report}
+
+def copy_databases(settings, logger):
+    settings = load_copy_settings(settings)
+    reports = []
+    for copy in settings["copies"]:
+        try:
+            reports.append(copy_database(copy, logger, settings))
+        except Exception as e:
+            logger.error(f" Failed to copy database {copy.get('name')}: {e}")
+            reports.append({"name": copy.get("name"), "error": str(e)})
+    return reports
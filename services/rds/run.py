@@ -1,6 +1,41 @@
 import os
-import boto3
-from utils.config_loader import load_yaml_config
+import time
+from utils.aws import get_client
+from utils.config_loader import iter_yaml_list
+from utils.validation import RuleSet, Required, Predicate, Minimum
+from utils.plan import Plan, list_index, load_state, changed_fields, CREATE, UPDATE, NOOP
+from utils.pipeline import stream, batched, load_pipeline_settings, DEFAULT_PIPELINE_SETTINGS
+from services.rds.data_copy import copy_databases, load_copy_settings
+
+DEFAULT_PROVISIONING_SETTINGS = {
+    "wait": False,                # poll until every instance is available or failed
+    "poll_interval": 30,
+    "timeout": 3600,
+}
+
+FAILED_STATUSES = {
+    "failed",
+    "incompatible-credentials",
+    "incompatible-network",
+    "incompatible-option-group",
+    "incompatible-parameters",
+    "incompatible-restore",
+    "inaccessible-encryption-credentials",
+    "storage-full",
+}
+
+# describe_db_instances accepts a bounded number of filter values per call
+FILTER_CHUNK = 100
+
+# Fields diffed against describe_db_instances and applied with modify_db_instance
+RDS_MODIFIABLE_FIELDS = (
+    "AllocatedStorage",
+    "DBInstanceClass",
+    "BackupRetentionPeriod",
+    "MultiAZ",
+    "PubliclyAccessible",
+    "StorageType",
+)
 
 def run(config, logger):
     logger.info(" Starting RDS migration...")
@@ -8,11 +43,25 @@ def run(config, logger):
     dry_run = config.get("dry_run", False)
     rds_config_path = config.get("rds_config_path", "config/rds_config.yaml")
 
-    rds_definitions = load_yaml_config(rds_config_path, logger).get("instances", [])
-    transformed_instances = transform_rds_configs(rds_definitions, logger)
-    validated_instances = validate_rds_configs(transformed_instances, logger)
+    pipeline = load_pipeline_settings(config.get("pipeline"))
 
-    deploy_rds_instances(validated_instances, logger, dry_run)
+    rds_definitions = iter_yaml_list(rds_config_path, "instances", logger, pipeline["stream_sources"])
+    # Instances are transformed and validated batch by batch while earlier batches deploy
+    validated_instances = stream(rds_definitions, {
+        "transform": lambda batch: transform_rds_configs(batch, logger),
+        "validate": lambda batch: validate_rds_configs(batch, logger),
+    }, pipeline, "rds")
+
+    deploy_rds_instances(validated_instances, logger, dry_run, config.get("rds_provisioning"), config.get("plan_only", False), pipeline["batch_size"])
+
+    # Table data is copied once the target instances exist; rds_provisioning.wait makes sure they are available
+    copy_settings = load_copy_settings(config.get("rds_data_copy"))
+    if copy_settings["enabled"] and copy_settings["copies"]:
+        if dry_run or config.get("plan_only", False):
+            for copy in copy_settings["copies"]:
+                logger.info(f"[Dry Run] Would copy table data for database: {copy['name']}")
+        else:
+            copy_databases(copy_settings, logger)
 
 # Step 1: Transform to AWS-compatible format
 def transform_rds_configs(instances, logger):
@@ -37,43 +86,169 @@ def transform_rds_configs(instances, logger):
     return transformed
 
 # Step 2: Validate RDS configs
+RDS_RULES = RuleSet([
+    Required("DBInstanceIdentifier", "Missing DB instance name"),
+    Required("Engine", "Missing database engine"),
+    Predicate(None, lambda db: db.get("MasterUsername") and db.get("MasterUserPassword"), "Missing master credentials"),
+    Minimum("AllocatedStorage", 20, "Storage must be at least 20 GB"),
+], key_path="DBInstanceIdentifier")
+
 def validate_rds_configs(instances, logger):
-    validated = []
-    for db in instances:
-        issues = []
-
-        if not db.get("DBInstanceIdentifier"):
-            issues.append("Missing DB instance name")
-        if not db.get("Engine"):
-            issues.append("Missing database engine")
-        if not db.get("MasterUsername") or not db.get("MasterUserPassword"):
-            issues.append("Missing master credentials")
-        if db.get("AllocatedStorage", 0) < 20:
-            issues.append("Storage must be at least 20 GB")
-
-        if issues:
-            logger.warning(f" RDS '{db.get('DBInstanceIdentifier', 'Unnamed')}' has issues: {', '.join(issues)}")
-        else:
-            validated.append(db)
+    report = RDS_RULES.evaluate(instances)
+    report.log(logger, "RDS")
+    validated = report.valid_records()
 
     logger.info(f" {len(validated)} RDS instances passed validation.")
     return validated
 
-# Step 3: Deploy RDS instances
-def deploy_rds_instances(instances, logger, dry_run=False):
-    client = boto3.client("rds")
+# Modifications deferred to the maintenance window are listed in PendingModifiedValues;
+# they count as applied, so reruns do not modify the instance again in the meantime
+def effective_instance(current):
+    return dict(current, **(current.get("PendingModifiedValues") or {}))
 
+# Step 3: Plan instance changes against one listing of the existing instances
+def plan_rds_instances(plan, existing, instances, logger=None):
+    entries = []
     for db in instances:
         name = db["DBInstanceIdentifier"]
+        current = existing.get(name)
+        if current is None:
+            entries.append(plan.add(CREATE, name, db))
+            continue
+        changes = changed_fields(db, effective_instance(current), {field: field for field in RDS_MODIFIABLE_FIELDS})
+        storage = changes.get("AllocatedStorage")
+        if storage and storage["from"] is not None and storage["to"] < storage["from"]:
+            # RDS cannot shrink allocated storage, so the modify would only fail
+            del changes["AllocatedStorage"]
+            if logger:
+                logger.warning(f" RDS instance {name} has {storage['from']} GB allocated; storage cannot be reduced to {storage['to']} GB")
+        entries.append(plan.add(UPDATE if changes else NOOP, name, db, changes))
+    return entries
+
+# Step 4: Deploy RDS instances
+def _apply_instances(client, entries, submitted, logger):
+    for entry in entries:
+        name = entry["name"]
+        db = entry["item"]
 
-        if dry_run:
-            logger.info(f"[Dry Run] Would create RDS instance: {name}")
+        if entry["action"] == NOOP:
+            submitted[name] = time.monotonic()
             continue
 
         try:
-            client.create_db_instance(**db)
-            logger.info(f" Created RDS instance: {name}")
+            if entry["action"] == UPDATE:
+                # Applied in the next maintenance window rather than restarting the instance now
+                client.modify_db_instance(
+                    DBInstanceIdentifier=name,
+                    ApplyImmediately=False,
+                    **{field: db[field] for field in entry["changes"]}
+                )
+                logger.info(f" Modified RDS instance: {name} ({', '.join(sorted(entry['changes']))})")
+            else:
+                client.create_db_instance(**db)
+                logger.info(f" Created RDS instance: {name}")
+            submitted[name] = time.monotonic()
         except client.exceptions.DBInstanceAlreadyExistsFault:
             logger.warning(f" RDS instance already exists: {name}")
+            submitted[name] = time.monotonic()
         except Exception as e:
-            logger.error(f" Failed to create RDS instance {name}: {e}")
\ No newline at end of file
+            logger.error(f" Failed to {entry['action']} RDS instance {name}: {e}")
+
+# Instances may be any iterable (e.g. a streamed pipeline); they are planned and submitted
+# batch by batch, and the optional wait covers every submitted instance at the end.
+def deploy_rds_instances(instances, logger, dry_run=False, provisioning_settings=None, plan_only=False, batch_size=DEFAULT_PIPELINE_SETTINGS["batch_size"]):
+    if dry_run:
+        for db in instances:
+            logger.info(f"[Dry Run] Would create RDS instance: {db['DBInstanceIdentifier']}")
+        return
+
+    client = get_client("rds")
+    settings = dict(DEFAULT_PROVISIONING_SETTINGS)
+    settings.update({k: v for k, v in (provisioning_settings or {}).items() if v is not None})
+    existing = load_state(logger, "RDS instance", client, "describe_db_instances", "DBInstances", "DBInstanceIdentifier")
+    plan = Plan("RDS instance")
+    submitted = {}
+
+    for batch in batched(instances, batch_size):
+        entries = plan_rds_instances(plan, existing, batch, logger)
+        plan.log_entries(logger, entries)
+        if not plan_only:
+            _apply_instances(client, entries, submitted, logger)
+
+    plan.log_summary(logger)
+    if plan_only:
+        return plan
+    if submitted and settings["wait"]:
+        return wait_for_instances(client, submitted, logger, settings)
+
+# Step 5: Track every pending instance with one batched describe loop
+def describe_instance_statuses(client, names):
+    statuses = {}
+    paginator = client.get_paginator("describe_db_instances")
+    for i in range(0, len(names), FILTER_CHUNK):
+        chunk = names[i:i + FILTER_CHUNK]
+        for page in paginator.paginate(Filters=[{"Name": "db-instance-id", "Values": chunk}]):
+            for db in page.get("DBInstances", []):
+                statuses[db["DBInstanceIdentifier"]] = db["DBInstanceStatus"]
+    return statuses
+
+def wait_for_instances(client, submitted, logger, settings):
+    pending = dict(submitted)
+    results = {}
+    deadline = time.monotonic() + settings["timeout"]
+
+    while pending:
+        try:
+            statuses = describe_instance_statuses(client, sorted(pending))
+        except Exception as e:
+            logger.warning(f" Failed to poll RDS instance status: {e}")
+            statuses = {}
+
+        now = time.monotonic()
+        for name, status in statuses.items():
+            if name not in pending:
+                continue
+            if status == "available" or status in FAILED_STATUSES:
+                elapsed = now - pending.pop(name)
+                results[name] = {"status": status, "seconds": elapsed}
+                if status == "available":
+                    logger.info(f" RDS instance available: {name} ({elapsed:.0f}s)")
+                else:
+                    logger.error(f" RDS instance {name} failed with status '{status}' after {elapsed:.0f}s")
+
+        if not pending:
+            break
+        if now >= deadline:
+            for name, started in pending.items():
+                results[name] = {"status": statuses.get(name, "unknown"), "seconds": now - started}
+                logger.error(f" Timed out waiting for RDS instance {name} (last status: {results[name]['status']})")
+            break
+
+        logger.info(f" Waiting on {len(pending)} RDS instances: {', '.join(sorted(pending))}")
+        time.sleep(settings["poll_interval"])
+
+    available = sum(1 for r in results.values() if r["status"] == "available")
+    logger.info(f" {available}/{len(results)} RDS instances available")
+    return results
+
+# Step 6: Verify instances against the inventory: engine, class, storage and the other
+# modifiable fields, and that each instance is available. Modifications pending for the
+# maintenance window count as applied, as they do when planning.
+RDS_VERIFIED_FIELDS = ("Engine",) + RDS_MODIFIABLE_FIELDS
+
+def verify(config, logger, reconciliation, settings):
+    def expected_fields(db):
+        fields = {field: db[field] for field in RDS_VERIFIED_FIELDS}
+        fields["DBInstanceStatus"] = "available"
+        return fields
+
+    definitions = iter_yaml_list(config.get("rds_config_path", "config/rds_config.yaml"), "instances", logger, False)
+    instances = {db["DBInstanceIdentifier"]: db for db in validate_rds_configs(transform_rds_configs(definitions, logger), logger)}
+    for name, db in instances.items():
+        reconciliation.expect("instance", name, expected_fields(db))
+    reconciliation.rebuild("instance", lambda name: expected_fields(instances[name]))
+
+    for name, current in list_index(get_client("rds"), "describe_db_instances", "DBInstances", "DBInstanceIdentifier").items():
+        current = effective_instance(current)
+        fields = {field: current.get(field) for field in RDS_VERIFIED_FIELDS + ("DBInstanceStatus",)}
+        reconciliation.observe("instance", name, fields, unexpected=settings["report_unexpected"])
@@ -0,0 +1,154 @@
+import base64
+import os
+
+DEFAULT_PAGE_SIZE = 1000
+
+# The blob changed after it was listed; refresh() returns its current properties for a retry
+class BlobModified(Exception):
+    pass
+
+def _content_md5(content_settings):
+    md5 = content_settings.content_md5 if content_settings else None
+    return base64.b64encode(bytes(md5)).decode() if md5 else None
+
+# Writes a downloaded range straight into a slice of a reused part buffer
+class _ViewWriter:
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def write(self, data):
+        end = self.position + len(data)
+        self.view[self.position:end] = data
+        self.position = end
+        return len(data)
+
+# Blobs of one Azure Storage container. Listing is paginated and lazy, so enumeration
+# keeps pace with the uploads instead of loading the whole container first. Reads are
+# conditional on the listed ETag, so a blob modified mid-transfer fails instead of mixing versions.
+class AzureBlobSource:
+    def __init__(self, connection_string=None, account_url=None, credential=None, page_size=DEFAULT_PAGE_SIZE):
+        # Imported here so local-file transfers never load the Azure SDK
+        from azure.storage.blob import BlobServiceClient
+
+        if connection_string:
+            self.service = BlobServiceClient.from_connection_string(connection_string)
+        else:
+            if credential is None:
+                from azure.identity import DefaultAzureCredential
+                credential = DefaultAzureCredential()
+            self.service = BlobServiceClient(account_url, credential=credential)
+        self.page_size = page_size
+        self.containers = {}
+
+    def _container(self, name):
+        if name not in self.containers:
+            self.containers[name] = self.service.get_container_client(name)
+        return self.containers[name]
+
+    def iter_blobs(self, container, prefix=None):
+        pages = self._container(container).list_blobs(name_starts_with=prefix or None, results_per_page=self.page_size).by_page()
+        for page in pages:
+            for blob in page:
+                yield {
+                    "container": container,
+                    "name": blob.name,
+                    "size": blob.size,
+                    "etag": blob.etag,
+                    "content_md5": _content_md5(blob.content_settings),
+                }
+
+    def refresh(self, blob):
+        properties = self._container(blob["container"]).get_blob_client(blob["name"]).get_blob_properties()
+        return dict(blob, size=properties.size, etag=properties.etag, content_md5=_content_md5(properties.content_settings))
+
+    def read_into(self, blob, offset, view):
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceModifiedError
+
+        try:
+            downloader = self._container(blob["container"]).download_blob(
+                blob["name"], offset=offset, length=len(view), etag=blob["etag"],
+                match_condition=MatchConditions.IfNotModified, max_concurrency=1,
+            )
+            writer = _ViewWriter(view)
+            downloader.readinto(writer)
+        except ResourceModifiedError as e:
+            raise BlobModified(f"blob '{blob['container']}/{blob['name']}' changed since it was listed") from e
+        return writer.position
+
+    def url(self, blob):
+        return f"azure://{self.service.account_name}/{blob['container']}/{blob['name']}"
+
+# A local directory laid out as <root>/<container>/<blob name>: a drop-in for the Azure source
+# in tests and benchmarks, or for data already synced out of an Azurite emulator. The ETag is
+# derived from size and mtime, like the checkpoint's version stamp for local files.
+class LocalDirectorySource:
+    def __init__(self, root, page_size=DEFAULT_PAGE_SIZE):
+        self.root = root
+        self.page_size = page_size
+
+    def iter_blobs(self, container, prefix=None):
+        base = os.path.join(self.root, container)
+        for directory, subdirectories, files in os.walk(base):
+            subdirectories.sort()
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                blob_name = os.path.relpath(path, base).replace(os.sep, "/")
+                if prefix and not blob_name.startswith(prefix):
+                    continue
+                yield self._blob(container, blob_name, os.stat(path))
+
+    @staticmethod
+    def _blob(container, name, stat):
+        return {
+            "container": container,
+            "name": name,
+            "size": stat.st_size,
+            "etag": f"{stat.st_size:x}-{stat.st_mtime_ns:x}",
+            "content_md5": None,
+        }
+
+    def _path(self, blob):
+        return os.path.join(self.root, blob["container"], *blob["name"].split("/"))
+
+    def refresh(self, blob):
+        return self._blob(blob["container"], blob["name"], os.stat(self._path(blob)))
+
+    def read_into(self, blob, offset, view):
+        path = self._path(blob)
+        if self.refresh(blob)["etag"] != blob["etag"]:
+            raise BlobModified(f"{path} changed since it was listed")
+        filled = 0
+        with open(path, "rb", buffering=0) as f:
+            f.seek(offset)
+            while filled < len(view):
+                count = f.readinto(view[filled:])
+                if not count:
+                    raise IOError(f"{path} is shorter than expected: {offset + filled} bytes")
+                filled += count
+        return filled
+
+    def url(self, blob):
+        return f"file://{os.path.abspath(os.path.join(self.root, blob['container'], blob['name']))}"
+
+# settings: {"type": "azure", "connection_string" | "account_url", "page_size"} or
+# {"type": "local", "root"}. The connection string falls back to AZURE_STORAGE_CONNECTION_STRING.
+def open_blob_source(settings):
+    settings = dict(settings or {})
+    kind = settings.get("type", "azure")
+    page_size = settings.get("page_size") or DEFAULT_PAGE_SIZE
+    if kind == "local":
+        return LocalDirectorySource(settings["root"], page_size)
+    if kind == "azure":
+        connection_string = settings.get("connection_string") or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+        return AzureBlobSource(connection_string, settings.get("account_url"), page_size=page_size)
+    raise ValueError(f"Unknown blob source type: {kind}")
+
+# One transfer job per blob under the bucket's container/prefix, created lazily
+def iter_blob_jobs(source, bucket, spec):
+    prefix = spec.get("prefix") or ""
+    key_prefix = spec.get("key_prefix") or ""
+    for blob in source.iter_blobs(spec["container"], prefix):
+        key = blob["name"][len(prefix):] if spec.get("strip_prefix") else blob["name"]
+        yield {"bucket": bucket, "key": key_prefix + key, "blob": blob}
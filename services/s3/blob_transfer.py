@@ -0,0 +1,289 @@
+import base64
+import hashlib
+import io
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.metrics import METRICS
+from services.s3.blob_source import BlobModified
+from services.s3.transfer import BandwidthLimiter, TransferStats, load_transfer_settings, multipart_part_size, MB
+
+class ChecksumMismatch(Exception):
+    pass
+
+# Fixed-size part buffers, allocated on first use up to count and then handed out again,
+# so steady-state memory is count x size however many objects are in flight.
+# acquire() blocks while every buffer is in use, which throttles the readers.
+class BufferPool:
+    def __init__(self, count, size):
+        self.size = size
+        self.free = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.available = count
+        self.allocated = 0
+
+    def acquire(self, length):
+        if length > self.size:
+            # Parts of blobs over size x 10000 bytes do not fit; they get a one-off buffer
+            return bytearray(length)
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.available:
+                self.available -= 1
+                self.allocated += 1
+                return bytearray(self.size)
+        return self.free.get()
+
+    def release(self, buffer):
+        if len(buffer) == self.size:
+            self.free.put(buffer)
+
+# Read-only, seekable request body over a buffer slice, so parts are sent without a copy
+class _BufferBody(io.RawIOBase):
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        count = min(len(target), len(self.view) - self.position)
+        target[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: len(self.view)}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def __len__(self):
+        return len(self.view)
+
+# Parts of one object take buffers and feed the whole-object digest in part order. Taking
+# buffers in order means the earliest unfinished part always holds one, so parts waiting
+# for their turn to hash can never starve it of a buffer.
+class _PartOrder:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.acquired = 0
+        self.hashed = 0
+        self.failed = False
+        self.error = None
+
+    def _wait(self, attribute, number):
+        with self.condition:
+            self.condition.wait_for(lambda: self.failed or getattr(self, attribute) == number - 1)
+            if self.failed:
+                raise RuntimeError("another part of the object failed")
+
+    def _advance(self, attribute):
+        with self.condition:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+            self.condition.notify_all()
+
+    def acquire(self, number, buffers, length):
+        self._wait("acquired", number)
+        try:
+            return buffers.acquire(length)
+        finally:
+            self._advance("acquired")
+
+    def hash(self, number, digest, view):
+        self._wait("hashed", number)
+        digest.update(view)
+        self._advance("hashed")
+
+    def fail(self, error):
+        with self.condition:
+            self.failed = True
+            # Parts waiting on the failed one fail too; keep the error that started it
+            self.error = self.error or error
+            self.condition.notify_all()
+
+def _b64(digest):
+    return base64.b64encode(digest).decode()
+
+def _verify_source(job, digest):
+    expected = job["blob"].get("content_md5")
+    if expected and _b64(digest.digest()) != expected:
+        raise ChecksumMismatch(f"MD5 of the data read ({_b64(digest.digest())}) differs from the blob's Content-MD5 ({expected})")
+
+def _discard(client, job):
+    try:
+        client.delete_object(Bucket=job["bucket"], Key=job["key"])
+    except Exception:
+        pass
+
+def _stream_single(client, source, job, buffers, progress):
+    blob = job["blob"]
+    buffer = buffers.acquire(blob["size"])
+    view = memoryview(buffer)[:blob["size"]]
+    try:
+        source.read_into(blob, 0, view)
+        digest = hashlib.md5(view)
+        # S3 rejects the request if the body does not match Content-MD5
+        response = client.put_object(Bucket=job["bucket"], Key=job["key"], Body=_BufferBody(view), ContentMD5=_b64(digest.digest()))
+    finally:
+        view.release()
+        buffers.release(buffer)
+    progress(blob["size"])
+    try:
+        _verify_source(job, digest)
+    except ChecksumMismatch:
+        _discard(client, job)
+        raise
+    return digest.hexdigest(), response["ETag"]
+
+# Ranged reads go into pooled buffers and straight out as upload_part bodies with their
+# Content-MD5. The whole-object MD5 is checked against the blob's Content-MD5 when Azure
+# has one, and the MD5s of the parts against the multipart ETag S3 returns.
+def _stream_multipart(client, source, job, settings, buffers, progress):
+    blob, bucket, key = job["blob"], job["bucket"], job["key"]
+    size = blob["size"]
+    part_size = multipart_part_size(size, buffers.size)
+    count = -(-size // part_size)
+    order = _PartOrder()
+    digest = hashlib.md5()
+    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+
+    def send_part(number):
+        offset = (number - 1) * part_size
+        length = min(part_size, size - offset)
+        try:
+            buffer = order.acquire(number, buffers, length)
+            view = memoryview(buffer)[:length]
+            try:
+                source.read_into(blob, offset, view)
+                part_md5 = hashlib.md5(view).digest()
+                response = client.upload_part(
+                    Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number,
+                    Body=_BufferBody(view), ContentMD5=_b64(part_md5),
+                )
+                order.hash(number, digest, view)
+            finally:
+                view.release()
+                buffers.release(buffer)
+        except Exception as e:
+            order.fail(e)
+            raise
+        progress(length)
+        return {"PartNumber": number, "ETag": response["ETag"]}, part_md5
+
+    try:
+        with ThreadPoolExecutor(max_workers=settings["part_concurrency"]) as pool:
+            results = list(pool.map(send_part, range(1, count + 1)))
+        response = client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [part for part, _ in results]},
+        )
+    except Exception as e:
+        try:
+            client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception:
+            pass
+        raise order.error or e
+
+    expected = f"{hashlib.md5(b''.join(md5 for _, md5 in results)).hexdigest()}-{count}"
+    try:
+        if response["ETag"].strip('"') != expected:
+            raise ChecksumMismatch(f"multipart ETag {response['ETag']} differs from the parts sent ({expected})")
+        _verify_source(job, digest)
+    except ChecksumMismatch:
+        _discard(client, job)
+        raise
+    return digest.hexdigest(), response["ETag"]
+
+def _stream_one(client, source, job, buffers, stats, limiter, settings, checkpoint, logger):
+    blob = job["blob"]
+    # The blob ETag is the version stamp that a local file's mtime is elsewhere
+    if checkpoint and checkpoint.object_done(job["bucket"], job["key"], blob["size"], blob["etag"]) and checkpoint.remote_matches(client, job["bucket"], job["key"]):
+        stats.add_skipped()
+        METRICS.inc("migration_s3_objects_total", result="skipped")
+        return True
+
+    for attempt in range(1, settings["max_attempts"] + 1):
+        sent = [0]
+
+        def progress(amount):
+            sent[0] += amount
+            stats.add_bytes(amount)
+            if limiter:
+                limiter.consume(amount)
+
+        try:
+            if blob["size"] >= settings["multipart_threshold_mb"] * MB:
+                _, etag = _stream_multipart(client, source, job, settings, buffers, progress)
+            else:
+                _, etag = _stream_single(client, source, job, buffers, progress)
+            if checkpoint:
+                checkpoint.record_object(job["bucket"], job["key"], source.url(blob), blob["size"], blob["etag"], etag)
+            stats.add_object()
+            METRICS.inc("migration_s3_objects_total", result="uploaded")
+            METRICS.inc("migration_s3_bytes_uploaded_total", sent[0])
+            logger.info(f" Streamed blob '{blob['container']}/{blob['name']}' to '{job['key']}' in bucket '{job['bucket']}'")
+            return True
+        except Exception as e:
+            stats.add_bytes(-sent[0])
+            if isinstance(e, ChecksumMismatch):
+                METRICS.inc("migration_s3_checksum_failures_total")
+            if isinstance(e, BlobModified):
+                # Retrying against the listed ETag would fail again; copy the current version instead
+                try:
+                    job["blob"] = blob = source.refresh(blob)
+                except Exception as refresh_error:
+                    logger.warning(f" Could not re-read blob '{blob['container']}/{blob['name']}': {refresh_error}")
+            if attempt == settings["max_attempts"]:
+                stats.add_failure(job, e)
+                METRICS.inc("migration_s3_objects_total", result="failed")
+                logger.error(f" Failed to stream blob '{blob['container']}/{blob['name']}' to bucket '{job['bucket']}' after {attempt} attempts: {e}")
+                return False
+            stats.add_retry()
+            METRICS.inc("migration_s3_object_retries_total")
+            delay = settings["retry_backoff"] * (2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+            logger.warning(f" Retrying blob '{blob['container']}/{blob['name']}' (attempt {attempt + 1}) after error: {e}")
+            time.sleep(delay)
+
+# Copies blobs to S3 without local staging. Jobs may be a lazy iterator: at most twice
+# max_workers objects are pulled from it ahead of the uploads. Memory is bounded by
+# part_buffers x multipart_chunksize_mb.
+def stream_blobs(client, source, jobs, logger, settings=None, checkpoint=None):
+    settings = load_transfer_settings(settings)
+    buffers = BufferPool(settings["part_buffers"], int(settings["multipart_chunksize_mb"] * MB))
+    limiter = BandwidthLimiter(settings["max_bandwidth_mb"] * MB) if settings["max_bandwidth_mb"] else None
+    stats = TransferStats()
+    window = settings["max_workers"] * 2
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        running = set()
+        for job in jobs:
+            if len(running) >= window:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            running.add(pool.submit(_stream_one, client, source, job, buffers, stats, limiter, settings, checkpoint, logger))
+        for future in running:
+            future.result()
+
+    summary = stats.summary()
+    summary["buffers_allocated"] = buffers.allocated
+    logger.info(
+        f" Streamed {summary['objects']} blobs ({summary['bytes'] / MB:.1f} MB) in {summary['seconds']:.2f}s: "
+        f"{summary['mb_per_second']:.2f} MB/s, {summary['skipped']} already copied, {summary['retries']} retries, "
+        f"{summary['failed']} failed, {buffers.allocated} part buffers of {buffers.size // MB} MB"
+    )
+    summary["failures"] = stats.failed
+    return summary
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+
+from services.s3.sync import list_remote_objects
+
+# Append-only JSONL journal of finished buckets/objects and open multipart uploads.
+# Replaying it on start-up tells a restarted run what it can skip.
+class CheckpointStore:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.buckets = set()
+        self.objects = {}
+        self.multipart = {}
+        self.listings = {}
+        self.listing_locks = {}
+        self._load()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.handle = open(path, "a")
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write leaves a truncated last line
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry):
+        event = entry.get("event")
+        if event == "bucket":
+            self.buckets.add(entry["bucket"])
+            return
+        key = (entry["bucket"], entry["key"])
+        if event == "object":
+            self.objects[key] = entry
+            self.multipart.pop(key, None)
+        elif event == "multipart":
+            self.multipart[key] = entry
+        elif event == "multipart_aborted":
+            self.multipart.pop(key, None)
+
+    def _append(self, entry):
+        with self.lock:
+            self._apply(entry)
+            self.handle.write(json.dumps(entry) + "\n")
+            self.handle.flush()
+
+    def close(self):
+        with self.lock:
+            self.handle.close()
+
+    def bucket_done(self, bucket):
+        return bucket in self.buckets
+
+    def record_bucket(self, bucket):
+        if bucket not in self.buckets:
+            self._append({"event": "bucket", "bucket": bucket})
+
+    def object_done(self, bucket, key, size, mtime):
+        entry = self.objects.get((bucket, key))
+        return bool(entry) and entry["size"] == size and entry["mtime"] == mtime
+
+    # Each bucket is listed once per run, on the first journaled object checked against it
+    def _listing(self, client, bucket):
+        with self.lock:
+            lock = self.listing_locks.setdefault(bucket, threading.Lock())
+        with lock:
+            if bucket not in self.listings:
+                try:
+                    self.listings[bucket] = list_remote_objects(client, bucket)
+                except Exception:
+                    # Nothing is skipped when the bucket cannot be listed
+                    self.listings[bucket] = {}
+            return self.listings[bucket]
+
+    # The journaled ETag must still be the object's ETag in S3, so an object deleted or
+    # overwritten since the run that uploaded it is sent again instead of skipped
+    def remote_matches(self, client, bucket, key):
+        entry = self.objects.get((bucket, key))
+        if not entry:
+            return False
+        remote = self._listing(client, bucket).get(key)
+        return remote is not None and remote["etag"] == entry["checksum"]
+
+    def record_object(self, bucket, key, source, size, mtime, checksum):
+        self._append({
+            "event": "object", "bucket": bucket, "key": key, "source": source,
+            "size": size, "mtime": mtime, "checksum": checksum.strip('"')
+        })
+
+    def pending_multipart(self, bucket, key, size, mtime, part_size):
+        entry = self.multipart.get((bucket, key))
+        if entry and entry["size"] == size and entry["mtime"] == mtime and entry["part_size"] == part_size:
+            return entry["upload_id"]
+        return None
+
+    def record_multipart(self, bucket, key, source, size, mtime, part_size, upload_id):
+        self._append({
+            "event": "multipart", "bucket": bucket, "key": key, "source": source,
+            "size": size, "mtime": mtime, "part_size": part_size, "upload_id": upload_id
+        })
+
+    def record_multipart_aborted(self, bucket, key):
+        self._append({"event": "multipart_aborted", "bucket": bucket, "key": key})
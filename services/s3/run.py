@@ -1,6 +1,16 @@
 import os
-import boto3
-from utils.config_loader import load_yaml_config
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from utils.aws import get_client
+from utils.config_loader import iter_yaml_list
+from utils.validation import RuleSet, Required, FileExists, Predicate
+from utils.plan import Plan, load_state, CREATE, NOOP
+from utils.pipeline import stream, batched, load_pipeline_settings, DEFAULT_PIPELINE_SETTINGS
+from services.s3.transfer import upload_objects, load_transfer_settings
+from services.s3.checkpoint import CheckpointStore
+from services.s3.sync import select_changed_objects, list_remote_objects, DigestCache, _local_etag
+from services.s3.blob_source import open_blob_source, iter_blob_jobs
+from services.s3.blob_transfer import stream_blobs
 
 def run(config, logger):
     logger.info(" Starting S3 migration...")
@@ -8,82 +18,206 @@ def run(config, logger):
     dry_run = config.get("dry_run", False)
     s3_config_path = config.get("s3_config_path", "config/s3_config.yaml")
 
-    s3_definitions = load_yaml_config(s3_config_path, logger).get("buckets", [])
-    transformed_buckets = transform_s3_configs(s3_definitions, logger)
-    validated_buckets = validate_s3_configs(transformed_buckets, logger)
+    pipeline = load_pipeline_settings(config.get("pipeline"))
 
-    deploy_s3_buckets(validated_buckets, logger, dry_run)
+    s3_definitions = iter_yaml_list(s3_config_path, "buckets", logger, pipeline["stream_sources"])
+    # Buckets are transformed and validated batch by batch while earlier batches deploy
+    validated_buckets = stream(s3_definitions, {
+        "transform": lambda batch: transform_s3_configs(batch, logger, config.get("region") or "ap-south-1"),
+        "validate": lambda batch: validate_s3_configs(batch, logger),
+    }, pipeline, "s3")
+
+    deploy_s3_buckets(validated_buckets, logger, dry_run, config.get("s3_transfer"), config.get("plan_only", False), pipeline["batch_size"])
 
 # Step 1: Transform to AWS-compatible format
-def transform_s3_configs(buckets, logger):
+# azure_container is either a container name or {container, prefix, key_prefix, strip_prefix}
+def _blob_spec(value):
+    if not value:
+        return None
+    return {"container": value} if isinstance(value, str) else dict(value)
+
+def transform_s3_configs(buckets, logger, region="ap-south-1"):
     transformed = []
     for bucket in buckets:
         transformed.append({
             "Bucket": bucket["name"],
             "ACL": bucket.get("acl", "private"),
             "CreateBucketConfiguration": {
-                "LocationConstraint": bucket.get("region", "ap-south-1")
+                "LocationConstraint": bucket.get("region", region)
             },
             "Tags": [{"Key": k, "Value": v} for k, v in bucket.get("tags", {}).items()],
-            "Objects": bucket.get("objects", [])
+            "Objects": bucket.get("objects", []),
+            "BlobSource": _blob_spec(bucket.get("azure_container")),
         })
     logger.info(" Transformed S3 configs to AWS format.")
     return transformed
 
 # Step 2: Validate bucket configs
-def validate_s3_configs(buckets, logger):
-    validated = []
-    for bucket in buckets:
-        issues = []
+S3_RULES = RuleSet([
+    Required("Bucket", "Missing bucket name"),
+    Required("CreateBucketConfiguration.LocationConstraint", "Missing region"),
+    Predicate("BlobSource", lambda spec: spec is None or bool(spec.get("container")), "azure_container has no container name"),
+    FileExists("Objects[].source", "Missing object source file: {value}"),
+], key_path="Bucket")
 
-        if not bucket.get("Bucket"):
-            issues.append("Missing bucket name")
-        if not bucket.get("CreateBucketConfiguration", {}).get("LocationConstraint"):
-            issues.append("Missing region")
-        for obj in bucket.get("Objects", []):
-            if not os.path.exists(obj.get("source", "")):
-                issues.append(f"Missing object source file: {obj.get('source')}")
-
-        if issues:
-            logger.warning(f" S3 bucket '{bucket.get('Bucket', 'Unnamed')}' has issues: {', '.join(issues)}")
-        else:
-            validated.append(bucket)
+def validate_s3_configs(buckets, logger):
+    report = S3_RULES.evaluate(buckets)
+    report.log(logger, "S3 bucket")
+    validated = report.valid_records()
 
     logger.info(f" {len(validated)} S3 buckets passed validation.")
     return validated
 
-# Step 3: Deploy buckets and upload objects
-def deploy_s3_buckets(buckets, logger, dry_run=False):
-    client = boto3.client("s3")
-
+# Step 3: Plan bucket changes against one listing of the buckets that already exist
+def plan_s3_buckets(plan, existing, buckets, checkpoint=None):
+    entries = []
     for bucket in buckets:
         name = bucket["Bucket"]
+        if name in existing or (checkpoint and checkpoint.bucket_done(name)):
+            entries.append(plan.add(NOOP, name, bucket))
+        else:
+            entries.append(plan.add(CREATE, name, bucket))
+    return entries
 
-        if dry_run:
-            logger.info(f"[Dry Run] Would create S3 bucket: {name}")
-            continue
-
-        try:
-            client.create_bucket(
-                Bucket=name,
-                ACL=bucket["ACL"],
-                CreateBucketConfiguration=bucket["CreateBucketConfiguration"]
-            )
-            logger.info(f" Created S3 bucket: {name}")
-        except client.exceptions.BucketAlreadyOwnedByYou:
-            logger.warning(f" Bucket already exists: {name}")
-        except Exception as e:
-            logger.error(f" Failed to create bucket {name}: {e}")
-            continue
-
-        # Upload objects
-        for obj in bucket.get("Objects", []):
+# Step 4: Deploy buckets and upload objects
+def _create_buckets(client, entries, checkpoint, logger):
+    jobs = []
+    for entry in entries:
+        name = entry["name"]
+        bucket = entry["item"]
+
+        if entry["action"] == CREATE:
+            # us-east-1 is the default location and rejects an explicit LocationConstraint
+            location = {} if bucket["CreateBucketConfiguration"]["LocationConstraint"] == "us-east-1" else {
+                "CreateBucketConfiguration": bucket["CreateBucketConfiguration"]
+            }
             try:
-                client.upload_file(
-                    Filename=obj["source"],
-                    Bucket=name,
-                    Key=obj["key"]
-                )
-                logger.info(f" Uploaded object '{obj['key']}' to bucket '{name}'")
+                client.create_bucket(Bucket=name, ACL=bucket["ACL"], **location)
+                logger.info(f" Created S3 bucket: {name}")
+            except client.exceptions.BucketAlreadyOwnedByYou:
+                logger.warning(f" Bucket already exists: {name}")
             except Exception as e:
-                logger.error(f" Failed to upload object '{obj['key']}' to bucket '{name}': {e}")
\ No newline at end of file
+                logger.error(f" Failed to create bucket {name}: {e}")
+                continue
+            if checkpoint:
+                checkpoint.record_bucket(name)
+
+        for obj in bucket.get("Objects", []):
+            jobs.append({"bucket": name, "key": obj["key"], "source": obj["source"]})
+    return jobs
+
+# Buckets may be any iterable (e.g. a streamed pipeline); they are planned and deployed
+# batch by batch, and each batch's objects upload before the next batch is pulled.
+def deploy_s3_buckets(buckets, logger, dry_run=False, transfer_settings=None, plan_only=False, batch_size=DEFAULT_PIPELINE_SETTINGS["batch_size"]):
+    if dry_run:
+        for bucket in buckets:
+            logger.info(f"[Dry Run] Would create S3 bucket: {bucket['Bucket']}")
+        return
+
+    client = get_client("s3")
+    settings = load_transfer_settings(transfer_settings)
+    checkpoint = None
+    if settings["checkpoint_path"] and not plan_only:
+        checkpoint = CheckpointStore(settings["checkpoint_path"])
+
+    existing = load_state(logger, "S3 bucket", client, "list_buckets", "Buckets", "Name")
+    plan = Plan("S3 bucket")
+    source = None
+    summaries = []
+    try:
+        for batch in batched(buckets, batch_size):
+            entries = plan_s3_buckets(plan, existing, batch, checkpoint)
+            plan.log_entries(logger, entries)
+            if plan_only:
+                continue
+
+            jobs = _create_buckets(client, entries, checkpoint, logger)
+            if jobs and settings["mode"] == "sync":
+                jobs = select_changed_objects(client, jobs, logger, settings)
+            # Upload objects from every bucket in the batch on one shared pool
+            if jobs:
+                summaries.append(upload_objects(client, jobs, logger, settings, checkpoint))
+
+            blob_buckets = [e for e in entries if e["item"].get("BlobSource")]
+            if blob_buckets:
+                if source is None:
+                    source = open_blob_source(settings["blob_source"])
+                # Blobs are enumerated lazily while earlier ones are still streaming
+                blob_jobs = (job for e in blob_buckets for job in iter_blob_jobs(source, e["name"], e["item"]["BlobSource"]))
+                summaries.append(stream_blobs(client, source, blob_jobs, logger, settings, checkpoint))
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    plan.log_summary(logger)
+    return plan if plan_only else summaries
+
+# Step 5: Verify buckets and objects against the inventory. Object ETags are compared in the
+# part layout S3 reports (see sync.py); a blob's Content-MD5 only matches single-part ETags,
+# so multipart blob copies are compared by size.
+def _expected_object(job, remote, transfer, cache, checksums):
+    if "blob" in job:
+        blob = job["blob"]
+        fields = {"size": blob["size"]}
+        if checksums and remote and blob.get("content_md5") and "-" not in remote["etag"]:
+            fields["etag"] = base64.b64decode(blob["content_md5"]).hex()
+        return fields
+    try:
+        stat = os.stat(job["source"])
+    except OSError as e:
+        return {"size": None, "error": str(e)}
+    fields = {"size": stat.st_size}
+    if checksums and remote and remote["size"] == stat.st_size:
+        fields["etag"] = _local_etag(job, stat, remote["etag"], transfer, cache)
+    elif checksums and remote:
+        # A size mismatch is drift already; hashing the file would not change the verdict
+        fields["etag"] = None
+    return fields
+
+def _read_bucket(client, name):
+    try:
+        location = client.get_bucket_location(Bucket=name)["LocationConstraint"] or "us-east-1"
+    except Exception:
+        return None, {}
+    return location, list_remote_objects(client, name)
+
+def verify(config, logger, reconciliation, settings):
+    transfer = load_transfer_settings(config.get("s3_transfer"))
+    region = config.get("region") or "ap-south-1"
+    definitions = iter_yaml_list(config.get("s3_config_path", "config/s3_config.yaml"), "buckets", logger, False)
+    buckets = validate_s3_configs(transform_s3_configs(definitions, logger, region), logger)
+    client = get_client("s3")
+    cache = DigestCache(transfer["digest_cache_path"])
+    source = None
+
+    regions = {bucket["Bucket"]: bucket["CreateBucketConfiguration"]["LocationConstraint"] for bucket in buckets}
+    reconciliation.rebuild("bucket", lambda name: {"region": regions[name]})
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        listings = list(pool.map(lambda bucket: _read_bucket(client, bucket["Bucket"]), buckets))
+        for bucket, (location, remote) in zip(buckets, listings):
+            name = bucket["Bucket"]
+            reconciliation.expect("bucket", name, {"region": regions[name]})
+            if location is not None:
+                reconciliation.observe("bucket", name, {"region": location})
+
+            jobs = [{"bucket": name, "key": obj["key"], "source": obj["source"]} for obj in bucket.get("Objects", [])]
+            if bucket.get("BlobSource"):
+                if source is None:
+                    source = open_blob_source(transfer["blob_source"])
+                jobs.extend(iter_blob_jobs(source, name, bucket["BlobSource"]))
+            expected = dict(zip(
+                (job["key"] for job in jobs),
+                pool.map(lambda job: _expected_object(job, remote.get(job["key"]), transfer, cache, settings["checksums"]), jobs),
+            ))
+            for key, fields in expected.items():
+                reconciliation.expect("object", f"{name}/{key}", fields)
+            # Objects are observed right after their bucket is expected, so only this bucket's fields are needed
+            reconciliation.rebuild("object", lambda identifier, expected=expected: expected[identifier.split("/", 1)[1]])
+            for key, obj in remote.items():
+                fields = {"size": obj["size"]}
+                if "etag" in expected.get(key, {}):
+                    fields["etag"] = obj["etag"]
+                # Objects in the bucket that the inventory does not list are only drift with report_unexpected
+                reconciliation.observe("object", f"{name}/{key}", fields, unexpected=settings["report_unexpected"])
+    cache.save()
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MB = 1024 * 1024
+READ_SIZE = 1 * MB
+
+# Local ETag cache keyed by path, size, mtime and part size, so unchanged files are hashed once
+class DigestCache:
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = False
+        if path and os.path.isfile(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                self.entries = {}
+
+    @staticmethod
+    def _key(path, size, mtime, part_size):
+        return f"{os.path.abspath(path)}|{size}|{mtime}|{part_size}"
+
+    def get(self, path, size, mtime, part_size):
+        return self.entries.get(self._key(path, size, mtime, part_size))
+
+    def put(self, path, size, mtime, part_size, etag):
+        with self.lock:
+            self.entries[self._key(path, size, mtime, part_size)] = etag
+            self.dirty = True
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+# S3 ETag of a file: plain MD5 for single-part objects, MD5 of part MD5s plus "-N" for multipart ones
+def compute_etag(path, part_size=None):
+    whole = hashlib.md5()
+    part_digests = []
+    part = hashlib.md5()
+    in_part = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_SIZE if not part_size else min(READ_SIZE, part_size - in_part))
+            if not chunk:
+                break
+            if not part_size:
+                whole.update(chunk)
+                continue
+            part.update(chunk)
+            in_part += len(chunk)
+            if in_part == part_size:
+                part_digests.append(part.digest())
+                part, in_part = hashlib.md5(), 0
+    if not part_size:
+        return whole.hexdigest()
+    if in_part or not part_digests:
+        part_digests.append(part.digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+def _part_size_for(size, part_count, default_part_size):
+    if -(-size // default_part_size) == part_count:
+        return default_part_size
+    # Other tools usually pick a whole number of MB per part
+    return -(-size // part_count // MB) * MB
+
+def list_remote_objects(client, bucket):
+    remote = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket):
+        for obj in page.get("Contents", []):
+            remote[obj["Key"]] = {"size": obj["Size"], "etag": obj["ETag"].strip('"')}
+    return remote
+
+def _local_etag(job, stat, remote_etag, settings, cache):
+    if "-" in remote_etag:
+        part_count = int(remote_etag.rsplit("-", 1)[1])
+        part_size = _part_size_for(stat.st_size, part_count, int(settings["multipart_chunksize_mb"] * MB))
+    else:
+        part_size = 0
+    etag = cache.get(job["source"], stat.st_size, stat.st_mtime, part_size)
+    if etag is None:
+        etag = compute_etag(job["source"], part_size)
+        cache.put(job["source"], stat.st_size, stat.st_mtime, part_size, etag)
+    return etag
+
+def _is_changed(job, remote, settings, cache):
+    existing = remote.get(job["key"])
+    if existing is None:
+        return True
+    try:
+        stat = os.stat(job["source"])
+    except OSError:
+        # Let the upload report the missing file
+        return True
+    # Cheap size check first, only hash files that could be identical
+    if stat.st_size != existing["size"]:
+        return True
+    return _local_etag(job, stat, existing["etag"], settings, cache) != existing["etag"]
+
+def _safe_listing(client, bucket, logger):
+    try:
+        return list_remote_objects(client, bucket)
+    except Exception as e:
+        logger.warning(f" Could not list bucket '{bucket}', uploading all of its objects: {e}")
+        return {}
+
+def select_changed_objects(client, jobs, logger, settings):
+    cache = DigestCache(settings.get("digest_cache_path"))
+    buckets = sorted({job["bucket"] for job in jobs})
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        listings = dict(zip(buckets, pool.map(lambda b: _safe_listing(client, b, logger), buckets)))
+        changed = list(pool.map(lambda job: _is_changed(job, listings[job["bucket"]], settings, cache), jobs))
+
+    cache.save()
+    selected = [job for job, is_changed in zip(jobs, changed) if is_changed]
+    logger.info(f" Sync: {len(selected)} of {len(jobs)} objects are new or changed, {len(jobs) - len(selected)} unchanged")
+    return selected
@@ -0,0 +1,248 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from boto3.s3.transfer import TransferConfig
+
+from utils.metrics import METRICS
+
+MB = 1024 * 1024
+# S3 rejects multipart uploads of more than 10,000 parts
+MAX_PARTS = 10000
+
+DEFAULT_TRANSFER_SETTINGS = {
+    "max_workers": 16,            # objects uploaded in parallel across all buckets
+    "part_concurrency": 4,        # parts uploaded in parallel per multipart object
+    "multipart_threshold_mb": 8,
+    "multipart_chunksize_mb": 8,
+    "max_bandwidth_mb": None,     # aggregate cap in MB/s, None for unlimited
+    "max_attempts": 3,
+    "retry_backoff": 1.0,
+    "checkpoint_path": None,      # JSONL journal used to resume interrupted runs
+    "mode": "upload",             # "sync" only uploads objects missing or changed in the bucket
+    "digest_cache_path": None,    # local ETag cache used by sync mode
+    "blob_source": None,          # Azure Storage account for buckets with azure_container (see blob_source.py)
+    "part_buffers": 32,           # in-memory part buffers shared by all blob streams
+}
+
+def load_transfer_settings(overrides=None):
+    settings = dict(DEFAULT_TRANSFER_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+# Token bucket shared by every transfer thread so the cap applies to the whole run
+class BandwidthLimiter:
+    def __init__(self, bytes_per_second):
+        self.rate = float(bytes_per_second)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class TransferStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.objects = 0
+        self.bytes = 0
+        self.retries = 0
+        self.skipped = 0
+        self.failed = []
+
+    def add_bytes(self, amount):
+        with self.lock:
+            self.bytes += amount
+
+    def add_object(self):
+        with self.lock:
+            self.objects += 1
+
+    def add_skipped(self):
+        with self.lock:
+            self.skipped += 1
+
+    def add_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def add_failure(self, job, error):
+        with self.lock:
+            self.failed.append({"bucket": job["bucket"], "key": job["key"], "error": str(error)})
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "objects": self.objects,
+            "bytes": self.bytes,
+            "skipped": self.skipped,
+            "failed": len(self.failed),
+            "retries": self.retries,
+            "seconds": elapsed,
+            "mb_per_second": self.bytes / MB / elapsed,
+            "objects_per_second": self.objects / elapsed,
+        }
+
+def build_transfer_config(settings):
+    return TransferConfig(
+        multipart_threshold=int(settings["multipart_threshold_mb"] * MB),
+        multipart_chunksize=int(settings["multipart_chunksize_mb"] * MB),
+        max_concurrency=settings["part_concurrency"],
+        use_threads=True,
+    )
+
+# Parts grow beyond the default for objects that would otherwise need over MAX_PARTS; grown
+# parts are rounded up to whole MB, the layout sync.py assumes when it recomputes ETags
+def multipart_part_size(size, default_part_size):
+    if -(-size // default_part_size) <= MAX_PARTS:
+        return default_part_size
+    return -(-size // MAX_PARTS // MB) * MB
+
+def _put_object(client, job, progress):
+    with open(job["source"], "rb") as f:
+        response = client.put_object(Bucket=job["bucket"], Key=job["key"], Body=f)
+    progress(os.path.getsize(job["source"]))
+    return response["ETag"]
+
+def _list_uploaded_parts(client, bucket, key, upload_id):
+    parts = {}
+    paginator = client.get_paginator("list_parts")
+    for page in paginator.paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+        for part in page.get("Parts", []):
+            parts[part["PartNumber"]] = part["ETag"]
+    return parts
+
+# Multipart upload whose upload id is journaled, so a restart only sends the missing parts
+def _resumable_multipart(client, job, size, mtime, settings, checkpoint, progress, logger):
+    bucket, key = job["bucket"], job["key"]
+    part_size = multipart_part_size(size, int(settings["multipart_chunksize_mb"] * MB))
+    part_count = max(1, -(-size // part_size))
+    parts = {}
+
+    upload_id = checkpoint.pending_multipart(bucket, key, size, mtime, part_size)
+    if upload_id:
+        try:
+            parts = _list_uploaded_parts(client, bucket, key, upload_id)
+            logger.info(f" Resuming upload of '{key}' to bucket '{bucket}': {len(parts)}/{part_count} parts already uploaded")
+        except client.exceptions.NoSuchUpload:
+            checkpoint.record_multipart_aborted(bucket, key)
+            upload_id = None
+    if not upload_id:
+        upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+        checkpoint.record_multipart(bucket, key, job["source"], size, mtime, part_size, upload_id)
+
+    def send_part(number):
+        with open(job["source"], "rb") as f:
+            f.seek((number - 1) * part_size)
+            body = f.read(part_size)
+        response = client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+        progress(len(body))
+        return number, response["ETag"]
+
+    missing = [n for n in range(1, part_count + 1) if n not in parts]
+    with ThreadPoolExecutor(max_workers=settings["part_concurrency"]) as pool:
+        for number, etag in pool.map(send_part, missing):
+            parts[number] = etag
+
+    response = client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": n, "ETag": parts[n]} for n in sorted(parts)]}
+    )
+    return response["ETag"]
+
+def _send(client, job, transfer_config, settings, checkpoint, progress, logger):
+    if checkpoint is None:
+        client.upload_file(
+            Filename=job["source"],
+            Bucket=job["bucket"],
+            Key=job["key"],
+            Config=transfer_config,
+            Callback=progress
+        )
+        return
+
+    stat = os.stat(job["source"])
+    if stat.st_size >= settings["multipart_threshold_mb"] * MB:
+        etag = _resumable_multipart(client, job, stat.st_size, stat.st_mtime, settings, checkpoint, progress, logger)
+    else:
+        etag = _put_object(client, job, progress)
+    checkpoint.record_object(job["bucket"], job["key"], job["source"], stat.st_size, stat.st_mtime, etag)
+
+def _already_uploaded(job, checkpoint):
+    try:
+        stat = os.stat(job["source"])
+    except OSError:
+        return False
+    return checkpoint.object_done(job["bucket"], job["key"], stat.st_size, stat.st_mtime)
+
+def _upload_one(client, job, transfer_config, stats, limiter, settings, checkpoint, logger):
+    if checkpoint and _already_uploaded(job, checkpoint) and checkpoint.remote_matches(client, job["bucket"], job["key"]):
+        stats.add_skipped()
+        METRICS.inc("migration_s3_objects_total", result="skipped")
+        return True
+
+    for attempt in range(1, settings["max_attempts"] + 1):
+        sent = [0]
+
+        def progress(amount):
+            sent[0] += amount
+            stats.add_bytes(amount)
+            if limiter:
+                limiter.consume(amount)
+
+        try:
+            _send(client, job, transfer_config, settings, checkpoint, progress, logger)
+            stats.add_object()
+            METRICS.inc("migration_s3_objects_total", result="uploaded")
+            METRICS.inc("migration_s3_bytes_uploaded_total", sent[0])
+            logger.info(f" Uploaded object '{job['key']}' to bucket '{job['bucket']}'")
+            return True
+        except Exception as e:
+            # Without a checkpoint the whole object is sent again, so those bytes do not count as throughput
+            if checkpoint is None:
+                stats.add_bytes(-sent[0])
+            if attempt == settings["max_attempts"]:
+                stats.add_failure(job, e)
+                METRICS.inc("migration_s3_objects_total", result="failed")
+                logger.error(f" Failed to upload object '{job['key']}' to bucket '{job['bucket']}' after {attempt} attempts: {e}")
+                return False
+            stats.add_retry()
+            METRICS.inc("migration_s3_object_retries_total")
+            delay = settings["retry_backoff"] * (2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+            logger.warning(f" Retrying object '{job['key']}' in bucket '{job['bucket']}' (attempt {attempt + 1}) after error: {e}")
+            time.sleep(delay)
+
+def upload_objects(client, jobs, logger, settings=None, checkpoint=None):
+    settings = load_transfer_settings(settings)
+    transfer_config = build_transfer_config(settings)
+    limiter = BandwidthLimiter(settings["max_bandwidth_mb"] * MB) if settings["max_bandwidth_mb"] else None
+    stats = TransferStats()
+
+    with ThreadPoolExecutor(max_workers=settings["max_workers"]) as pool:
+        futures = [
+            pool.submit(_upload_one, client, job, transfer_config, stats, limiter, settings, checkpoint, logger)
+            for job in jobs
+        ]
+        for future in as_completed(futures):
+            future.result()
+
+    summary = stats.summary()
+    logger.info(
+        f" Uploaded {summary['objects']} objects ({summary['bytes'] / MB:.1f} MB) in {summary['seconds']:.2f}s: "
+        f"{summary['mb_per_second']:.2f} MB/s, {summary['objects_per_second']:.1f} objects/s, "
+        f"{summary['skipped']} already uploaded, {summary['retries']} retries, {summary['failed']} failed"
+    )
+    summary["failures"] = stats.failed
+    return summary
@@ -0,0 +1,76 @@
+import json
+import logging
+
+from services.iam.azure_rbac import extract_rbac, subscription_scopes, FixtureAuthorizationClient
+from services.iam.run import extract_azure_iam
+from services.iam.snapshot import load_snapshot
+
+logger = logging.getLogger("test")
+
+READER = "acdd72a7-3385-48ef-bd42-f606fba81ae7"
+
+def _role(subscription, guid, name, actions, not_actions=()):
+    return {
+        "id": f"/subscriptions/{subscription}/providers/Microsoft.Authorization/roleDefinitions/{guid}",
+        "name": guid,
+        "role_name": name,
+        "permissions": [{"actions": list(actions), "not_actions": list(not_actions)}],
+    }
+
+def _fixture(subscriptions, customs=3):
+    roles, assignments = {}, {}
+    for s in subscriptions:
+        scope = f"/subscriptions/{s}"
+        roles[scope] = [_role(s, READER, "Reader", ["*/read"])]
+        roles[scope] += [_role(s, f"custom-{s}-{i}", f"Custom {s} {i}", ["Microsoft.Storage/storageAccounts/read"]) for i in range(customs)]
+        assignments[scope] = [{"id": f"{scope}/providers/Microsoft.Authorization/roleAssignments/a-{s}", "scope": scope,
+                               "role_definition_id": roles[scope][0]["id"], "principal_id": "p", "principal_type": "User"}]
+    return {"role_definitions": roles, "role_assignments": assignments}
+
+def test_extract_pages_and_deduplicates_built_in_roles_across_subscriptions():
+    client = FixtureAuthorizationClient(_fixture(["s1", "s2"]), page_size=2)
+    roles, assignments = extract_rbac(lambda subscription_id: client, subscription_scopes(["s1", "s2"]), logger, max_workers=4)
+
+    names = sorted(r["name"] for r in roles)
+    assert names.count("Reader") == 1
+    assert len(names) == 1 + 2 * 3
+    assert len(assignments) == 2
+
+def test_role_records_keep_not_actions():
+    client = FixtureAuthorizationClient({"role_definitions": {"/subscriptions/s1": [
+        _role("s1", "g", "Limited", ["Microsoft.Storage/*"], ["Microsoft.Storage/storageAccounts/delete"]),
+    ]}})
+    roles, _ = extract_rbac(lambda subscription_id: client, subscription_scopes(["s1"]), logger)
+    assert roles[0]["permissions"] == ["Microsoft.Storage/*"]
+    assert roles[0]["not_permissions"] == ["Microsoft.Storage/storageAccounts/delete"]
+
+class _DeniedOperations:
+    def list(self, scope, filter=None):
+        raise RuntimeError("denied")
+
+    list_for_scope = list
+
+class _DeniedClient:
+    role_definitions = role_assignments = _DeniedOperations()
+
+def test_failed_scope_is_logged_and_others_are_kept(caplog):
+    good = FixtureAuthorizationClient(_fixture(["s1"]))
+    factory = lambda subscription_id: _DeniedClient() if subscription_id == "broken" else good
+
+    with caplog.at_level(logging.ERROR):
+        roles, _ = extract_rbac(factory, subscription_scopes(["s1", "broken"]), logger)
+    assert len(roles) == 4
+    assert "denied" in caplog.text
+
+def test_snapshot_is_replayed_without_azure(tmp_path):
+    fixture = tmp_path / "rbac.json"
+    fixture.write_text(json.dumps(_fixture(["s1"])))
+    config = {"azure_iam": {"fixture_path": str(fixture), "subscriptions": ["s1"], "snapshot_dir": str(tmp_path / "snapshots")}}
+
+    extracted = extract_azure_iam(config, logger)
+    snapshot = load_snapshot("latest", str(tmp_path / "snapshots"))
+    assert snapshot["role_definitions"] == extracted
+
+    fixture.unlink()
+    replayed = extract_azure_iam(dict(config, from_snapshot="latest"), logger)
+    assert replayed == extracted
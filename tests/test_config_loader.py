@@ -0,0 +1,37 @@
+import yaml
+
+from utils.config_loader import iter_yaml_list, load_yaml_config
+
+DOCUMENT = {
+    "settings": {"region": "ap-south-1", "buckets": ["not", "these"]},
+    "buckets": [
+        {"name": f"bucket-{i}", "tags": {"Owner": "team"}, "objects": [{"key": f"k{j}", "source": f"s{j}"} for j in range(3)]}
+        for i in range(50)
+    ],
+    "after": [1, 2, 3],
+}
+
+def test_streamed_items_match_the_loaded_document(tmp_path):
+    path = tmp_path / "inventory.yaml"
+    path.write_text(yaml.safe_dump(DOCUMENT, sort_keys=False))
+
+    streamed = list(iter_yaml_list(str(path), "buckets"))
+    loaded = list(iter_yaml_list(str(path), "buckets", stream=False, cache_dir=str(tmp_path / "cache")))
+    assert streamed == loaded == DOCUMENT["buckets"]
+    assert list(iter_yaml_list(str(path), "after")) == [1, 2, 3]
+
+def test_streaming_is_lazy(tmp_path):
+    path = tmp_path / "inventory.yaml"
+    # The second item is malformed; the first one is yielded before the parser reaches it
+    path.write_text("buckets:\n  - name: first\n  - {name: [unclosed\n")
+
+    items = iter_yaml_list(str(path), "buckets")
+    assert next(items) == {"name": "first"}
+    assert list(items) == []
+
+def test_missing_key_or_file_yields_nothing(tmp_path):
+    path = tmp_path / "inventory.yaml"
+    path.write_text("other: [1]\n")
+    assert list(iter_yaml_list(str(path), "buckets")) == []
+    assert list(iter_yaml_list(str(tmp_path / "missing.yaml"), "buckets")) == []
+    assert load_yaml_config(str(tmp_path / "missing.yaml")) == {}
@@ -0,0 +1,59 @@
+import logging
+
+from services.iam.optimize import canonical_statements, compact_json, load_optimize_settings, optimize_policies, split_statements
+
+logger = logging.getLogger("test")
+
+def _policy(name, statements):
+    return {
+        "PolicyName": name,
+        "PolicyDocument": {"Version": "2012-10-17", "Statement": statements},
+        "TrustPolicy": {"Version": "2012-10-17", "Statement": []},
+    }
+
+def _actions(documents):
+    return [(s["Effect"], a) for d in documents for s in d["Statement"] for a in s["Action"]]
+
+def test_split_keeps_small_documents_whole():
+    statements = [{"Effect": "Allow", "Action": ["s3:GetObject", "s3:PutObject"], "Resource": "*"}]
+    assert split_statements(statements, 6144) == [{"Version": "2012-10-17", "Statement": statements}]
+
+def test_split_packs_every_action_under_the_size_limit():
+    statements = [
+        {"Effect": "Allow", "Action": [f"s3:Action{i:04d}" for i in range(900)], "Resource": "*"},
+        {"Effect": "Deny", "Action": [f"iam:Action{i:04d}" for i in range(300)], "Resource": "*"},
+    ]
+    for max_chars in (512, 2048, 6144):
+        documents = split_statements(statements, max_chars)
+        assert len(documents) > 1
+        assert all(len(compact_json(d)) <= max_chars for d in documents)
+        assert _actions(documents) == _actions([{"Statement": statements}])
+
+def test_canonical_statements_merge_by_effect_and_drop_covered_actions():
+    document = {"Statement": [
+        {"Effect": "Allow", "Action": ["s3:GetObject", "s3:*"], "Resource": "*"},
+        {"Effect": "Allow", "Action": "ec2:DescribeInstances", "Resource": "*"},
+        {"Effect": "Deny", "Action": ["s3:DeleteBucket"], "Resource": "*"},
+    ]}
+    statements = canonical_statements(document, load_optimize_settings())
+    by_effect = {s["Effect"]: s["Action"] for s in statements}
+    assert by_effect == {"Allow": ["ec2:DescribeInstances", "s3:*"], "Deny": ["s3:DeleteBucket"]}
+
+def test_identical_policies_share_one_managed_policy():
+    statement = {"Effect": "Allow", "Action": ["s3:GetObject", "s3:ListBucket"], "Resource": "*"}
+    reordered = dict(statement, Action=["s3:ListBucket", "s3:GetObject"])
+    plan = optimize_policies([_policy("A", [statement]), _policy("B", [reordered])], logger)
+
+    assert len(plan["policies"]) == 1
+    assert plan["roles"][0]["PolicyHashes"] == plan["roles"][1]["PolicyHashes"]
+    assert plan["stats"]["policies_saved"] == 1
+
+def test_oversized_policy_is_split_into_named_parts():
+    statement = {"Effect": "Allow", "Action": [f"s3:Action{i:04d}" for i in range(1000)], "Resource": "*"}
+    plan = optimize_policies([_policy("Big", [statement])], logger)
+
+    names = {p["PolicyName"] for p in plan["policies"].values()}
+    assert len(names) > 1
+    assert names == {f"Big_part{i}" for i in range(1, len(names) + 1)}
+    assert all(len(compact_json(p["PolicyDocument"])) <= 6144 for p in plan["policies"].values())
+    assert len(plan["roles"][0]["PolicyHashes"]) == len(names)
@@ -0,0 +1,121 @@
+import datetime
+import decimal
+import logging
+import sqlite3
+import uuid
+
+import pytest
+
+from services.rds.data_copy import Endpoint, TableCheckpoint, _copy_field, copy_database, plan_chunks
+
+logger = logging.getLogger("test")
+
+SCHEMAS = [
+    "CREATE TABLE numbers (id INTEGER PRIMARY KEY, payload BLOB, note TEXT)",
+    "CREATE TABLE codes (code TEXT PRIMARY KEY, value INTEGER)",
+    "CREATE TABLE pairs (a INTEGER, b INTEGER, PRIMARY KEY (a, b))",
+]
+
+def _databases(tmp_path, rows=2500):
+    source, target = str(tmp_path / "source.db"), str(tmp_path / "target.db")
+    for path in (source, target):
+        conn = sqlite3.connect(path)
+        for schema in SCHEMAS:
+            conn.execute(schema)
+        conn.commit()
+        conn.close()
+    conn = sqlite3.connect(source)
+    conn.executemany("INSERT INTO numbers VALUES (?, ?, ?)", [(i, bytes([i % 256, 0]), None if i % 5 else "") for i in range(1, rows + 1)])
+    conn.executemany("INSERT INTO codes VALUES (?, ?)", [(f"k{i:05d}", i) for i in range(rows)])
+    conn.executemany("INSERT INTO pairs VALUES (?, ?)", [(i // 10, i % 10) for i in range(300)])
+    conn.commit()
+    conn.close()
+    copy = {
+        "name": "db",
+        "source": {"driver": "sqlite3", "connect": {"database": source}},
+        "target": {"driver": "sqlite3", "connect": {"database": target, "timeout": 30}},
+    }
+    return copy, {"chunk_rows": 1000, "batch_size": 300, "max_workers": 4, "checkpoint_dir": str(tmp_path / "checkpoints")}
+
+def _rows(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+    finally:
+        conn.close()
+
+def test_tables_are_copied_in_key_range_chunks(tmp_path):
+    copy, settings = _databases(tmp_path)
+    report = copy_database(copy, logger, settings)
+
+    tables = report["tables"]
+    assert {t: (r["status"], r["chunks"]) for t, r in tables.items()} == {
+        "numbers": ("copied", 3), "codes": ("copied", 3), "pairs": ("copied", 1),
+    }
+    for table in tables:
+        assert _rows(copy["source"]["connect"]["database"], table) == _rows(copy["target"]["connect"]["database"], table)
+
+def test_failed_chunk_is_resumed_without_copying_the_others_again(tmp_path):
+    copy, settings = _databases(tmp_path)
+    target = copy["target"]["connect"]["database"]
+    conn = sqlite3.connect(target)
+    conn.execute("CREATE TRIGGER boom BEFORE INSERT ON numbers WHEN NEW.id = 1500 BEGIN SELECT RAISE(ABORT, 'boom'); END")
+    conn.commit()
+    conn.close()
+
+    first = copy_database(copy, logger, settings)["tables"]["numbers"]
+    assert first["status"] == "failed"
+    assert len(first["failed_chunks"]) == 1
+
+    conn = sqlite3.connect(target)
+    conn.execute("DROP TRIGGER boom")
+    conn.commit()
+    conn.close()
+    second = copy_database(copy, logger, settings)["tables"]
+    assert second["numbers"]["status"] == "copied"
+    assert second["numbers"]["resumed_chunks"] == 2
+    assert first["rows"] + second["numbers"]["copied_rows"] == 2500
+    assert second["numbers"]["target_count"] == 2500
+    assert second["codes"]["copied_rows"] == 0
+
+def test_chunks_cover_every_key_exactly_once(tmp_path):
+    copy, _ = _databases(tmp_path, rows=2345)
+    endpoint = Endpoint(copy["source"])
+    conn = endpoint.connect()
+    try:
+        for table, key in (("numbers", "id"), ("codes", "code")):
+            chunks = plan_chunks(conn, endpoint, table, key, 500)
+            assert chunks[0]["low"] is None and chunks[-1]["high"] is None
+            assert all(a["high"] == b["low"] for a, b in zip(chunks, chunks[1:]))
+            keys = [row[0] for row in conn.execute(f"SELECT {key} FROM {table}")]
+            counted = sum(
+                sum(1 for k in keys if (c["low"] is None or k >= c["low"]) and (c["high"] is None or k < c["high"]))
+                for c in chunks
+            )
+            assert counted == len(keys)
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize("bound", [
+    b"\x00\xff", datetime.datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc), datetime.date(2024, 1, 2),
+    datetime.time(1, 2, 3), decimal.Decimal("1.10"), uuid.UUID("12345678-1234-5678-1234-567812345678"), "k", 7,
+])
+def test_checkpoint_restores_chunk_bounds_with_their_type(tmp_path, bound):
+    path = str(tmp_path / "table.jsonl")
+    checkpoint = TableCheckpoint(path)
+    checkpoint.record_plan("id", ["id"], [{"id": 0, "low": None, "high": bound}, {"id": 1, "low": bound, "high": None}])
+    checkpoint.close()
+
+    restored = TableCheckpoint(path)
+    restored.close()
+    assert [(c["low"], c["high"]) for c in restored.plan["chunks"]] == [(None, bound), (bound, None)]
+    assert type(restored.plan["chunks"][1]["low"]) is type(bound)
+
+def test_copy_fields_use_postgres_text_forms():
+    assert _copy_field(None) == ""
+    assert _copy_field(b"\x00\xff") == "\\x00ff"
+    assert _copy_field(memoryview(b"a")) == "\\x61"
+    assert _copy_field(True) == "t"
+    assert _copy_field("") == '""'
+    assert _copy_field('say "hi"') == '"say ""hi"""'
+    assert _copy_field({"a": 1}) == '"{""a"": 1}"'
@@ -0,0 +1,54 @@
+import logging
+import threading
+import time
+
+import pytest
+
+import core.runner as runner
+
+logger = logging.getLogger("test")
+
+@pytest.fixture
+def services(monkeypatch):
+    calls = []
+
+    def register(name, run, depends_on=()):
+        def wrapped(config, service_logger):
+            calls.append(("start", name))
+            run(config, service_logger)
+            calls.append(("end", name))
+        monkeypatch.setitem(runner.SERVICE_REGISTRY, name, f"tests.{name}")
+        monkeypatch.setitem(runner._loaded_services, name, wrapped)
+        monkeypatch.setitem(runner.SERVICE_DEPENDENCIES, name, list(depends_on))
+
+    register.calls = calls
+    return register
+
+def test_independent_services_run_concurrently(services):
+    barrier = threading.Barrier(2, timeout=5)
+    services("first", lambda config, log: barrier.wait())
+    services("second", lambda config, log: barrier.wait())
+
+    results = runner.run_services(["first", "second"], {}, logger, max_workers=2)
+    assert {s: r["status"] for s, r in results.items()} == {"first": "completed", "second": "completed"}
+
+def test_dependents_start_after_their_dependencies(services):
+    services("base", lambda config, log: time.sleep(0.05))
+    services("dependent", lambda config, log: None, depends_on=["base"])
+
+    runner.run_services(["dependent", "base"], {}, logger, max_workers=4)
+    assert services.calls.index(("end", "base")) < services.calls.index(("start", "dependent"))
+
+def test_partial_dependency_unblocks_and_failed_one_skips(services):
+    def fail(config, log):
+        raise RuntimeError("boom")
+
+    services("partial", lambda config, log: log.error(" one resource failed"))
+    services("broken", fail)
+    services("after_partial", lambda config, log: None, depends_on=["partial"])
+    services("after_broken", lambda config, log: None, depends_on=["broken"])
+
+    results = runner.run_services(["partial", "broken", "after_partial", "after_broken"], {}, logger)
+    assert {s: r["status"] for s, r in results.items()} == {
+        "partial": "partial", "broken": "failed", "after_partial": "completed", "after_broken": "skipped",
+    }
@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from services.s3.blob_source import BlobModified, LocalDirectorySource, iter_blob_jobs
+from services.s3.blob_transfer import stream_blobs
+from services.s3.checkpoint import CheckpointStore
+from services.s3.sync import DigestCache, _local_etag, _part_size_for, compute_etag
+from services.s3.transfer import MAX_PARTS, MB, multipart_part_size, upload_objects
+
+logger = logging.getLogger("test")
+
+# S3 rejects multipart parts under 5 MB except the last one
+SETTINGS = {"multipart_threshold_mb": 5, "multipart_chunksize_mb": 5, "retry_backoff": 0, "max_workers": 4}
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name, value in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing", "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket="bkt")
+        yield client
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return str(path)
+
+def test_single_part_etag_is_the_md5(tmp_path):
+    path = _write(tmp_path / "f", 1000)
+    with open(path, "rb") as f:
+        assert compute_etag(path) == hashlib.md5(f.read()).hexdigest()
+
+def test_multipart_etag_is_the_md5_of_part_md5s(tmp_path):
+    path = _write(tmp_path / "f", 2 * MB + 17)
+    with open(path, "rb") as f:
+        parts = [hashlib.md5(f.read(MB)).digest() for _ in range(3)]
+    assert compute_etag(path, MB) == f"{hashlib.md5(b''.join(parts)).hexdigest()}-3"
+
+@pytest.mark.parametrize("size", [1, 5 * MB, 80 * 1024 * MB, 80 * 1024 * MB + 1, 100 * 1024 ** 3, 123456789012, 5 * 1024 ** 4])
+def test_part_size_stays_under_max_parts_and_sync_recomputes_it(size):
+    default = 8 * MB
+    part_size = multipart_part_size(size, default)
+    part_count = -(-size // part_size)
+
+    assert part_count <= MAX_PARTS
+    assert part_size == default or part_size % MB == 0
+    assert _part_size_for(size, part_count, default) == part_size
+
+def test_uploaded_multipart_etag_matches_the_local_etag(s3, tmp_path):
+    path = _write(tmp_path / "big", 11 * MB)
+    checkpoint = CheckpointStore(str(tmp_path / "checkpoint.jsonl"))
+    try:
+        summary = upload_objects(s3, [{"bucket": "bkt", "key": "big", "source": path}], logger, SETTINGS, checkpoint)
+    finally:
+        checkpoint.close()
+    assert summary["objects"] == 1
+
+    remote = s3.head_object(Bucket="bkt", Key="big")["ETag"].strip('"')
+    assert remote.endswith("-3")
+    assert _local_etag({"source": path}, os.stat(path), remote, {"multipart_chunksize_mb": 5}, DigestCache()) == remote
+
+def test_resume_skips_objects_still_in_the_bucket(s3, tmp_path):
+    jobs = [{"bucket": "bkt", "key": f"k{i}", "source": _write(tmp_path / f"f{i}", 100)} for i in range(3)]
+    path = str(tmp_path / "checkpoint.jsonl")
+
+    def run():
+        checkpoint = CheckpointStore(path)
+        try:
+            return upload_objects(s3, jobs, logger, SETTINGS, checkpoint)
+        finally:
+            checkpoint.close()
+
+    assert run()["objects"] == 3
+    s3.delete_object(Bucket="bkt", Key="k0")
+    summary = run()
+    assert (summary["objects"], summary["skipped"]) == (1, 2)
+
+def test_blobs_stream_into_multipart_uploads_with_reused_buffers(s3, tmp_path):
+    paths = [_write(tmp_path / "src" / "c" / name, size) for name, size in (("a/big", 11 * MB), ("small", 100))]
+    source = LocalDirectorySource(str(tmp_path / "src"))
+    settings = dict(SETTINGS, part_buffers=2)
+
+    summary = stream_blobs(s3, source, iter_blob_jobs(source, "bkt", {"container": "c"}), logger, settings)
+
+    assert (summary["objects"], summary["failed"]) == (2, 0)
+    assert summary["buffers_allocated"] <= 2
+    for path, key in zip(paths, ("a/big", "small")):
+        with open(path, "rb") as f:
+            assert s3.get_object(Bucket="bkt", Key=key)["Body"].read() == f.read()
+    assert s3.head_object(Bucket="bkt", Key="a/big")["ETag"].strip('"') == compute_etag(paths[0], 5 * MB)
+
+def test_blob_changed_after_listing_is_reread(s3, tmp_path):
+    path = _write(tmp_path / "src" / "c" / "blob", 100)
+    source = LocalDirectorySource(str(tmp_path / "src"))
+    jobs = list(iter_blob_jobs(source, "bkt", {"container": "c"}))
+
+    with open(path, "ab") as f:
+        f.write(b"appended")
+    with pytest.raises(BlobModified):
+        source.read_into(jobs[0]["blob"], 0, memoryview(bytearray(100)))
+
+    summary = stream_blobs(s3, source, iter(jobs), logger, SETTINGS)
+    assert (summary["objects"], summary["failed"]) == (1, 0)
+    with open(path, "rb") as f:
+        assert s3.get_object(Bucket="bkt", Key="blob")["Body"].read() == f.read()
@@ -0,0 +1,144 @@
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+
+from utils.metrics import METRICS, instrument_client
+
+DEFAULT_CLIENT_SETTINGS = {
+    "region": None,                   # falls back to the SDK's usual region resolution
+    "profile": None,
+    "max_pool_connections": 64,       # enough for S3 object workers x part concurrency
+    "retry_mode": "adaptive",
+    "max_attempts": 10,
+    "connect_timeout": 10,
+    "read_timeout": 60,
+}
+
+_settings = dict(DEFAULT_CLIENT_SETTINGS)
+_sessions = {}
+_clients = {}
+_role_sessions = {}
+_role_locks = {}
+_lock = threading.Lock()
+
+# The account/region target of the current fan-out run (see core/fanout.py). It is a context
+# variable, so every thread started with the target's context gets that target's clients.
+_target = contextvars.ContextVar("aws_target", default=None)
+
+def configure_clients(settings=None, region=None):
+    global _settings
+    merged = dict(DEFAULT_CLIENT_SETTINGS)
+    if region:
+        merged["region"] = region
+    merged.update({k: v for k, v in (settings or {}).items() if v is not None})
+    with _lock:
+        _settings = merged
+        _clients.clear()
+
+# boto3/botocore are imported on first use so that importing this module stays cheap
+def client_config(retries=None):
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=_settings["max_pool_connections"],
+        retries=retries or {"mode": _settings["retry_mode"], "max_attempts": _settings["max_attempts"]},
+        connect_timeout=_settings["connect_timeout"],
+        read_timeout=_settings["read_timeout"],
+    )
+
+# AWS_ENDPOINT_URL_<SERVICE> wins over AWS_ENDPOINT_URL, e.g. to point everything at a local moto server
+def endpoint_url(service):
+    service_key = service.upper().replace("-", "_")
+    return os.getenv(f"AWS_ENDPOINT_URL_{service_key}") or os.getenv("AWS_ENDPOINT_URL") or None
+
+def _session(profile):
+    import boto3
+
+    if profile not in _sessions:
+        _sessions[profile] = boto3.session.Session(profile_name=profile) if profile else boto3.session.Session()
+    return _sessions[profile]
+
+@contextmanager
+def use_target(target):
+    token = _target.set(target)
+    try:
+        yield target
+    finally:
+        _target.reset(token)
+
+def current_target():
+    return _target.get()
+
+def _assume_role(sts, target):
+    params = {
+        "RoleArn": target["role_arn"],
+        "RoleSessionName": target.get("session_name") or "azure-to-aws-migration",
+        "DurationSeconds": target.get("duration_seconds") or 3600,
+    }
+    if target.get("external_id"):
+        params["ExternalId"] = target["external_id"]
+    credentials = sts.assume_role(**params)["Credentials"]
+    METRICS.inc("migration_sts_assume_role_total", account=target.get("account_id") or "")
+    return {
+        "access_key": credentials["AccessKeyId"],
+        "secret_key": credentials["SecretAccessKey"],
+        "token": credentials["SessionToken"],
+        "expiry_time": credentials["Expiration"].isoformat(),
+    }
+
+# One assumed-role session per (role, external id, source profile), shared by every region
+# of that account. botocore refreshes the credentials itself once they are within 15 minutes
+# of expiry, so long migrations never run into ExpiredToken.
+def _role_session(target, profile):
+    import boto3
+    import botocore.session
+    from botocore.credentials import RefreshableCredentials
+
+    key = (target["role_arn"], target.get("external_id"), profile)
+    with _lock:
+        role_lock = _role_locks.setdefault(key, threading.Lock())
+    with role_lock:
+        if key not in _role_sessions:
+            with _lock:
+                sts = _session(profile).client("sts", region_name=target.get("region") or _settings["region"],
+                                               endpoint_url=endpoint_url("sts"), config=client_config())
+            def refresh():
+                return _assume_role(sts, target)
+
+            core = botocore.session.Session()
+            core._credentials = RefreshableCredentials.create_from_metadata(refresh(), refresh, "sts-assume-role")
+            _role_sessions[key] = boto3.session.Session(botocore_session=core)
+        return _role_sessions[key]
+
+# One shared, thread-safe client per (service, region, profile, role), so each fan-out target
+# has its own connection pools. Sessions are not thread-safe, so creation happens under a
+# lock; the returned clients can be used from any thread. retries overrides the botocore
+# retry config, e.g. {"mode": "standard", "max_attempts": 1} for calls that an
+# AdaptiveConcurrency limiter retries itself (see utils/throttling.py).
+def get_client(service, region=None, profile=None, retries=None):
+    target = _target.get() or {}
+    region = region or target.get("region") or _settings["region"]
+    profile = profile or target.get("profile") or _settings["profile"]
+    role_arn = target.get("role_arn")
+    key = (service, region, profile, role_arn, tuple(sorted((retries or {}).items())))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    session = _role_session(target, profile) if role_arn else None
+    with _lock:
+        if key not in _clients:
+            _clients[key] = instrument_client((session or _session(profile)).client(
+                service,
+                region_name=region,
+                endpoint_url=endpoint_url(service),
+                config=client_config(retries),
+            ))
+        return _clients[key]
+
+def reset_clients():
+    with _lock:
+        _clients.clear()
+        _sessions.clear()
+        _role_sessions.clear()
+        _role_locks.clear()
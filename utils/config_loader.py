@@ -1,18 +1,99 @@
+import gc
+import hashlib
 import os
+import pickle
 import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import DocumentStartEvent, MappingEndEvent, MappingStartEvent, ScalarEvent, SequenceEndEvent, SequenceStartEvent
+from yaml.parser import Parser
+from yaml.reader import Reader
+from yaml.resolver import Resolver
+from yaml.scanner import Scanner
 
-def load_yaml_config(path, logger=None):
+# libyaml's C parser is several times faster than the pure-Python one; fall back when it is not built
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+try:
+    from yaml.cyaml import CParser as _Parser
+except ImportError:
+    class _Parser(Reader, Scanner, Parser):
+        def __init__(self, stream):
+            Reader.__init__(self, stream)
+            Scanner.__init__(self)
+            Parser.__init__(self)
+
+# Parsed configs are pickled here, keyed by path, size, mtime and content hash.
+# Set MIGRATION_CONFIG_CACHE_DIR to an empty string to disable the cache.
+DEFAULT_CACHE_DIR = os.getenv("MIGRATION_CONFIG_CACHE_DIR", ".cache/config")
+CACHE_VERSION = 1
+
+def _cache_file(cache_dir, path):
+    name = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{name}.pickle")
+
+def _read_cache(cache_file):
+    try:
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def _write_cache(cache_file, entry):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cache_file)
+
+# Parsing allocates millions of small objects; with the cyclic GC running, large inventories
+# spend most of their load time in collections that can never free anything.
+def _parse(content):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return yaml.load(content, Loader=SafeLoader)
+    finally:
+        if enabled:
+            gc.enable()
+
+# Parses one YAML file, reusing the pickled result while the file is unchanged. A matching
+# size and mtime is trusted as is; otherwise the content hash decides, so a touched but
+# unmodified file is not parsed again. Raises on missing files and YAML errors.
+def read_yaml(path, cache_dir=DEFAULT_CACHE_DIR):
+    stat = os.stat(path)
+    stamp = (CACHE_VERSION, SafeLoader.__name__, stat.st_size, stat.st_mtime_ns)
+    cache_file = _cache_file(cache_dir, path) if cache_dir else None
+    cached = _read_cache(cache_file) if cache_file and os.path.isfile(cache_file) else None
+    if cached and cached["stamp"] == stamp:
+        return cached["data"]
+
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if cached and cached["stamp"][:2] == stamp[:2] and cached["sha256"] == digest:
+        data = cached["data"]
+    else:
+        data = _parse(content)
+
+    if cache_file:
+        try:
+            _write_cache(cache_file, {"stamp": stamp, "sha256": digest, "data": data})
+        except OSError:
+            pass
+    return data
+
+def load_yaml_config(path, logger=None, cache_dir=DEFAULT_CACHE_DIR):
     if not os.path.isfile(path):
         if logger:
             logger.error(f" Config file not found: {path}")
         return {}
 
     try:
-        with open(path, 'r') as f:
-            config = yaml.safe_load(f)
-            if logger:
-                logger.info(f" Loaded config: {path}")
-            return config or {}
+        config = read_yaml(path, cache_dir)
+        if logger:
+            logger.info(f" Loaded config: {path}")
+        return config or {}
     except yaml.YAMLError as e:
         if logger:
             logger.error(f" YAML parsing error in {path}: {e}")
@@ -20,4 +101,63 @@ def load_yaml_config(path, logger=None):
     except Exception as e:
         if logger:
             logger.error(f" Failed to load config {path}: {e}")
-        return {}
\ No newline at end of file
+        return {}
+
+# Uses the parser's event stream directly so items of one top-level list can be composed
+# and constructed one at a time, without building nodes for the whole document first.
+class _ItemLoader(_Parser, Composer, SafeConstructor, Resolver):
+    def __init__(self, stream):
+        _Parser.__init__(self, stream)
+        Composer.__init__(self)
+        SafeConstructor.__init__(self)
+        Resolver.__init__(self)
+
+def _iter_sequence(path, key):
+    with open(path, "rb") as f:
+        loader = _ItemLoader(f)
+        try:
+            loader.get_event()                          # stream start
+            if not loader.check_event(DocumentStartEvent):
+                return
+            loader.get_event()
+            if not loader.check_event(MappingStartEvent):
+                return
+            loader.get_event()
+            while not loader.check_event(MappingEndEvent):
+                name = loader.get_event()
+                if not (isinstance(name, ScalarEvent) and name.value == key):
+                    loader.compose_node(None, None)     # skip the value of any other key
+                    continue
+                if not loader.check_event(SequenceStartEvent):
+                    value = loader.construct_document(loader.compose_node(None, None))
+                    yield from value or []
+                    return
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    yield loader.construct_document(loader.compose_node(None, None))
+                return
+        finally:
+            loader.dispose()
+
+# Yields the items of a top-level list (buckets, functions, instances, ...). With stream=True
+# the file is parsed incrementally; otherwise the whole document is loaded through the cache.
+def iter_yaml_list(path, key, logger=None, stream=True, cache_dir=DEFAULT_CACHE_DIR):
+    if not stream:
+        yield from load_yaml_config(path, logger, cache_dir).get(key) or []
+        return
+
+    if not os.path.isfile(path):
+        if logger:
+            logger.error(f" Config file not found: {path}")
+        return
+
+    if logger:
+        logger.info(f" Streaming '{key}' from config: {path}")
+    try:
+        yield from _iter_sequence(path, key)
+    except yaml.YAMLError as e:
+        if logger:
+            logger.error(f" YAML parsing error in {path}: {e}")
+    except Exception as e:
+        if logger:
+            logger.error(f" Failed to load config {path}: {e}")
@@ -19,4 +19,21 @@ def format_tags(tag_dict):
 
 def validate_required_fields(data, required_keys):
     missing = [key for key in required_keys if key not in data or not data[key]]
-    return missing
\ No newline at end of file
+    return missing
+
+def latency_histogram(latencies, bounds=(0.25, 0.5, 1, 2, 5, 10)):
+    counts = {f"<={b}s": 0 for b in bounds}
+    counts[f">{bounds[-1]}s"] = 0
+    for value in latencies:
+        for b in bounds:
+            if value <= b:
+                counts[f"<={b}s"] += 1
+                break
+        else:
+            counts[f">{bounds[-1]}s"] += 1
+
+    ordered = sorted(latencies)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+    return {"count": len(ordered), "p50": percentile(0.5), "p95": percentile(0.95), "max": ordered[-1] if ordered else 0.0, "buckets": counts}
@@ -0,0 +1,76 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+DEFAULT_LOGGING_SETTINGS = {
+    "level": "INFO",
+    "format": "%(asctime)s - %(levelname)s - %(message)s",
+    "console": True,
+    "destination": None,          # log file; one JSON event per line when structured
+    "structured": True,
+}
+
+_listener = None
+
+def load_logging_settings(overrides=None):
+    settings = dict(DEFAULT_LOGGING_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+# Structured fields are passed as logger.info(msg, extra={"fields": {...}}) and merged into the event
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        event = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage().strip(),
+        }
+        event.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            event["exception"] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+# Worker threads only put records on an in-memory queue; a single listener thread formats
+# them and does the console and file I/O, so logging never blocks an upload or API call.
+def setup_logging(settings=None, name="MigrationAgent"):
+    global _listener
+    settings = load_logging_settings(settings)
+    shutdown_logging()
+
+    handlers = []
+    if settings["console"]:
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter(settings["format"]))
+        handlers.append(console)
+    if settings["destination"]:
+        directory = os.path.dirname(settings["destination"])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        log_file = logging.FileHandler(settings["destination"])
+        log_file.setFormatter(JsonFormatter() if settings["structured"] else logging.Formatter(settings["format"]))
+        handlers.append(log_file)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(settings["level"])
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return logging.getLogger(name)
+
+# Drains the queue; call before exiting so no queued record is lost
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, shared by every latency histogram
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+DEFAULT_METRICS_SETTINGS = {
+    "summary_path": "logs/run_summary.json",
+    "prometheus_textfile": None,   # rewritten at the end of the run, e.g. for node_exporter
+    "prometheus_port": None,       # serve /metrics while the run is in progress
+}
+
+def load_metrics_settings(overrides=None):
+    settings = dict(DEFAULT_METRICS_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+class Histogram:
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+# Counters and histograms keyed by name plus labels (service, step, operation, ...).
+# One lock guards all updates; each update is a dict lookup and an addition.
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters.items())]
+            histograms = [
+                {"name": n, "labels": dict(l), "count": h.count, "sum": h.sum,
+                 "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in h.cumulative()}}
+                for (n, l), h in sorted(self.histograms.items(), key=lambda item: item[0])
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def label_text(labels, extra=None):
+            pairs = list(labels.items()) + (extra or [])
+            if not pairs:
+                return ""
+            escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+            return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+        for counter in snapshot["counters"]:
+            if counter["name"] not in typed:
+                lines.append(f"# TYPE {counter['name']} counter")
+                typed.add(counter["name"])
+            lines.append(f"{counter['name']}{label_text(counter['labels'])} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name = histogram["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in histogram["buckets"].items():
+                lines.append(f"{name}_bucket{label_text(histogram['labels'], [('le', bound)])} {count}")
+            lines.append(f"{name}_sum{label_text(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{label_text(histogram['labels'])} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+# Process-wide registry, like the shared clients in utils/aws.py
+METRICS = MetricsRegistry()
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def write_summary(path, results, registry=METRICS, **fields):
+    summary = {
+        "started": registry.started,
+        "finished": time.time(),
+        "services": results,
+        "metrics": registry.snapshot(),
+    }
+    summary.update(fields)
+    _write_atomic(path, json.dumps(summary, indent=2, default=str))
+    return summary
+
+def write_prometheus(path, registry=METRICS):
+    _write_atomic(path, registry.to_prometheus())
+
+def serve_prometheus(port, registry=METRICS, host="0.0.0.0"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+# botocore event hooks: one API call counter and latency histogram per service and operation
+def _before_call(model, context, **kwargs):
+    context["metrics_started"] = time.perf_counter()
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    labels = {"service": model.service_model.endpoint_prefix, "operation": model.name}
+    started = context.get("metrics_started")
+    if started is not None:
+        METRICS.observe("migration_api_call_seconds", time.perf_counter() - started, **labels)
+    status = parsed.get("Error", {}).get("Code") or ("ok" if http_response.status_code < 300 else str(http_response.status_code))
+    METRICS.inc("migration_api_calls_total", status=status, **labels)
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    if retries:
+        METRICS.inc("migration_api_retries_total", retries, **labels)
+
+def _after_call_error(exception, model, context, **kwargs):
+    METRICS.inc(
+        "migration_api_calls_total",
+        service=model.service_model.endpoint_prefix,
+        operation=model.name,
+        status=type(exception).__name__,
+    )
+
+def instrument_client(client):
+    events = client.meta.events
+    events.register("before-call.*.*", _before_call)
+    events.register("after-call.*.*", _after_call)
+    events.register("after-call-error.*.*", _after_call_error)
+    return client
@@ -0,0 +1,43 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_PARALLEL_SETTINGS = {
+    "processes": None,            # defaults to the number of CPUs
+    "chunk_size": 1000,           # records per task sent to a worker process
+    "min_records": 5000,          # below this, transforms run in-process
+}
+
+def load_parallel_settings(overrides=None):
+    settings = dict(DEFAULT_PARALLEL_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def _encode(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+def _run_chunk(func, payload, args):
+    return _encode(func(json.loads(payload), *args))
+
+# The runner and the pipeline keep threads alive, which fork() would copy in an unknown state
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+# Applies func(chunk, *args) to consecutive chunks of records and returns the per-chunk
+# results in input order. func must be a module-level function whose input and output are
+# JSON-serialisable: chunks travel as one compact JSON bytes payload each instead of being
+# pickled record by record. Small inputs, or a single process, stay in-process.
+def map_chunks(func, records, settings=None, *args):
+    settings = load_parallel_settings(settings)
+    records = list(records)
+    processes = settings["processes"] or os.cpu_count() or 1
+    if processes <= 1 or len(records) < max(settings["min_records"], 2):
+        return [func(records, *args)]
+
+    size = max(1, min(settings["chunk_size"], -(-len(records) // processes)))
+    payloads = [_encode(records[i:i + size]) for i in range(0, len(records), size)]
+    with ProcessPoolExecutor(max_workers=min(processes, len(payloads)), mp_context=_context()) as pool:
+        results = pool.map(_run_chunk, [func] * len(payloads), payloads, [args] * len(payloads))
+        return [json.loads(result) for result in results]
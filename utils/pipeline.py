@@ -0,0 +1,80 @@
+import queue
+import threading
+from itertools import islice
+
+from utils.metrics import METRICS
+
+DEFAULT_PIPELINE_SETTINGS = {
+    "batch_size": 500,            # records transformed, validated and deployed together
+    "max_pending_batches": 4,     # validated batches buffered ahead of the deploy step
+    "stream_sources": True,       # parse inventory YAML incrementally instead of loading it whole
+}
+
+_DONE = object()
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+def load_pipeline_settings(overrides=None):
+    settings = dict(DEFAULT_PIPELINE_SETTINGS)
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def batched(records, size):
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, max(1, size)))
+        if not batch:
+            return
+        yield batch
+
+# Pulls records from the source and runs each batch through the named stages (transform, validate)
+# on a background thread, yielding the surviving records to the caller one at a time.
+# The queue in between is bounded, so the extractor blocks once max_pending_batches are
+# waiting on a slower deploy step instead of loading the whole inventory ahead of it.
+# Record counts and per-stage time are recorded in the metrics registry under `name`.
+def stream(source, stages, settings=None, name=None):
+    settings = load_pipeline_settings(settings)
+    buffer = queue.Queue(maxsize=max(1, settings["max_pending_batches"]))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in batched(source, settings["batch_size"]):
+                METRICS.inc("migration_records_total", len(batch), service=name, stage="extracted")
+                for step, stage in stages.items():
+                    with METRICS.timer("migration_step_seconds", service=name, step=step):
+                        batch = stage(batch)
+                    if not batch:
+                        break
+                if batch:
+                    METRICS.inc("migration_records_total", len(batch), service=name, stage="validated")
+                    if not put(batch):
+                        return
+        except Exception as e:
+            put(_Failure(e))
+        else:
+            put(_DONE)
+
+    threading.Thread(target=produce, name="pipeline-producer", daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield from item
+    finally:
+        # Lets the producer exit if the consumer stops early
+        stop.set()
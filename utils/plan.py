@@ -0,0 +1,63 @@
+CREATE = "create"
+UPDATE = "update"
+NOOP = "no-op"
+
+# Reads current AWS state with one paginated listing and indexes it by name
+def list_index(client, operation, result_key, key_field, **kwargs):
+    index = {}
+    if client.can_paginate(operation):
+        pages = client.get_paginator(operation).paginate(**kwargs)
+    else:
+        pages = [getattr(client, operation)(**kwargs)]
+    for page in pages:
+        for item in page.get(result_key, []):
+            index[item[key_field]] = item
+    return index
+
+# Falls back to an empty index, so a failed read degrades to the old create-and-catch behaviour
+def load_state(logger, resource, client, operation, result_key, key_field, **kwargs):
+    try:
+        return list_index(client, operation, result_key, key_field, **kwargs)
+    except Exception as e:
+        logger.warning(f" Could not read existing {resource} state, planning every {resource} as new: {e}")
+        return {}
+
+def changed_fields(desired, current, fields):
+    changes = {}
+    for desired_key, current_key in fields.items():
+        if desired_key in desired and desired[desired_key] != current.get(current_key):
+            changes[desired_key] = {"from": current.get(current_key), "to": desired[desired_key]}
+    return changes
+
+# Create/update/no-op diff for one resource type, computed before any write is made
+class Plan:
+    def __init__(self, resource):
+        self.resource = resource
+        self.entries = []
+
+    def add(self, action, name, item=None, changes=None):
+        entry = {"action": action, "name": name, "item": item, "changes": changes or {}}
+        self.entries.append(entry)
+        return entry
+
+    def of(self, action):
+        return [e for e in self.entries if e["action"] == action]
+
+    def summary(self):
+        return {action: len(self.of(action)) for action in (CREATE, UPDATE, NOOP)}
+
+    def log_summary(self, logger):
+        counts = self.summary()
+        logger.info(f" Plan for {self.resource}: {counts[CREATE]} to create, {counts[UPDATE]} to update, {counts[NOOP]} unchanged")
+
+    # Streamed deploys log the entries of each batch as it is planned and the summary at the end
+    def log_entries(self, logger, entries=None):
+        for entry in self.entries if entries is None else entries:
+            if entry["action"] == CREATE:
+                logger.info(f"   + {self.resource} {entry['name']}")
+            elif entry["action"] == UPDATE:
+                logger.info(f"   ~ {self.resource} {entry['name']} ({', '.join(sorted(entry['changes']))})")
+
+    def log(self, logger):
+        self.log_summary(logger)
+        self.log_entries(logger)
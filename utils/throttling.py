@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from utils.metrics import METRICS
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "ProvisionedThroughputExceededException",
+    "SlowDown",
+}
+
+def is_throttling_error(error):
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get("Error", {}).get("Code", "")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    message = error.response.get("Error", {}).get("Message", "").lower()
+    return code in THROTTLING_ERROR_CODES or status == 429 or "rate exceeded" in message
+
+# AIMD limit on in-flight API calls: halve on throttling, grow by ~1 per window of successes.
+# Calls should go through a client without botocore retries (NO_SDK_RETRIES); otherwise the
+# SDK absorbs throttling before the limiter sees it and multiplies the attempts per call.
+NO_SDK_RETRIES = {"mode": "standard", "max_attempts": 1}
+
+class AdaptiveConcurrency:
+    def __init__(self, initial=4, minimum=1, maximum=16):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.active = 0
+        self.throttled = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+
+    # throttled=None frees the slot without moving the limit, for calls that failed for other reasons
+    def release(self, throttled=False):
+        with self.condition:
+            self.active -= 1
+            if throttled:
+                self.throttled += 1
+                self.limit = max(self.minimum, self.limit / 2)
+            elif throttled is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+def call_with_backoff(func, limiter, max_attempts=6, base_delay=0.5, max_delay=20.0, **kwargs):
+    for attempt in range(max_attempts):
+        limiter.acquire()
+        try:
+            result = func(**kwargs)
+        except Exception as e:
+            throttled = is_throttling_error(e)
+            # Other errors say nothing about the service's capacity, so they neither grow nor shrink the limit
+            limiter.release(True if throttled else None)
+            if throttled:
+                METRICS.inc("migration_throttled_total", operation=getattr(func, "__name__", "unknown"))
+            if not throttled or attempt == max_attempts - 1:
+                raise
+            # Exponential backoff with full jitter
+            time.sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+            continue
+        limiter.release()
+        return result
@@ -0,0 +1,139 @@
+import os
+from abc import ABC, abstractmethod
+
+MISSING = object()
+
+# Field paths are dotted ("CreateBucketConfiguration.LocationConstraint"), may index lists
+# ("PolicyDocument.Statement.0.Action") and may fan out over a list with "[]" ("Objects[].source").
+# None selects the whole record.
+def compile_path(path):
+    if path is None:
+        return []
+    steps = []
+    for part in path.split("."):
+        if part.endswith("[]"):
+            steps.append((part[:-2], True))
+        else:
+            steps.append((int(part) if part.isdigit() else part, False))
+    return steps
+
+def _resolve(value, steps):
+    for i, (key, fan_out) in enumerate(steps):
+        if isinstance(key, int):
+            value = value[key] if isinstance(value, list) and -len(value) <= key < len(value) else MISSING
+        else:
+            value = value.get(key, MISSING) if isinstance(value, dict) else MISSING
+        if value is MISSING:
+            return [] if any(f for _, f in steps[i:]) else MISSING
+        if fan_out:
+            rest = steps[i + 1:]
+            items = value if isinstance(value, list) else []
+            return [_resolve(item, rest) for item in items]
+    return value
+
+def column(records, path):
+    steps = compile_path(path)
+    return [_resolve(record, steps) for record in records]
+
+class Rule(ABC):
+    def __init__(self, path, message):
+        self.path = path
+        self.message = message
+
+    # Returns one list of issue messages per value in the column
+    @abstractmethod
+    def evaluate(self, values, context):
+        pass
+
+class Required(Rule):
+    def evaluate(self, values, context):
+        return [[] if v is not MISSING and v else [self.message.format(value=None if v is MISSING else v)] for v in values]
+
+class Minimum(Rule):
+    def __init__(self, path, bound, message, default=0):
+        super().__init__(path, message)
+        self.bound = bound
+        self.default = default
+
+    def evaluate(self, values, context):
+        issues = []
+        for v in values:
+            v = self.default if v is MISSING else v
+            issues.append([] if v is not None and v >= self.bound else [self.message.format(value=v)])
+        return issues
+
+class Predicate(Rule):
+    def __init__(self, path, check, message):
+        super().__init__(path, message)
+        self.check = check
+
+    def evaluate(self, values, context):
+        return [[] if self.check(None if v is MISSING else v) else [self.message.format(value=None if v is MISSING else v)] for v in values]
+
+# Checks that every path in the column is an existing file. Paths are grouped by directory
+# and each directory is listed once, instead of one stat call per path.
+class FileExists(Rule):
+    def evaluate(self, values, context):
+        issues = []
+        for v in values:
+            paths = v if isinstance(v, list) else [v]
+            missing = [p for p in paths if p is MISSING or not context.file_exists(p)]
+            issues.append([self.message.format(value=None if p is MISSING else p) for p in missing])
+        return issues
+
+class FileIndex:
+    def __init__(self):
+        self.directories = {}
+
+    def _listing(self, directory):
+        if directory not in self.directories:
+            try:
+                with os.scandir(directory or ".") as entries:
+                    self.directories[directory] = {e.name for e in entries if e.is_file()}
+            except OSError:
+                self.directories[directory] = set()
+        return self.directories[directory]
+
+    def file_exists(self, path):
+        if not path or not isinstance(path, str):
+            return False
+        directory, name = os.path.split(os.path.normpath(path))
+        return name in self._listing(directory)
+
+class ValidationReport:
+    def __init__(self, records, issues, key_path=None):
+        self.records = records
+        self.issues = issues
+        self.keys = column(records, key_path) if key_path else [None] * len(records)
+
+    def valid_records(self):
+        return [r for r, issues in zip(self.records, self.issues) if not issues]
+
+    def invalid(self):
+        return [
+            {"index": i, "key": None if key is MISSING else key, "issues": issues}
+            for i, (key, issues) in enumerate(zip(self.keys, self.issues)) if issues
+        ]
+
+    def log(self, logger, label):
+        for entry in self.invalid():
+            logger.warning(f" {label} '{entry['key'] or 'Unnamed'}' has issues: {', '.join(entry['issues'])}")
+
+# A rule set is built once per validator and evaluated column by column over a batch of records
+class RuleSet:
+    def __init__(self, rules, key_path=None):
+        self.rules = rules
+        self.key_path = key_path
+        self.steps = {rule.path: compile_path(rule.path) for rule in rules}
+
+    def evaluate(self, records, context=None):
+        context = context or FileIndex()
+        issues = [[] for _ in records]
+        columns = {}
+        for rule in self.rules:
+            if rule.path not in columns:
+                steps = self.steps[rule.path]
+                columns[rule.path] = [_resolve(record, steps) for record in records]
+            for record_issues, rule_issues in zip(issues, rule.evaluate(columns[rule.path], context)):
+                record_issues.extend(rule_issues)
+        return ValidationReport(records, issues, self.key_path)